@@ -0,0 +1 @@
+"""Local, deterministic helpers for the Second Opinion review pipeline."""
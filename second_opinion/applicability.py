@@ -0,0 +1,78 @@
+"""Per-rule applicability predicates evaluated against the diff.
+
+A criteria.md entry may narrow when it applies:
+
+    applies_to:
+      paths:
+        - "**/expression/builtin*.go"
+      patterns:
+        - 'vectorized\\(\\)'
+
+A rule with predicates applies when a changed path matches one of its globs
+or an added/removed line matches one of its regular expressions; rules
+without predicates always apply. Every path glob is compiled into one
+GlobSet and every pattern into one alternation, so a diff is matched in one
+pass regardless of how many rules carry predicates.
+"""
+
+import re
+
+from second_opinion.diff import iter_file_diffs
+from second_opinion.globs import GlobSet
+
+PRUNE_REASON = "applies_to: no changed path or line matched"
+
+
+def changed_lines(diff_text):
+    """Added and removed lines of a diff, without their +/- markers, one per line."""
+    lines = []
+    for file_diff in iter_file_diffs(diff_text.splitlines(keepends=True)):
+        for hunk in file_diff.hunks:
+            lines.extend(line[1:].rstrip("\n") for line in hunk[1:] if line[:1] in "+-")
+    return "\n".join(lines)
+
+
+class RuleFilter:
+    def __init__(self, rules):
+        self._path_rules = {}
+        self._pattern_rules = {}
+        self.guarded = {}
+        for rule in rules:
+            if not (rule.paths or rule.patterns):
+                continue
+            self.guarded[rule.rule_id] = bool(rule.patterns)
+            for pattern in rule.paths:
+                self._path_rules.setdefault(pattern, []).append(rule.rule_id)
+            for pattern in rule.patterns:
+                self._pattern_rules.setdefault(pattern, []).append(rule.rule_id)
+        self._globs = GlobSet(self._path_rules)
+        self._each = [(re.compile(pattern, re.MULTILINE), ids) for pattern, ids in self._pattern_rules.items()]
+        self._any = re.compile("|".join(f"(?:{pattern})" for pattern in self._pattern_rules), re.MULTILINE) \
+            if self._pattern_rules else None
+
+    def applicable(self, paths, changed=None):
+        """Guarded rule ids whose predicates match the changed paths or lines."""
+        found = set()
+        for path in paths:
+            for pattern in self._globs.which(path):
+                found.update(self._path_rules[pattern])
+        if changed and self._any is not None and self._any.search(changed):
+            for regex, rule_ids in self._each:
+                if not found.issuperset(rule_ids) and regex.search(changed):
+                    found.update(rule_ids)
+        return found
+
+    def prune(self, paths, changed=None):
+        """Guarded rule ids that do not apply to this diff.
+
+        Without changed paths nothing is pruned; without changed lines rules
+        with content patterns are kept, since they cannot be ruled out.
+        """
+        paths = list(paths)
+        if not self.guarded or not paths:
+            return set()
+        found = self.applicable(paths, changed)
+        return {
+            rule_id for rule_id, has_patterns in self.guarded.items()
+            if rule_id not in found and (changed is not None or not has_patterns)
+        }
@@ -0,0 +1,428 @@
+"""Loading of contributor assets: experts, processes, policies, fragments."""
+
+from dataclasses import dataclass, field
+from functools import cached_property
+import hashlib
+from pathlib import Path
+import re
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+# Sample assets that document the format only and never take part in reviews.
+SAMPLE_ID = "foo"
+
+_RULE_START = re.compile(r"^- rule_id:", re.MULTILINE)
+_KEY = re.compile(r"^([A-Za-z_][\w-]*):(?:\s+(.*))?$")
+_INT = re.compile(r"^-?\d+$")
+
+
+@dataclass(frozen=True)
+class Rule:
+    rule_id: str
+    expert: str
+    tags: tuple
+    text: str
+    # applies_to predicates: changed-path globs and changed-line regexes.
+    paths: tuple = ()
+    patterns: tuple = ()
+
+
+@dataclass(frozen=True)
+class Expert:
+    id: str
+    preferred_tags: tuple
+    excluded_tags: tuple
+    review_components: tuple
+    max_rules: int
+    rules: tuple
+
+
+@dataclass(frozen=True)
+class Process:
+    id: str
+    priority: int
+    cost: str
+    mode: str
+    default: bool
+    activation: dict
+    text: str
+
+
+@dataclass(frozen=True)
+class Policy:
+    id: str
+    priority: int
+    requirements: tuple
+
+
+@dataclass(frozen=True)
+class Fragment:
+    name: str
+    text: str
+
+
+@dataclass(frozen=True)
+class Assets:
+    experts: tuple = ()
+    processes: tuple = ()
+    policies: tuple = ()
+    fragments: tuple = ()
+    root: Path = field(default=REPO_ROOT)
+    rules_by_tag: dict = None
+    processes_by_tag: dict = None
+    # Hash over every asset file's path and content; changes with any edit.
+    digest: str = None
+
+    def __post_init__(self):
+        if self.rules_by_tag is None:
+            object.__setattr__(self, "rules_by_tag", build_rules_by_tag(self.experts))
+        if self.processes_by_tag is None:
+            object.__setattr__(self, "processes_by_tag", build_processes_by_tag(self.processes))
+        object.__setattr__(
+            self,
+            "_rules_by_id",
+            {rule.rule_id: rule for expert in self.experts for rule in expert.rules},
+        )
+
+    def rule(self, rule_id):
+        return self._rules_by_id.get(rule_id)
+
+    @cached_property
+    def rule_filter(self):
+        """RuleFilter over every rule's applies_to predicates, built on first use."""
+        from second_opinion.applicability import RuleFilter
+
+        return RuleFilter(self._rules_by_id.values())
+
+    def rule_ids_for_tags(self, tags):
+        """Rule ids carrying at least one of tags."""
+        found = set()
+        for tag in tags:
+            found.update(self.rules_by_tag.get(tag, ()))
+        return found
+
+    def process_ids_for_tags(self, tags):
+        """Process ids whose activation mentions one of tags, plus tagless ones."""
+        found = set(self.processes_by_tag.get(UNTAGGED, ()))
+        for tag in tags:
+            found.update(self.processes_by_tag.get(tag, ()))
+        return found
+
+
+# processes_by_tag key for processes whose activation names no tags at all.
+UNTAGGED = "*"
+
+ACTIVATION_TAG_KEYS = ("required_tags", "any_tags", "components", "langs")
+
+
+def build_rules_by_tag(experts):
+    mapping = {}
+    for expert in experts:
+        for rule in expert.rules:
+            for tag in rule.tags:
+                mapping.setdefault(tag, []).append(rule.rule_id)
+    return mapping
+
+
+def build_processes_by_tag(processes):
+    mapping = {}
+    for process in processes:
+        tags = [tag for key in ACTIVATION_TAG_KEYS for tag in process.activation.get(key) or ()]
+        for tag in dict.fromkeys(tags or [UNTAGGED]):
+            mapping.setdefault(tag, []).append(process.id)
+    return mapping
+
+
+def _indent(line):
+    return len(line) - len(line.lstrip(" "))
+
+
+def _skip(lines, index):
+    while index < len(lines):
+        stripped = lines[index].strip()
+        if stripped and not stripped.startswith("#"):
+            break
+        index += 1
+    return index
+
+
+def _scalar(raw):
+    raw = raw.strip()
+    if len(raw) >= 2 and raw[0] == raw[-1] and raw[0] in "\"'":
+        return raw[1:-1]
+    if raw.startswith("[") and raw.endswith("]"):
+        inner = raw[1:-1].strip()
+        return [_scalar(item) for item in inner.split(",")] if inner else []
+    if raw == "{}":
+        return {}
+    lowered = raw.lower()
+    if lowered in ("true", "yes"):
+        return True
+    if lowered in ("false", "no"):
+        return False
+    if lowered in ("null", "~", ""):
+        return None
+    if _INT.match(raw):
+        return int(raw)
+    return raw
+
+
+def _block_scalar(lines, index, indent, style):
+    body = []
+    while index < len(lines) and (not lines[index].strip() or _indent(lines[index]) > indent):
+        body.append(lines[index])
+        index += 1
+    while body and not body[-1].strip():
+        body.pop()
+    width = min((_indent(line) for line in body if line.strip()), default=0)
+    text = "\n".join(line[width:] for line in body)
+    if style == "|" and body:
+        text += "\n"
+    return text, _skip(lines, index)
+
+
+def _parse_node(lines, index, indent):
+    if lines[index].strip().startswith("-"):
+        return _parse_list(lines, index, indent)
+    return _parse_mapping(lines, index, indent)
+
+
+def _parse_list(lines, index, indent):
+    items = []
+    while index < len(lines) and _indent(lines[index]) == indent:
+        content = lines[index].strip()
+        if not (content == "-" or content.startswith("- ")):
+            break
+        rest = content[1:].strip()
+        if not rest:
+            child = _skip(lines, index + 1)
+            value, index = _parse_node(lines, child, _indent(lines[child]))
+        elif _KEY.match(rest):
+            # Re-read "- key: value" as the first line of a nested mapping.
+            lines[index] = " " * (indent + 2) + rest
+            value, index = _parse_mapping(lines, index, indent + 2)
+        else:
+            value, index = _scalar(rest), _skip(lines, index + 1)
+        items.append(value)
+    return items, index
+
+
+def _parse_mapping(lines, index, indent):
+    mapping = {}
+    while index < len(lines) and _indent(lines[index]) == indent:
+        match = _KEY.match(lines[index].strip())
+        if not match:
+            raise ValueError(f"Unparseable metadata line {index + 1}: {lines[index]!r}")
+        key, raw = match.group(1), (match.group(2) or "").strip()
+        if raw in ("|", "|-"):
+            mapping[key], index = _block_scalar(lines, index + 1, indent, raw)
+            continue
+        if raw:
+            mapping[key], index = _scalar(raw), _skip(lines, index + 1)
+            continue
+        child = _skip(lines, index + 1)
+        if child < len(lines) and (
+            _indent(lines[child]) > indent
+            or (_indent(lines[child]) == indent and lines[child].strip().startswith("-"))
+        ):
+            mapping[key], index = _parse_node(lines, child, _indent(lines[child]))
+        else:
+            mapping[key], index = None, child
+    return mapping, index
+
+
+def parse_meta(text):
+    """Parse the YAML subset used by asset metadata and criteria entries.
+
+    Contributor prose is kept verbatim, so list items such as
+    `set source to {type: "policy", ...}` that strict YAML rejects are read as
+    plain strings.
+    """
+    lines = text.splitlines()
+    index = _skip(lines, 0)
+    if index >= len(lines):
+        return {}
+    value, index = _parse_node(lines, index, _indent(lines[index]))
+    if _skip(lines, index) < len(lines):
+        raise ValueError(f"Unparseable metadata line {index + 1}: {lines[index]!r}")
+    return value
+
+
+def parse_rules(text, source="criteria.md"):
+    """Split criteria.md into rule records, keeping each entry's text verbatim.
+
+    applies_to patterns are compiled here so a bad regex fails with the file
+    (source) and rule_id instead of surfacing later in RuleFilter.
+    """
+    starts = [match.start() for match in _RULE_START.finditer(text)]
+    rules = []
+    for index, start in enumerate(starts):
+        end = starts[index + 1] if index + 1 < len(starts) else len(text)
+        span = text[start:end].rstrip()
+        entry = parse_meta(span)[0]
+        applies_to = entry.get("applies_to") or {}
+        rule_id = str(entry["rule_id"])
+        patterns = [str(pattern) for pattern in applies_to.get("patterns") or ()]
+        for pattern in patterns:
+            try:
+                re.compile(pattern, re.MULTILINE)
+            except re.error as exc:
+                raise ValueError(f"{source}: rule {rule_id}: invalid applies_to pattern {pattern!r}: {exc}") from None
+        rules.append(
+            {
+                "rule_id": rule_id,
+                "tags": [str(tag) for tag in entry.get("tags") or ()],
+                "paths": [str(path) for path in applies_to.get("paths") or ()],
+                "patterns": patterns,
+                "text": span,
+            }
+        )
+    return rules
+
+
+def parse_record(kind, text, source=None):
+    """Parse one asset file's text into a JSON-serializable record.
+
+    source names the file in parse errors.
+    """
+    if kind == "expert_criteria":
+        return parse_rules(text, source or "criteria.md")
+    if kind in ("process_criteria", "fragment"):
+        return text.rstrip()
+    return parse_meta(text) or {}
+
+
+def build_expert(meta, rules, rule_factory=Rule):
+    expert_id = str(meta["id"])
+    participation = meta.get("participation") or {}
+    return Expert(
+        id=expert_id,
+        preferred_tags=tuple(meta.get("preferred_tags") or ()),
+        excluded_tags=tuple(meta.get("excluded_tags") or ()),
+        review_components=tuple(meta.get("review_components") or ()),
+        max_rules=int(participation.get("max_rules", len(rules))),
+        rules=tuple(
+            rule_factory(
+                rule_id=r["rule_id"],
+                expert=expert_id,
+                tags=tuple(r["tags"]),
+                text=r["text"],
+                paths=tuple(r.get("paths", ())),
+                patterns=tuple(r.get("patterns", ())),
+            )
+            for r in rules
+        ),
+    )
+
+
+def build_process(meta, text):
+    return Process(
+        id=str(meta["id"]),
+        priority=int(meta.get("priority", 0)),
+        cost=str(meta.get("cost", "medium")),
+        mode=str(meta.get("mode", "primary")),
+        default=bool(meta.get("default", False)),
+        activation=dict(meta.get("activation") or {}),
+        text=text,
+    )
+
+
+def build_policy(meta):
+    return Policy(
+        id=str(meta["id"]),
+        priority=int(meta.get("priority", 0)),
+        requirements=tuple(str(item) for item in meta.get("requirements") or ()),
+    )
+
+
+def ordered_policies(policies):
+    """Policies in their fixed compilation order: highest priority first."""
+    return sorted(policies, key=lambda p: (-p.priority, p.id))
+
+
+def _asset_dirs(parent, include_samples):
+    if not parent.is_dir():
+        return []
+    return [
+        child
+        for child in sorted(parent.iterdir())
+        if child.is_dir()
+        and (child / "meta.yaml").is_file()
+        and (include_samples or child.name != SAMPLE_ID)
+    ]
+
+
+def _asset_files(parent, pattern, include_samples):
+    if not parent.is_dir():
+        return []
+    return [
+        path
+        for path in sorted(parent.glob(pattern))
+        if path.is_file() and (include_samples or path.stem != SAMPLE_ID)
+    ]
+
+
+def list_asset_files(root, include_samples=False):
+    """Return (kind, relative path) for every asset file, in load order."""
+    root = Path(root)
+    files = []
+    for group, prefix in (("experts", "expert"), ("processes", "process")):
+        for directory in _asset_dirs(root / group, include_samples):
+            files.append((f"{prefix}_meta", directory / "meta.yaml"))
+            if (directory / "criteria.md").is_file():
+                files.append((f"{prefix}_criteria", directory / "criteria.md"))
+    files.extend(("policy", p) for p in _asset_files(root / "policies", "*.yaml", include_samples))
+    files.extend(("fragment", p) for p in _asset_files(root / "fragments", "*.md", include_samples))
+    return [(kind, path.relative_to(root).as_posix()) for kind, path in files]
+
+
+def tree_digest(file_hashes):
+    """Combine (relative path, sha256) pairs into one asset-tree hash."""
+    hasher = hashlib.sha256()
+    for rel, digest in sorted(file_hashes):
+        hasher.update(f"{rel}\0{digest}\n".encode("utf-8"))
+    return hasher.hexdigest()
+
+
+def assemble_assets(root, files, records, rules_by_tag=None, processes_by_tag=None, digest=None,
+                    rule_factory=Rule):
+    """Build Assets from list_asset_files() output and per-file records."""
+    experts, processes, policies, fragments = [], [], [], []
+    for kind, rel in files:
+        record = records[rel]
+        directory = rel.rsplit("/", 1)[0]
+        if kind == "expert_meta":
+            experts.append(build_expert(record, records.get(f"{directory}/criteria.md", []), rule_factory))
+        elif kind == "process_meta":
+            processes.append(build_process(record, records.get(f"{directory}/criteria.md", "")))
+        elif kind == "policy":
+            policies.append(build_policy(record))
+        elif kind == "fragment":
+            fragments.append(Fragment(name=Path(rel).stem, text=record))
+    return Assets(
+        experts=tuple(experts),
+        processes=tuple(processes),
+        policies=tuple(policies),
+        fragments=tuple(fragments),
+        root=Path(root),
+        rules_by_tag=rules_by_tag,
+        processes_by_tag=processes_by_tag,
+        digest=digest,
+    )
+
+
+def load_assets(root=REPO_ROOT, include_samples=False):
+    """Load every asset under root, skipping the sample foo assets by default."""
+    from second_opinion.bundle import is_bundle, load_pack
+
+    root = Path(root)
+    if is_bundle(root):
+        return load_pack(root)
+    files = list_asset_files(root, include_samples)
+    records = {}
+    hashes = []
+    for kind, rel in files:
+        raw = (root / rel).read_bytes()
+        records[rel] = parse_record(kind, raw.decode("utf-8"), rel)
+        hashes.append((rel, hashlib.sha256(raw).hexdigest()))
+    return assemble_assets(root, files, records, digest=tree_digest(hashes))
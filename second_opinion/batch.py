@@ -0,0 +1,253 @@
+"""Batch review of many PRs in one invocation.
+
+Assets and the component table are loaded once for the whole batch. Each
+PR's diff goes through the pre-review filter (second_opinion.diff_filter)
+unless --no-filter is given; it is then tagged, PRs with identical compile
+inputs (tags, changed-file count and options) share one compiled prompt, and
+reviewer calls run with bounded concurrency. Per-PR compiler.json and
+review.json plus a summary.json are written under the output directory, and
+with --history each reviewed PR is also stored in the history database
+(second_opinion.history).
+
+Without --reviewer-cmd only tagging and compiling run, which prepares the
+batch for an agent to review. The command receives the compiled prompt and
+the diff as file paths ({prompt} and {diff} placeholders), or both as one
+reviewer input with the diff last ({input}), and must print review.json on
+stdout. A reviewer failure is recorded as that PR's `error` in summary.json
+and the rest of the batch still runs. Only the {prompt}, {diff} and {input}
+placeholders are substituted; other braces are passed through.
+
+Usage:
+    python -m second_opinion.batch --out batch/ pr-101.diff pr-102.diff
+    python -m second_opinion.batch --out batch/ --repo ../tidb --range main..feature-a --range main..feature-b \\
+        --reviewer-cmd "my-reviewer --prompt {prompt} --diff {diff}" --workers 8
+"""
+
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+import json
+from pathlib import Path
+import re
+import shlex
+import subprocess
+import sys
+import tempfile
+import time
+
+from second_opinion import trace
+from second_opinion.applicability import changed_lines
+from second_opinion.assets import REPO_ROOT
+from second_opinion.cache import compile_key
+from second_opinion.compiler import compile_review, normalize_budget, normalize_focus, review_input
+from second_opinion.components import load_components, resolve_repo
+from second_opinion.diff import changed_files, lang_tags, mechanical_selection, parse_diff
+from second_opinion.diff_filter import FILTERS_PATH, load_filters
+from second_opinion.history import History
+from second_opinion.index import load_index
+
+DEFAULT_WORKERS = 4
+_PLACEHOLDER = re.compile(r"\{(prompt|diff|input)\}")
+
+
+@dataclass
+class PullRequest:
+    name: str
+    diff: str
+    files: list = field(default_factory=list)
+    tagger: dict = None
+    group: int = None
+    review: dict = None
+    filtered: list = field(default_factory=list)
+    error: str = None
+
+
+def mechanical_tagger(components=None):
+    """tagger(diff_text) built from the diff signals and component table."""
+    matcher = components if components is not None else load_components()
+
+    def tagger(diff_text):
+        records = list(parse_diff(diff_text.splitlines(keepends=True)))
+        by_tag, _ = matcher.classify(record.path for record in records)
+        return mechanical_selection(records, by_tag)
+
+    return tagger
+
+
+def _safe_name(text):
+    return re.sub(r"[^\w.-]+", "_", text).strip("_") or "pr"
+
+
+def load_pull_requests(diffs=(), ranges=(), repo="."):
+    """Read diff files and `git diff <range>` outputs as PullRequest entries."""
+    prs = [PullRequest(_safe_name(Path(path).stem), Path(path).read_text(encoding="utf-8")) for path in diffs]
+    for ref_range in ranges:
+        diff = subprocess.run(
+            ["git", "-C", str(repo), "diff", ref_range],
+            check=True,
+            stdout=subprocess.PIPE,
+            text=True,
+        ).stdout
+        prs.append(PullRequest(_safe_name(ref_range), diff))
+    seen = {}
+    for pr in prs:
+        count = seen.get(pr.name, 0)
+        seen[pr.name] = count + 1
+        if count:
+            pr.name = f"{pr.name}-{count + 1}"
+    return prs
+
+
+def review_batch(prs, assets, tagger, reviewer=None, workers=DEFAULT_WORKERS, budget=None, focus=(),
+                 user_override=None):
+    """Tag, group, compile and review every PR.
+
+    reviewer(compiled_prompt, diff_text) returns a review.json payload; with
+    no reviewer, PRs are only compiled. A reviewer exception is stored in
+    pr.error and leaves pr.review unset. Returns the list of compiler.json
+    payloads, one per group; pr.group indexes into it.
+    """
+    groups = {}
+    compiled = []
+    for pr in prs:
+        with trace.span("tagger", cat="model", pr=pr.name):
+            pr.tagger = tagger(pr.diff)
+        pr.files = changed_files(pr.diff)
+        tags = [item["tag"] for item in pr.tagger.get("tags", [])]
+        tags.extend(lang_tags(parse_diff(pr.diff.splitlines(keepends=True))))
+        tags = list(dict.fromkeys(tags))
+        changed = changed_lines(pr.diff)
+        pruned = assets.rule_filter.prune(pr.files, changed)
+        key = compile_key(tags, normalize_budget(budget), normalize_focus(focus), user_override,
+                          len(pr.files), assets.digest, pruned=pruned)
+        if key not in groups:
+            groups[key] = len(compiled)
+            compiled.append(compile_review(assets, tags, files=pr.files, budget=budget, focus=focus,
+                                           user_override=user_override, changed=changed))
+        pr.group = groups[key]
+
+    if reviewer is not None:
+        def run(pr):
+            prompt = compiled[pr.group]["compiled_prompt"]
+            with trace.span("reviewer", cat="model", pr=pr.name) as attrs:
+                try:
+                    pr.review = reviewer(prompt, pr.diff)
+                except Exception as exc:
+                    pr.error = f"{type(exc).__name__}: {exc}"
+                    attrs.update(error=pr.error)
+                    return
+                if trace.enabled():
+                    attrs.update(trace.call_stats((prompt, pr.diff), pr.review))
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            list(pool.map(run, prs))
+    return compiled
+
+
+def command_reviewer(command, scratch):
+    """reviewer() running a shell command template; see the module docstring."""
+    scratch = Path(scratch)
+    scratch.mkdir(parents=True, exist_ok=True)
+
+    def reviewer(compiled_prompt, diff_text):
+        with tempfile.TemporaryDirectory(dir=scratch) as tmp:
+            prompt_path = Path(tmp) / "prompt.md"
+            diff_path = Path(tmp) / "change.diff"
+            input_path = Path(tmp) / "input.md"
+            prompt_path.write_text(compiled_prompt, encoding="utf-8")
+            diff_path.write_text(diff_text, encoding="utf-8")
+            if "{input}" in command:
+                input_path.write_text(review_input(compiled_prompt, diff_text), encoding="utf-8")
+            values = {"prompt": prompt_path, "diff": diff_path, "input": input_path}
+            argv = [_PLACEHOLDER.sub(lambda match: str(values[match.group(1)]), part)
+                    for part in shlex.split(command)]
+            result = subprocess.run(argv, check=True, stdout=subprocess.PIPE, text=True)
+        return json.loads(result.stdout)
+
+    return reviewer
+
+
+def write_batch(out, prs, compiled, seconds=None):
+    """Write <out>/<pr>/{tagger,compiler,review}.json and <out>/summary.json."""
+    out = Path(out)
+    summary = {"prs": [], "groups": len(compiled), "seconds": seconds}
+    for pr in prs:
+        directory = out / pr.name
+        directory.mkdir(parents=True, exist_ok=True)
+        (directory / "change.diff").write_text(pr.diff, encoding="utf-8")
+        outputs = {"tagger.json": pr.tagger, "compiler.json": compiled[pr.group]}
+        if pr.review is not None:
+            outputs["review.json"] = pr.review
+        for name, payload in outputs.items():
+            (directory / name).write_text(json.dumps(payload, indent=2) + "\n", encoding="utf-8")
+        summary["prs"].append(
+            {
+                "name": pr.name,
+                "group": pr.group,
+                "files": len(pr.files),
+                "filtered": len(pr.filtered),
+                "selected_experts": compiled[pr.group]["selected_experts"],
+                "findings": None if pr.review is None else len(pr.review.get("findings", [])),
+                "error": pr.error,
+            }
+        )
+    (out / "summary.json").write_text(json.dumps(summary, indent=2) + "\n", encoding="utf-8")
+    return summary
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("diffs", nargs="*", help="diff files, one per PR")
+    parser.add_argument("--range", action="append", default=[], dest="ranges",
+                        help="git ref range to diff in --repo (repeatable)")
+    parser.add_argument("--repo", default=".", help="git repository for --range")
+    parser.add_argument("--repo-name", help="reviewed repository (tidb, pd, ...) for component rules; "
+                        "detected from --repo with --range")
+    parser.add_argument("--out", required=True, help="output directory")
+    parser.add_argument("--reviewer-cmd",
+                        help="command template printing review.json for {prompt} and {diff} (or {input})")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="concurrent reviewer calls")
+    parser.add_argument("--root", default=str(REPO_ROOT), help="asset root directory")
+    parser.add_argument("--budget", help="depth hint (quick/standard/deep/...)")
+    parser.add_argument("--focus", action="append", default=[], help="focus hint tag")
+    parser.add_argument("--process", help="user-requested process override")
+    parser.add_argument("--cache-dir", help="asset index directory")
+    parser.add_argument("--filters", default=str(FILTERS_PATH), help="pre-review diff filter rules")
+    parser.add_argument("--no-filter", action="store_true", help="send generated/vendored files in full")
+    parser.add_argument("--history", help="also store reviewed PRs in this history database")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if not args.diffs and not args.ranges:
+        build_parser().error("give diff files or --range")
+    started = time.perf_counter()
+    assets = load_index(args.root, cache_dir=args.cache_dir)
+    prs = load_pull_requests(args.diffs, args.ranges, args.repo)
+    if not args.no_filter:
+        rules = load_filters(args.filters)
+        for pr in prs:
+            result = rules.apply(pr.diff)
+            pr.diff, pr.filtered = result.text, [item.path for item in result.filtered]
+    reviewer = None
+    if args.reviewer_cmd:
+        reviewer = command_reviewer(args.reviewer_cmd, Path(args.out) / ".scratch")
+    repo = resolve_repo(args.repo_name, args.repo if args.ranges else None)
+    tagger = mechanical_tagger(load_components(repo=repo))
+    compiled = review_batch(prs, assets, tagger, reviewer, args.workers, args.budget, args.focus, args.process)
+    summary = write_batch(args.out, prs, compiled, round(time.perf_counter() - started, 3))
+    if args.history and reviewer is not None:
+        with History(args.history) as history:
+            for pr in prs:
+                if pr.review is None:
+                    continue
+                tags = [item["tag"] for item in pr.tagger.get("tags", [])]
+                history.ingest(compiled[pr.group], pr.review, tags, name=pr.name)
+    errors = sum(1 for pr in prs if pr.error)
+    sys.stdout.write(json.dumps({"prs": len(prs), "groups": summary["groups"], "errors": errors}) + "\n")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+"""Offline benchmark for the tagger -> compiler -> reviewer pipeline.
+
+Runs every stage against examples/foo/patch.diff and synthetic diffs of
+increasing size, with StubModel standing in for the model-backed stages, and
+reports per-stage wall time, estimated prompt/response tokens, bytes parsed
+and compile/findings cache hit rates as JSON. `compare` flags regressions
+between two reports.
+
+Usage:
+    python -m second_opinion.bench run -o bench.json
+    python -m second_opinion.bench compare baseline.json bench.json --threshold 0.25
+"""
+
+import argparse
+import json
+from pathlib import Path
+import sys
+import tempfile
+import time
+
+from second_opinion.applicability import changed_lines
+from second_opinion.assets import REPO_ROOT, load_assets
+from second_opinion.budget import estimate_tokens
+from second_opinion.cache import CompileCache
+from second_opinion.compiler import compile_review
+from second_opinion.diff import changed_files
+from second_opinion.review_cache import FindingsCache, review_with_cache
+from second_opinion.stub_model import StubModel
+
+REPORT_VERSION = 1
+DEFAULT_SIZES = (100, 1000, 5000)
+DEFAULT_REPEAT = 3
+DEFAULT_THRESHOLD = 0.25
+# Timing differences below this are noise, whatever the relative change.
+MIN_SECONDS_DELTA = 0.005
+
+STAGES = ("tagger", "compiler", "reviewer")
+TAGGER_PROMPT = REPO_ROOT / "prompts" / "tagger.prompt"
+SAMPLE_DIFF = REPO_ROOT / "examples" / "foo" / "patch.diff"
+# Synthetic files are spread over component paths so experts and processes trigger.
+SYNTHETIC_DIRS = ("pkg/expression", "pkg/ddl", "pkg/executor", "pkg/planner/core", "components/raftstore/src")
+LINES_PER_FILE = 100
+LINES_PER_HUNK = 20
+
+
+def synthetic_diff(lines):
+    """Deterministic Go diff adding `lines` lines across several files."""
+    parts = []
+    files = max(1, lines // LINES_PER_FILE)
+    for index in range(files):
+        path = f"{SYNTHETIC_DIRS[index % len(SYNTHETIC_DIRS)]}/bench_{index}.go"
+        parts.append(f"diff --git a/{path} b/{path}\nindex 1111111..2222222 100644\n--- a/{path}\n+++ b/{path}\n")
+        count = lines // files + (1 if index < lines % files else 0)
+        start = 1
+        while count > 0:
+            size = min(LINES_PER_HUNK, count)
+            parts.append(f"@@ -{start},1 +{start},{size + 1} @@\n func bench{index}() {{\n")
+            parts.extend(f"+\tv{index}_{start + n} := mu.Lock() // {n}\n" for n in range(size))
+            start += size + 10
+            count -= size
+    return "".join(parts)
+
+
+def corpus(sizes=DEFAULT_SIZES):
+    cases = [("examples/foo", SAMPLE_DIFF.read_text(encoding="utf-8"))]
+    cases.extend((f"synthetic-{size}", synthetic_diff(size)) for size in sizes)
+    return cases
+
+
+def _hit_rate(cache):
+    total = cache.hits + cache.misses
+    return round(cache.hits / total, 4) if total else 0.0
+
+
+def run_case(name, diff, assets, model, cache_dir, repeat=DEFAULT_REPEAT):
+    """Run the pipeline `repeat` times on one diff and return its report entry.
+
+    Caches start empty, so the first iteration is cold and the rest are warm.
+    """
+    compile_cache = CompileCache(cache_dir)
+    findings_cache = FindingsCache(cache_dir)
+    tagger_prompt = TAGGER_PROMPT.read_text(encoding="utf-8")
+    files = changed_files(diff)
+    seconds = dict.fromkeys(STAGES, 0.0)
+    tokens = {"prompt": 0, "response": 0}
+
+    def reviewer(compiled_prompt, diff_text):
+        review = model.review(compiled_prompt, diff_text)
+        tokens["prompt"] += estimate_tokens(compiled_prompt) + estimate_tokens(diff_text)
+        tokens["response"] += estimate_tokens(json.dumps(review))
+        return review
+
+    findings = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        tagged = model.tag(diff)
+        seconds["tagger"] += time.perf_counter() - started
+        tokens["prompt"] += estimate_tokens(tagger_prompt) + estimate_tokens(diff)
+        tokens["response"] += estimate_tokens(json.dumps(tagged))
+
+        started = time.perf_counter()
+        compiled = compile_review(assets, [t["tag"] for t in tagged["tags"]], files=files, cache=compile_cache,
+                                  changed=changed_lines(diff))
+        seconds["compiler"] += time.perf_counter() - started
+
+        started = time.perf_counter()
+        review, _ = review_with_cache(diff, compiled, reviewer, findings_cache)
+        seconds["reviewer"] += time.perf_counter() - started
+        findings = len(review["findings"])
+
+    size = len(diff.encode("utf-8"))
+    return {
+        "name": name,
+        "files": len(files),
+        "lines": diff.count("\n"),
+        "bytes": size,
+        "repeat": repeat,
+        "stages": {
+            stage: {"seconds": round(total / repeat, 6)} for stage, total in seconds.items()
+        },
+        "parse_bytes_per_second": round(size * repeat / seconds["tagger"]) if seconds["tagger"] else 0,
+        "tokens": {key: value // repeat for key, value in tokens.items()},
+        "cache": {"compile": _hit_rate(compile_cache), "findings": _hit_rate(findings_cache)},
+        "findings": findings,
+    }
+
+
+def run(sizes=DEFAULT_SIZES, repeat=DEFAULT_REPEAT, root=REPO_ROOT, repo=None):
+    assets = load_assets(root)
+    model = StubModel(repo=repo)
+    cases = []
+    for name, diff in corpus(sizes):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cases.append(run_case(name, diff, assets, model, cache_dir, repeat))
+    return {"version": REPORT_VERSION, "cases": cases}
+
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """List regressions of current against baseline for cases both contain."""
+    before = {case["name"]: case for case in baseline.get("cases", [])}
+    regressions = []
+    for case in current.get("cases", []):
+        old = before.get(case["name"])
+        if old is None:
+            continue
+        for stage, timing in case["stages"].items():
+            was = old["stages"].get(stage, {}).get("seconds")
+            now = timing["seconds"]
+            if was is not None and now - was > MIN_SECONDS_DELTA and now > was * (1 + threshold):
+                regressions.append({"case": case["name"], "metric": f"{stage}.seconds", "baseline": was,
+                                    "current": now})
+        for kind, now in case["tokens"].items():
+            was = old["tokens"].get(kind)
+            if was is not None and now > was * (1 + threshold):
+                regressions.append({"case": case["name"], "metric": f"tokens.{kind}", "baseline": was,
+                                    "current": now})
+    return regressions
+
+
+def _write(path, payload):
+    text = json.dumps(payload, indent=2) + "\n"
+    if path:
+        Path(path).write_text(text, encoding="utf-8")
+    else:
+        sys.stdout.write(text)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_cmd = commands.add_parser("run", help="benchmark the pipeline and write a JSON report")
+    run_cmd.add_argument("--root", default=str(REPO_ROOT), help="asset root directory")
+    run_cmd.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES),
+                         help="added lines per synthetic diff")
+    run_cmd.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="pipeline runs per diff")
+    run_cmd.add_argument("--repo-name", help="scope component rules to one repository (the synthetic diffs mix "
+                         "TiDB and TiKV paths, so all apply by default)")
+    run_cmd.add_argument("-o", "--output", help="write the report here instead of stdout")
+
+    compare_cmd = commands.add_parser("compare", help="flag regressions between two reports")
+    compare_cmd.add_argument("baseline", help="baseline report")
+    compare_cmd.add_argument("current", help="current report")
+    compare_cmd.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                             help="allowed relative slowdown or token growth")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == "run":
+        _write(args.output, run(args.sizes, max(1, args.repeat), Path(args.root), args.repo_name))
+        return 0
+    baseline, current = (json.loads(Path(p).read_text(encoding="utf-8")) for p in (args.baseline, args.current))
+    regressions = compare(baseline, current, args.threshold)
+    _write(None, {"regressions": regressions})
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+"""Token budget planning for compiled prompts.
+
+Each normalized budget (see compiler.DEPTH_BUDGETS) has a hard token ceiling.
+When the assembled prompt exceeds it, the lowest-priority assets are dropped
+until it fits: rules first (least tag overlap, then last expert, then last
+position), then the secondary process. Policies, the primary process and the
+output contract are never cut; when they alone exceed the ceiling, the prompt
+stays over it and a provenance entry says so. Token counts are estimates (~4 bytes/token),
+which is all the planner needs to keep prompts away from reviewer limits.
+
+Usage:
+    python -m second_opinion.budget [--root DIR]
+"""
+
+import argparse
+import json
+import math
+from pathlib import Path
+import sys
+
+from second_opinion.assets import REPO_ROOT, load_assets
+
+BYTES_PER_TOKEN = 4
+
+TOKEN_CEILINGS = {
+    "low": 2000,
+    "medium": 6000,
+    "high": 12000,
+}
+
+CUT_REASON = "dropped: over token budget"
+OVER_CEILING_REASON = "required assets exceed token ceiling"
+
+
+def estimate_tokens(text):
+    return math.ceil(len(text.encode("utf-8")) / BYTES_PER_TOKEN)
+
+
+def token_ceiling(budget, max_tokens=None):
+    return max_tokens or TOKEN_CEILINGS[budget]
+
+
+def _drop_order(rules_by_expert, tags):
+    ranked = []
+    for expert_index, rules in enumerate(rules_by_expert.values()):
+        for position, rule in enumerate(rules):
+            overlap = sum(1 for tag in rule.tags if tag in tags)
+            ranked.append((overlap, -expert_index, -position, rule))
+    ranked.sort(key=lambda item: item[:3])
+    return [rule for *_, rule in ranked]
+
+
+def fit_budget(render, processes, rules_by_expert, tags, ceiling):
+    """Drop low-priority rules and the secondary process until render() fits.
+
+    render(processes, rules_by_expert) returns the compiled prompt. Returns
+    (processes, rules_by_expert, cuts, tokens) where cuts are provenance
+    entries for everything removed, plus an OVER_CEILING_REASON entry when
+    nothing is left to cut and the prompt still does not fit.
+    """
+    processes = list(processes)
+    kept = {expert: list(rules) for expert, rules in rules_by_expert.items()}
+    cuts = []
+    tokens = estimate_tokens(render(processes, kept))
+    queue = _drop_order(kept, tags)
+    while tokens > ceiling:
+        if queue:
+            rule = queue.pop(0)
+            kept[rule.expert].remove(rule)
+            if not kept[rule.expert]:
+                del kept[rule.expert]
+            cuts.append({"rule_id": rule.rule_id, "expert": rule.expert, "reason": CUT_REASON})
+        elif len(processes) > 1:
+            cuts.append({"process": processes.pop().id, "reason": CUT_REASON})
+        else:
+            cuts.append({"reason": f"{OVER_CEILING_REASON}: {tokens} > {ceiling}"})
+            break
+        tokens = estimate_tokens(render(processes, kept))
+    return processes, kept, cuts, tokens
+
+
+def asset_costs(assets):
+    """Estimated tokens per policy, process workflow, rule and fragment."""
+    from second_opinion.compiler import render_policy
+
+    return {
+        "policies": {p.id: estimate_tokens(render_policy(p)) for p in assets.policies},
+        "processes": {p.id: estimate_tokens(p.text) for p in assets.processes},
+        "rules": {
+            rule.rule_id: estimate_tokens(rule.text) for expert in assets.experts for rule in expert.rules
+        },
+        "fragments": {f.name: estimate_tokens(f.text) for f in assets.fragments},
+    }
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Print estimated token costs per asset.")
+    parser.add_argument("--root", default=str(REPO_ROOT), help="asset root directory")
+    parser.add_argument("--include-samples", action="store_true", help="keep sample foo assets")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    costs = asset_costs(load_assets(Path(args.root), include_samples=args.include_samples))
+    sys.stdout.write(json.dumps({"ceilings": TOKEN_CEILINGS, "costs": costs}, indent=2) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,206 @@
+"""Packed skill bundle: what an installed skill needs, without the asset tree.
+
+`build` writes a directory holding SKILL.md, the second_opinion package,
+agents/, prompts/, schemas/, taxonomy.md, components.yaml and filters.yaml, plus two
+pack files replacing experts/, processes/, policies/ and fragments/:
+
+- assets.pack.json: the manifest (pack version, asset-tree digest, sha256 of
+  every bundled file) and the precompiled asset index: parsed records and
+  the tag lookup tables. Criteria entries keep each rule's metadata and the
+  byte span of its text in criteria.pack.
+- criteria.pack: every rule's criteria text, back to back.
+
+Sample foo assets, tests/ and examples/ are left out. load_index() and
+load_assets() on a bundle root read the pack instead of walking the tree,
+and a rule's text is read from criteria.pack only when it is first used,
+i.e. when the rule is selected.
+
+Usage:
+    python -m second_opinion.bundle build --out dist/second-opinion
+    python -m second_opinion.bundle build --out dist/second-opinion --archive
+    python -m second_opinion.bundle verify dist/second-opinion
+    python -m second_opinion.bundle show dist/second-opinion RUOXI-EXPR-001
+"""
+
+import argparse
+import hashlib
+import json
+from pathlib import Path
+import shutil
+import sys
+import threading
+
+from second_opinion.assets import (
+    REPO_ROOT,
+    Rule,
+    assemble_assets,
+    list_asset_files,
+    parse_record,
+    tree_digest,
+)
+
+PACK_VERSION = 1
+PACK_MANIFEST = "assets.pack.json"
+CRITERIA_PACK = "criteria.pack"
+BUNDLE_FILES = ("SKILL.md", "taxonomy.md", "components.yaml", "filters.yaml")
+BUNDLE_DIRS = ("agents", "prompts", "schemas", "second_opinion")
+BUNDLE_IGNORE = shutil.ignore_patterns("__pycache__", "*.py[cod]")
+
+
+def is_bundle(root):
+    return (Path(root) / PACK_MANIFEST).is_file()
+
+
+class CriteriaPack:
+    """criteria.pack, opened on the first read and read by byte span."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._handle = None
+        self._lock = threading.Lock()
+
+    def read(self, offset, length):
+        with self._lock:
+            if self._handle is None:
+                self._handle = self.path.open("rb")
+            self._handle.seek(offset)
+            return self._handle.read(length).decode("utf-8")
+
+
+class PackedRule(Rule):
+    """Rule whose criteria text is read from the pack on first access."""
+
+    def __init__(self, pack, rule_id, expert, tags, text, paths=(), patterns=()):
+        for name, value in (("rule_id", rule_id), ("expert", expert), ("tags", tags), ("paths", paths),
+                            ("patterns", patterns), ("_pack", pack), ("_span", tuple(text))):
+            object.__setattr__(self, name, value)
+
+    @property
+    def text(self):
+        try:
+            return self.__dict__["_text"]
+        except KeyError:
+            text = self._pack.read(*self._span)
+            object.__setattr__(self, "_text", text)
+            return text
+
+
+def _sha256(path):
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+
+def build(out, root=REPO_ROOT):
+    """Write the bundle for the asset tree at root into out; return the manifest."""
+    root, out = Path(root), Path(out)
+    if out.exists():
+        shutil.rmtree(out)
+    out.mkdir(parents=True)
+    for name in BUNDLE_FILES:
+        shutil.copy2(root / name, out / name)
+    for name in BUNDLE_DIRS:
+        shutil.copytree(root / name, out / name, ignore=BUNDLE_IGNORE)
+
+    files = list_asset_files(root)
+    records = {}
+    hashes = []
+    with (out / CRITERIA_PACK).open("wb") as pack:
+        for kind, rel in files:
+            raw = (root / rel).read_bytes()
+            hashes.append((rel, hashlib.sha256(raw).hexdigest()))
+            record = parse_record(kind, raw.decode("utf-8"), rel)
+            if kind == "expert_criteria":
+                for rule in record:
+                    data = rule["text"].encode("utf-8")
+                    rule["text"] = [pack.tell(), len(data)]
+                    pack.write(data)
+            records[rel] = record
+    # Only the tag tables are needed here; rule texts are spans at this point.
+    assets = assemble_assets(root, files, records)
+
+    bundled = sorted(
+        path.relative_to(out).as_posix() for path in out.rglob("*") if path.is_file()
+    )
+    manifest = {
+        "version": PACK_VERSION,
+        "digest": tree_digest(hashes),
+        "files": {rel: _sha256(out / rel) for rel in bundled},
+    }
+    payload = {
+        "manifest": manifest,
+        "assets": files,
+        "records": records,
+        "rules_by_tag": assets.rules_by_tag,
+        "processes_by_tag": assets.processes_by_tag,
+    }
+    (out / PACK_MANIFEST).write_text(json.dumps(payload, separators=(",", ":")), encoding="utf-8")
+    return manifest
+
+
+def load_pack(root):
+    """Assets from a bundle root; criteria text stays in criteria.pack until used."""
+    root = Path(root)
+    data = json.loads((root / PACK_MANIFEST).read_text(encoding="utf-8"))
+    if data["manifest"]["version"] != PACK_VERSION:
+        raise ValueError(f"{root / PACK_MANIFEST}: unsupported pack version {data['manifest']['version']}")
+    pack = CriteriaPack(root / CRITERIA_PACK)
+    return assemble_assets(
+        root,
+        [tuple(entry) for entry in data["assets"]],
+        data["records"],
+        rules_by_tag=data["rules_by_tag"],
+        processes_by_tag=data["processes_by_tag"],
+        digest=data["manifest"]["digest"],
+        rule_factory=lambda **fields: PackedRule(pack, **fields),
+    )
+
+
+def verify(root):
+    """Bundled files whose content no longer matches the manifest."""
+    root = Path(root)
+    manifest = json.loads((root / PACK_MANIFEST).read_text(encoding="utf-8"))["manifest"]
+    return [rel for rel, digest in manifest["files"].items()
+            if not (root / rel).is_file() or _sha256(root / rel) != digest]
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    build_cmd = commands.add_parser("build", help="write a packed bundle directory")
+    build_cmd.add_argument("--out", required=True, help="bundle directory (replaced if it exists)")
+    build_cmd.add_argument("--root", default=str(REPO_ROOT), help="asset root directory")
+    build_cmd.add_argument("--archive", action="store_true", help="also write <out>.tar.gz")
+    verify_cmd = commands.add_parser("verify", help="check bundled files against the manifest")
+    verify_cmd.add_argument("bundle", help="bundle directory")
+    show = commands.add_parser("show", help="print criteria text for rule ids")
+    show.add_argument("bundle", help="bundle directory")
+    show.add_argument("rule_ids", nargs="+", help="rule ids")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == "build":
+        manifest = build(args.out, args.root)
+        summary = {"files": len(manifest["files"]), "digest": manifest["digest"]}
+        if args.archive:
+            out = Path(args.out)
+            summary["archive"] = shutil.make_archive(str(out), "gztar", root_dir=out)
+        sys.stdout.write(json.dumps(summary) + "\n")
+        return 0
+    if args.command == "verify":
+        stale = verify(args.bundle)
+        for rel in stale:
+            sys.stdout.write(f"{rel}: does not match the manifest\n")
+        return 1 if stale else 0
+    assets = load_pack(args.bundle)
+    for rule_id in args.rule_ids:
+        rule = assets.rule(rule_id)
+        if rule is None:
+            sys.stderr.write(f"unknown rule {rule_id}\n")
+            return 1
+        sys.stdout.write(rule.text + "\n\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
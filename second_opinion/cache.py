@@ -0,0 +1,111 @@
+"""Local on-disk caches for pipeline outputs.
+
+CompileCache stores compiler.json payloads keyed by everything the compiler
+output depends on: sorted tags, budget, focus hints, user override, token
+ceiling override, changed-file count, the rules pruned by their applies_to
+predicates, the asset-tree digest and the compiler output version. Any edit
+to an expert, process, policy or fragment changes the digest, so stale
+entries are never hit; they simply age out under the LRU policy.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+import time
+
+from second_opinion.index import default_cache_dir, write_json_atomic
+
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+# Bumped whenever compiler.json changes shape or prompt layout.
+COMPILE_VERSION = 3
+
+
+def json_key(payload):
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def compile_key(tags, budget, focus, user_override, file_count, digest, max_tokens=None, pruned=()):
+    return json_key(
+        {
+            "tags": sorted(set(tags)),
+            "budget": budget,
+            "focus": sorted(set(focus)),
+            "user_override": user_override,
+            "file_count": file_count,
+            "assets": digest,
+            "max_tokens": max_tokens,
+            "pruned": sorted(pruned),
+            "version": COMPILE_VERSION,
+        }
+    )
+
+
+class JsonCache:
+    """LRU cache storing one JSON file per key under cache_dir/<subdir>.
+
+    Recency is tracked through file mtimes, so several processes can share
+    one cache directory without coordination. With max_age (seconds), entries
+    older than that since they were written count as misses.
+    """
+
+    subdir = "entries"
+
+    def __init__(self, cache_dir=None, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES,
+                 max_age=None):
+        self.directory = Path(cache_dir or default_cache_dir()) / self.subdir
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key):
+        return self.directory / f"{key}.json"
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            entry = json.loads(path.read_text(encoding="utf-8"))
+            if self.max_age is not None and time.time() - entry["created"] > self.max_age:
+                path.unlink(missing_ok=True)
+                raise ValueError("expired")
+            os.utime(path)
+        except (OSError, ValueError, KeyError, TypeError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry["value"]
+
+    def put(self, key, value):
+        if write_json_atomic(self._path(key), {"created": time.time(), "value": value}):
+            self.evict()
+
+    def entries(self):
+        """Return (mtime_ns, size, path) for every entry, oldest first."""
+        if not self.directory.is_dir():
+            return []
+        found = []
+        for path in self.directory.glob("*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            found.append((stat.st_mtime_ns, stat.st_size, path))
+        return sorted(found)
+
+    def evict(self):
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        while entries and (len(entries) > self.max_entries or total > self.max_bytes):
+            _, size, path = entries.pop(0)
+            path.unlink(missing_ok=True)
+            total -= size
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses}
+
+
+class CompileCache(JsonCache):
+    subdir = "compiled"
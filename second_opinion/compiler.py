@@ -0,0 +1,431 @@
+"""Deterministic implementation of the compiler stage (prompts/compiler.prompt).
+
+Usage:
+    python -m second_opinion.compiler --tags tagger.json --diff change.diff -o compiler.json
+"""
+
+import argparse
+import hashlib
+import json
+from pathlib import Path
+import sys
+
+from second_opinion import trace
+from second_opinion.applicability import PRUNE_REASON, changed_lines
+from second_opinion.assets import ACTIVATION_TAG_KEYS, REPO_ROOT, ordered_policies
+from second_opinion.budget import CUT_REASON, estimate_tokens, fit_budget, token_ceiling
+from second_opinion.cache import CompileCache, compile_key
+from second_opinion.diff import lang_tags, parse_diff
+from second_opinion.index import load_index
+
+TIE_BREAKERS = ["specificity", "cost"]
+
+# Depth hints from the user prompt mapped onto selection_rationale.budget.
+DEPTH_BUDGETS = {
+    "quick": "low",
+    "light": "low",
+    "low": "low",
+    "standard": "medium",
+    "medium": "medium",
+    "deep": "high",
+    "heavy": "high",
+    "thorough": "high",
+    "high": "high",
+}
+DEFAULT_BUDGET = "medium"
+
+COST_ORDER = {"light": 0, "medium": 1, "heavy": 2}
+
+FOCUS_ALIASES = {"security-only": "risk:security"}
+
+OUTPUT_FRAGMENT_PREFIX = "output-"
+
+SEGMENT_SEPARATOR = "\n\n"
+SEGMENT_PROCESSES = ["primary_process", "secondary_process"]
+
+
+def normalize_budget(budget):
+    if not budget:
+        return DEFAULT_BUDGET
+    return DEPTH_BUDGETS.get(str(budget).strip().lower(), DEFAULT_BUDGET)
+
+
+def normalize_focus(focus):
+    return [FOCUS_ALIASES.get(item, item) for item in focus or ()]
+
+
+def _activation_tags(process):
+    return [tag for key in ACTIVATION_TAG_KEYS for tag in process.activation.get(key) or ()]
+
+
+def specificity(process):
+    """Number of activation constraints the process declares."""
+    activation = process.activation
+    count = 0
+    for key in ACTIVATION_TAG_KEYS:
+        if activation.get(key):
+            count += 1
+    if activation.get("min_files"):
+        count += 1
+    return count
+
+
+def match_activation(process, tags, file_count):
+    """Return (reason, triggered_by) when activation matches, else None."""
+    activation = process.activation
+    reasons = []
+    triggered = []
+
+    required = list(activation.get("required_tags") or ())
+    if required:
+        if not all(tag in tags for tag in required):
+            return None
+        reasons.append("required_tags matched")
+        triggered.extend(required)
+
+    for key in ("any_tags", "components", "langs"):
+        wanted = list(activation.get(key) or ())
+        if not wanted:
+            continue
+        hits = [tag for tag in wanted if tag in tags]
+        if not hits:
+            return None
+        reasons.append(f"{key} matched")
+        triggered.extend(hits)
+
+    min_files = int(activation.get("min_files") or 0)
+    if min_files:
+        if file_count < min_files:
+            return None
+        reasons.append("min_files met")
+
+    if not reasons:
+        reasons.append("no activation constraints")
+    return "; ".join(reasons), list(dict.fromkeys(triggered))
+
+
+def _rank(process):
+    return (-process.priority, -specificity(process), COST_ORDER.get(process.cost, 1), process.id)
+
+
+def _in_focus(tags, focus):
+    return not focus or any(tag in focus for tag in tags)
+
+
+def select_processes(assets, tags, file_count, budget, focus, user_override):
+    """Run the workflow selection algorithm and return (selected, rationale, provenance)."""
+    indexed = assets.process_ids_for_tags(tags)
+    processes = [p for p in assets.processes if _in_focus(_activation_tags(p), focus)]
+    rationale = {
+        "user_override": user_override,
+        "candidates": [],
+        "primary_process": None,
+        "secondary_processes": [],
+        "tie_breakers": list(TIE_BREAKERS),
+        "budget": budget,
+    }
+
+    if user_override:
+        by_id = {p.id: p for p in assets.processes}
+        if user_override not in by_id:
+            raise ValueError(f"Unknown process: {user_override}")
+        rationale["primary_process"] = {"process": user_override, "reason": "user override"}
+        provenance = [{"process": user_override, "reason": "user override"}]
+        return [by_id[user_override]], rationale, provenance
+
+    candidates = []
+    for process in processes:
+        if process.id not in indexed:
+            continue
+        matched = match_activation(process, tags, file_count)
+        if matched is None:
+            continue
+        reason, triggered = matched
+        candidates.append((process, triggered))
+        rationale["candidates"].append({"process": process.id, "reason": reason})
+
+    if not candidates:
+        defaults = [p for p in processes if p.default]
+        if not defaults:
+            return [], rationale, []
+        primary = defaults[0]
+        rationale["primary_process"] = {"process": primary.id, "reason": "default fallback"}
+        return [primary], rationale, [{"process": primary.id, "reason": "default fallback"}]
+
+    candidates.sort(key=lambda item: _rank(item[0]))
+    primary, triggered = candidates[0]
+    rationale["primary_process"] = {"process": primary.id, "reason": "highest priority"}
+    selected = [primary]
+    provenance = [{"process": primary.id, "triggered_by": triggered}]
+
+    if primary.mode == "stackable" and budget != "low":
+        for process, triggered in candidates[1:]:
+            if process.mode == "exclusive":
+                continue
+            rationale["secondary_processes"].append(
+                {"process": process.id, "reason": "primary is stackable and budget allows"}
+            )
+            selected.append(process)
+            provenance.append({"process": process.id, "triggered_by": triggered})
+            break
+
+    return selected, rationale, provenance
+
+
+def expert_matches(expert, tags):
+    if any(tag in tags for tag in expert.excluded_tags):
+        return False
+    if any(tag in tags for tag in expert.review_components):
+        return True
+    return any(tag in tags for tag in expert.preferred_tags if not tag.startswith("lang:"))
+
+
+def select_rules(assets, tags, focus, pruned=frozenset()):
+    """Pick up to participation.max_rules matching rules per expert, deduplicated by rule_id.
+
+    Returns (selected, skipped): rules in pruned never take a slot, and the
+    tag-matched ones among them are listed in skipped.
+    """
+    selected = {}
+    skipped = []
+    seen = set()
+    indexed = assets.rule_ids_for_tags(tags)
+    for expert in assets.experts:
+        if not expert_matches(expert, tags):
+            continue
+        scored = []
+        for position, rule in enumerate(expert.rules):
+            if rule.rule_id not in indexed or rule.rule_id in seen:
+                continue
+            if not _in_focus(rule.tags, focus):
+                continue
+            overlap = sum(1 for tag in rule.tags if tag in tags)
+            if overlap and rule.rule_id in pruned:
+                skipped.append({"rule_id": rule.rule_id, "expert": expert.id, "reason": PRUNE_REASON})
+            elif overlap:
+                scored.append((-overlap, position, rule))
+        scored.sort(key=lambda item: item[:2])
+        kept = sorted(scored[: expert.max_rules], key=lambda item: item[1])
+        if kept:
+            selected[expert.id] = [rule for _, _, rule in kept]
+            seen.update(rule.rule_id for _, _, rule in kept)
+    return selected, skipped
+
+
+def output_fragments(assets):
+    """Output contract fragments; trees without output-*.md use every fragment."""
+    contract = [f for f in assets.fragments if f.name.startswith(OUTPUT_FRAGMENT_PREFIX)]
+    return contract or list(assets.fragments)
+
+
+def render_policy(policy):
+    lines = [f"## Policy: {policy.id}"]
+    lines.extend(f"- {item}" for item in policy.requirements)
+    return "\n".join(lines)
+
+
+def prompt_segments(policies, processes, rules, fragments):
+    """(name, text) blocks in the fixed compilation order, text inserted verbatim.
+
+    Segments that are the same for every review (policies, output contract)
+    come first and per-review ones last, so the prompt shares the longest
+    possible byte-identical prefix across PRs.
+    """
+    segments = []
+    if policies:
+        segments.append(("policies", "# Policies\n\n" + "\n\n".join(render_policy(p) for p in policies)))
+    if fragments:
+        segments.append((
+            "output_contract",
+            "\n\n".join(f"# Output contract: {fragment.name}\n\n{fragment.text}" for fragment in fragments),
+        ))
+    for name, label, process in zip(SEGMENT_PROCESSES, ["Primary process", "Secondary process"], processes):
+        segments.append((name, f"# {label}: {process.id}\n\n{process.text}"))
+    if rules:
+        segments.append(("rules", "# Reviewer rules\n\n" + "\n\n".join(rule.text for rule in rules)))
+    return segments
+
+
+def join_segments(texts):
+    return SEGMENT_SEPARATOR.join(texts) + "\n"
+
+
+def assemble_prompt(policies, processes, rules, fragments):
+    return join_segments(text for _, text in prompt_segments(policies, processes, rules, fragments))
+
+
+def segment_digests(segments):
+    """compiler.json prompt_segments: name, byte length and sha256 of each block."""
+    return [
+        {"segment": name, "bytes": len(raw), "sha256": hashlib.sha256(raw).hexdigest()}
+        for name, raw in ((name, text.encode("utf-8")) for name, text in segments)
+    ]
+
+
+def segment_blocks(compiled_prompt, segments):
+    """Yield (prompt_segments entry, its bytes in compiled_prompt), in order."""
+    raw = compiled_prompt.encode("utf-8")
+    separator = len(SEGMENT_SEPARATOR.encode("utf-8"))
+    offset = 0
+    for index, segment in enumerate(segments):
+        if index:
+            offset += separator
+        yield segment, raw[offset:offset + segment["bytes"]]
+        offset += segment["bytes"]
+
+
+def review_input(compiled_prompt, diff_text, context=None):
+    """Reviewer input: the compiled prompt as a reusable prefix, then a context pack, then the diff."""
+    diff_text = diff_text.rstrip("\n")
+    texts = [compiled_prompt.rstrip("\n")]
+    if context:
+        texts.append(context.rstrip("\n"))
+    texts.append(f"# Diff\n\n```diff\n{diff_text}\n```")
+    return join_segments(texts)
+
+
+def _compile(assets, tags, file_count, budget, focus, user_override, max_tokens, pruned):
+    processes, rationale, process_provenance = select_processes(
+        assets, tags, file_count, budget, focus, user_override
+    )
+    candidates, rationale["pruned_rules"] = select_rules(assets, tags, focus, pruned)
+    policies = ordered_policies(assets.policies)
+    fragments = output_fragments(assets)
+
+    def render(processes, rules_by_expert):
+        rules = [rule for expert_rules in rules_by_expert.values() for rule in expert_rules]
+        return assemble_prompt(policies, processes, rules, fragments)
+
+    processes, rules_by_expert, cuts, _ = fit_budget(
+        render, processes, candidates, tags, token_ceiling(budget, max_tokens)
+    )
+    kept_processes = {p.id for p in processes}
+    rationale["secondary_processes"] = [
+        entry for entry in rationale["secondary_processes"] if entry["process"] in kept_processes
+    ]
+    rules = [rule for expert_rules in rules_by_expert.values() for rule in expert_rules]
+    final = prompt_segments(policies, processes, rules, fragments)
+
+    provenance = [{"policy": p.id, "reason": "always"} for p in policies]
+    provenance.extend(entry for entry in process_provenance if entry["process"] in kept_processes)
+    provenance.extend({"rule_id": rule.rule_id, "expert": rule.expert} for rule in rules)
+    provenance.extend(cuts)
+
+    return {
+        "selected_experts": list(rules_by_expert),
+        "rules_used": {
+            expert: [rule.rule_id for rule in expert_rules]
+            for expert, expert_rules in rules_by_expert.items()
+        },
+        "selected_processes": [p.id for p in processes],
+        "selected_policies": [p.id for p in policies],
+        "selection_rationale": rationale,
+        "compiled_prompt": join_segments(text for _, text in final),
+        "prompt_segments": segment_digests(final),
+        "provenance": provenance,
+    }
+
+
+def selection_stats(result):
+    """Sizes of a compiler.json payload, for tracing."""
+    prompt = result["compiled_prompt"]
+    return {
+        "experts": len(result["selected_experts"]),
+        "rules": sum(len(rules) for rules in result["rules_used"].values()),
+        "processes": len(result["selected_processes"]),
+        "policies": len(result["selected_policies"]),
+        "cut": sum(1 for entry in result["provenance"] if entry.get("reason") == CUT_REASON),
+        "pruned": len(result["selection_rationale"]["pruned_rules"]),
+        "prompt_bytes": len(prompt.encode("utf-8")),
+        "prompt_tokens": estimate_tokens(prompt),
+    }
+
+
+def compile_review(assets, tags, files=(), budget=None, focus=(), user_override=None, cache=None,
+                   max_tokens=None, changed=None):
+    """Return a compiler.json payload for the derived tags.
+
+    Rules whose applies_to predicates match none of files (or, when given,
+    the changed lines from applicability.changed_lines) are pruned and listed
+    in selection_rationale.pruned_rules. The compiled prompt is kept under the
+    budget's token ceiling (or max_tokens); assets cut to fit are listed in
+    provenance. With a CompileCache, identical inputs against an unchanged
+    asset tree are served from the cache instead of being recompiled.
+    """
+    tags = list(dict.fromkeys(tags))
+    focus = normalize_focus(focus)
+    budget = normalize_budget(budget)
+    with trace.span("compile", cat="compiler", tags=len(tags), files=len(files), budget=budget) as attrs:
+        pruned = assets.rule_filter.prune(files, changed)
+        key = None
+        result = None
+        if cache is not None and assets.digest:
+            key = compile_key(tags, budget, focus, user_override, len(files), assets.digest, max_tokens,
+                              sorted(pruned))
+            result = cache.get(key)
+            attrs["cache"] = "miss" if result is None else "hit"
+        if result is None:
+            result = _compile(assets, tags, len(files), budget, focus, user_override, max_tokens, pruned)
+            if key is not None:
+                cache.put(key, result)
+        if trace.enabled():
+            attrs.update(selection_stats(result))
+        return result
+
+
+def read_tags(path):
+    """Read tag strings from a tagger.json file."""
+    with Path(path).open("r", encoding="utf-8") as handle:
+        data = json.load(handle)
+    return [item["tag"] for item in data.get("tags", [])]
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--root", default=str(REPO_ROOT), help="asset root directory")
+    parser.add_argument("--tags", required=True, help="tagger.json path")
+    parser.add_argument("--diff", help="diff file used for min_files checks and lang tags")
+    parser.add_argument("--budget", help="depth hint (quick/standard/deep/...)")
+    parser.add_argument("--focus", action="append", default=[], help="focus hint tag")
+    parser.add_argument("--process", help="user-requested process override")
+    parser.add_argument("--max-tokens", type=int, help="override the budget's prompt token ceiling")
+    parser.add_argument("--include-samples", action="store_true", help="keep sample foo assets")
+    parser.add_argument("--cache-dir", help="asset index and compile cache directory")
+    parser.add_argument("--no-cache", action="store_true", help="always recompile")
+    parser.add_argument("-o", "--output", help="write compiler.json here instead of stdout")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    assets = load_index(args.root, include_samples=args.include_samples, cache_dir=args.cache_dir)
+    tags = read_tags(args.tags)
+    files = []
+    changed = None
+    if args.diff:
+        diff_text = Path(args.diff).read_text(encoding="utf-8")
+        records = list(parse_diff(diff_text.splitlines(keepends=True)))
+        files = [record.path for record in records]
+        changed = changed_lines(diff_text)
+        tags.extend(lang_tags(records))
+    result = compile_review(
+        assets,
+        tags,
+        files=files,
+        budget=args.budget,
+        focus=args.focus,
+        user_override=args.process,
+        max_tokens=args.max_tokens,
+        cache=None if args.no_cache else CompileCache(args.cache_dir),
+        changed=changed,
+    )
+    text = json.dumps(result, indent=2) + "\n"
+    if args.output:
+        Path(args.output).write_text(text, encoding="utf-8")
+    else:
+        sys.stdout.write(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
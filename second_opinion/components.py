@@ -0,0 +1,155 @@
+"""Path-to-component tagging from the components.yaml rule table.
+
+Prefix patterns are compiled into a segment trie (longest prefix wins) and
+glob patterns into one GlobSet, so a diff of thousands of files resolves to
+component tags in a single pass. Paths no pattern covers are reported so the
+tagger only has to reason about the leftovers.
+
+TiDB, PD and the other repositories reuse top-level names such as pkg/, so
+every entry is scoped to one repository: its `repo` key, or by default the
+repository named in its tag (component:<repo>/...). A matcher built for a
+known repository only uses that repository's entries; detect_repo() finds it
+from a checkout's go.mod module or marker files listed under `repos`.
+Without a repository every entry applies, and a PD path such as
+pkg/statistics/ is tagged as TiDB's.
+"""
+
+from pathlib import Path
+
+from second_opinion.assets import REPO_ROOT, parse_meta
+from second_opinion.globs import GlobSet, has_wildcard
+from second_opinion.taxonomy import TAXONOMY_PATH, load_taxonomy
+
+COMPONENTS_PATH = REPO_ROOT / "components.yaml"
+
+
+class _Node:
+    __slots__ = ("children", "tags")
+
+    def __init__(self):
+        self.children = {}
+        self.tags = []
+
+
+def tag_repo(tag):
+    """Repository a component tag belongs to: component:pd/tso -> pd."""
+    return tag.split(":", 1)[-1].split("/", 1)[0]
+
+
+class ComponentMatcher:
+    def __init__(self, entries, repo=None):
+        """entries: iterable of (tag, [pattern, ...]) or (tag, [pattern, ...], repo).
+
+        With repo, entries scoped to other repositories are left out.
+        """
+        self.repo = repo
+        self._root = _Node()
+        glob_patterns = []
+        self._glob_tags = {}
+        for tag, patterns, *scope in entries:
+            if repo is not None and (scope[0] if scope and scope[0] else tag_repo(tag)) != repo:
+                continue
+            for pattern in patterns:
+                if has_wildcard(pattern):
+                    glob_patterns.append(pattern)
+                    self._glob_tags.setdefault(pattern, []).append(tag)
+                    continue
+                node = self._root
+                for segment in pattern.strip("/").split("/"):
+                    node = node.children.setdefault(segment, _Node())
+                if tag not in node.tags:
+                    node.tags.append(tag)
+        self._globs = GlobSet(glob_patterns)
+
+    def match(self, path):
+        """Return the component tags for one path."""
+        node = self._root
+        tags = []
+        for segment in path.split("/"):
+            node = node.children.get(segment)
+            if node is None:
+                break
+            if node.tags:
+                tags = node.tags
+        found = list(tags)
+        for pattern in self._globs.which(path):
+            for tag in self._glob_tags[pattern]:
+                if tag not in found:
+                    found.append(tag)
+        return found
+
+    def classify(self, paths):
+        """Return ({tag: [paths]}, [unmatched paths]), both in input order."""
+        by_tag = {}
+        unmatched = []
+        for path in paths:
+            tags = self.match(path)
+            if not tags:
+                unmatched.append(path)
+            for tag in tags:
+                by_tag.setdefault(tag, []).append(path)
+        return by_tag, unmatched
+
+
+def _read_table(path):
+    return parse_meta(Path(path).read_text(encoding="utf-8")) or {}
+
+
+def load_components(path=COMPONENTS_PATH, taxonomy_path=TAXONOMY_PATH, repo=None):
+    """Load the rule table, rejecting tags that taxonomy.md does not define.
+
+    repo limits the matcher to one repository's entries; see the module docstring.
+    """
+    table = _read_table(path)
+    allowed = set(load_taxonomy(taxonomy_path))
+    known = {str(item["name"]) for item in table.get("repos") or ()}
+    entries = []
+    for entry in table.get("components") or ():
+        tag = str(entry["tag"])
+        if tag not in allowed:
+            raise ValueError(f"{path}: tag not in taxonomy: {tag}")
+        scope = str(entry.get("repo") or tag_repo(tag))
+        if known and scope not in known:
+            raise ValueError(f"{path}: {tag}: repo not listed under repos: {scope}")
+        entries.append((tag, [str(p) for p in entry.get("paths") or ()], scope))
+    if repo is not None and known and repo not in known:
+        raise ValueError(f"{path}: unknown repo: {repo}")
+    return ComponentMatcher(entries, repo)
+
+
+def _go_module(checkout):
+    try:
+        text = (Path(checkout) / "go.mod").read_text(encoding="utf-8")
+    except OSError:
+        return None
+    for line in text.splitlines():
+        if line.startswith("module "):
+            return line.split()[1]
+    return None
+
+
+def resolve_repo(name=None, checkout=None, path=COMPONENTS_PATH):
+    """The --repo-name given, else the repository detected from the --repo checkout, else None."""
+    if name:
+        return name
+    return detect_repo(checkout, path) if checkout else None
+
+
+def detect_repo(checkout, path=COMPONENTS_PATH):
+    """Name of the `repos` entry whose go.mod module or marker files a checkout has, or None."""
+    module = _go_module(checkout)
+    for item in _read_table(path).get("repos") or ():
+        if module is not None and module in [str(m) for m in item.get("modules") or ()]:
+            return str(item["name"])
+        if any((Path(checkout) / str(marker)).exists() for marker in item.get("markers") or ()):
+            return str(item["name"])
+    return None
+
+
+def component_tags(by_tag):
+    """tagger.json tag entries for classify() output."""
+    tags = []
+    for tag, paths in by_tag.items():
+        sample = paths[0] if len(paths) == 1 else f"{paths[0]} and {len(paths) - 1} more"
+        tags.append({"tag": tag, "why": f"path rule matched {sample}"})
+    return tags
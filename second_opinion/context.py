@@ -0,0 +1,371 @@
+"""Hunk context packs read from git objects instead of working-tree files.
+
+For every hunk of a diff, the enclosing Go/C++/Rust/SQL scope (function,
+type, impl block, statement) is sliced out of the file's head blob (base blob
+for deleted files); hunks outside any recognizable scope, and files in other
+languages, get a fixed window of lines instead. Blobs come from one persistent
+`git cat-file --batch` process per repository, requested in bulk for all
+touched files, and are kept in an LRU cache. Scopes are emitted in diff
+order, overlapping ones merged, up to a byte cap, so the pack is the same for
+the same diff and objects.
+
+Blob ids come from the diff's `index` lines, so `git show <ref>` output needs
+no refs; --base/--head read <rev>:<path> instead. A post-image blob missing
+from the object store (a working-tree diff) is read from the repository's
+working tree.
+
+Usage:
+    git show <ref> | python -m second_opinion.context --repo ../tidb - -o context.md
+    python -m second_opinion.context --repo ../tidb --base main --head feature change.diff --format json
+"""
+
+import argparse
+import atexit
+from collections import OrderedDict
+import json
+from pathlib import Path, PurePosixPath
+import re
+import subprocess
+import sys
+import threading
+
+from second_opinion import trace
+from second_opinion.diff import hunk_changed_range, iter_file_diffs, language_of
+
+PACK_VERSION = 1
+DEFAULT_MAX_BYTES = 24 * 1024
+DEFAULT_CACHE_BLOBS = 256
+WINDOW_LINES = 10
+MAX_SCOPE_LINES = 120
+MAX_SCAN_LINES = 2000
+HEADER_LINES = 8
+# Requests written before reading any reply; kept well under a pipe buffer so
+# git never blocks on a full stdout while we block on a full stdin.
+REQUEST_CHUNK_BYTES = 16 * 1024
+
+_NULL_BLOB = re.compile(r"^0+$")
+_INDEX = re.compile(r"^index ([0-9a-f]+)\.\.([0-9a-f]+)")
+_LITERAL = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])\'|`[^`]*`|//.*$')
+_SQL_LITERAL = re.compile(r"'(?:''|[^'])*'|--.*$")
+# Go statements end at a line break unless the line is left open.
+_GO_CONTINUED = ("{", "(", ",", "[")
+
+# lang tag -> [(kind, opener pattern, bracket pair or None for `;`-terminated)].
+SCOPES = {
+    "lang:go": [
+        ("func", re.compile(r"^func\b"), "{}"),
+        ("type", re.compile(r"^type\b"), "{}"),
+        ("block", re.compile(r"^(?:var|const|import)\s*\("), "()"),
+    ],
+    "lang:cpp": [
+        ("type", re.compile(r"^\s*(?:template\s*<.*>\s*)?(?:class|struct|union|enum|namespace)\b[^;]*$"), "{}"),
+        ("func", re.compile(
+            r"^\s*(?!(?:if|for|while|switch|return|else|case|do|catch)\b)[A-Za-z_~][\w:<>,*&~\s]*\([^;]*$"
+        ), "{}"),
+    ],
+    "lang:rust": [
+        ("func", re.compile(
+            r"^\s*(?:pub(?:\([^)]*\))?\s+)?(?:(?:async|const|unsafe|extern\s+\"[^\"]*\")\s+)*fn\b"
+        ), "{}"),
+        ("type", re.compile(
+            r"^\s*(?:pub(?:\([^)]*\))?\s+)?(?:unsafe\s+)?(?:impl|struct|enum|trait|mod|union)\b"
+        ), "{}"),
+    ],
+    "lang:sql": [
+        ("statement", re.compile(
+            r"^\s*(?:create|alter|drop|select|insert|update|delete|replace|with)\b", re.IGNORECASE
+        ), None),
+    ],
+}
+
+
+class BlobReader:
+    """A persistent `git cat-file --batch` process with an LRU blob cache.
+
+    Object names are assumed immutable (object ids, or <commit id>:<path>),
+    so cached blobs never go stale.
+    """
+
+    def __init__(self, repo, cache_size=DEFAULT_CACHE_BLOBS):
+        self.repo = Path(repo)
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        self._process = None
+        self._lock = threading.Lock()
+
+    def _start(self):
+        if self._process is None or self._process.poll() is not None:
+            self._process = subprocess.Popen(
+                ["git", "-C", str(self.repo), "cat-file", "--batch"],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+            )
+        return self._process
+
+    def _reply(self, process):
+        header = process.stdout.readline()
+        if not header:
+            raise RuntimeError(f"git cat-file exited in {self.repo}")
+        fields = header.split()
+        if len(fields) != 3 or not fields[2].isdigit():
+            return None  # "<name> missing" or "<name> ambiguous"; names may contain spaces
+        data = process.stdout.read(int(fields[2]))
+        process.stdout.read(1)
+        return data if fields[1] == b"blob" else None
+
+    def read_many(self, names):
+        """{name: blob bytes or None} for object names, fetched in bulk."""
+        found = {}
+        with self._lock:
+            pending = []
+            for name in dict.fromkeys(names):
+                if name in self._cache:
+                    self._cache.move_to_end(name)
+                    found[name] = self._cache[name]
+                    self.hits += 1
+                else:
+                    pending.append(name)
+            self.misses += len(pending)
+            process = self._start() if pending else None
+            while pending:
+                chunk, size = [], 0
+                while pending and (not chunk or size + len(pending[0]) < REQUEST_CHUNK_BYTES):
+                    chunk.append(pending.pop(0))
+                    size += len(chunk[-1]) + 1
+                process.stdin.write("".join(f"{name}\n" for name in chunk).encode("utf-8"))
+                process.stdin.flush()
+                for name in chunk:
+                    found[name] = self._reply(process)
+                    self._cache[name] = found[name]
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return found
+
+    def read(self, name):
+        return self.read_many([name])[name]
+
+    def close(self):
+        with self._lock:
+            if self._process is not None:
+                self._process.stdin.close()
+                self._process.wait()
+                self._process.stdout.close()
+                self._process = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+_READERS = {}
+_READERS_LOCK = threading.Lock()
+
+
+def reader_for(repo):
+    """The shared BlobReader of a repository, started on first use."""
+    key = str(Path(repo).resolve())
+    with _READERS_LOCK:
+        if key not in _READERS:
+            _READERS[key] = BlobReader(key)
+        return _READERS[key]
+
+
+@atexit.register
+def close_readers():
+    with _READERS_LOCK:
+        for reader in _READERS.values():
+            reader.close()
+        _READERS.clear()
+
+
+def resolve(repo, rev):
+    """Commit id for rev, so <commit>:<path> names stay cacheable."""
+    return subprocess.run(
+        ["git", "-C", str(repo), "rev-parse", "--verify", f"{rev}^{{commit}}"],
+        check=True,
+        stdout=subprocess.PIPE,
+        text=True,
+    ).stdout.strip()
+
+
+def _block_end(lines, start, brackets, language):
+    """Last line of the bracketed block opened at or just after lines[start]."""
+    opening, closing = brackets
+    depth = 0
+    opened = False
+    for number in range(start, len(lines)):
+        code = _LITERAL.sub("", lines[number])
+        if not opened and number - start >= HEADER_LINES:
+            return None
+        for char in code:
+            if char == opening:
+                depth += 1
+                opened = True
+            elif char == closing and opened:
+                depth -= 1
+                if depth == 0:
+                    return number
+            elif char == ";" and not opened and language != "lang:go":
+                return None
+        if not opened and language == "lang:go" and not code.rstrip().endswith(_GO_CONTINUED):
+            return None
+    return None
+
+
+def _statement_end(lines, start):
+    for number in range(start, len(lines)):
+        if _SQL_LITERAL.sub("", lines[number]).rstrip().endswith(";"):
+            return number
+    return None
+
+
+def enclosing_scope(lines, first, last, language):
+    """(kind, start, end) of the innermost scope around lines first..last (0-based), or None."""
+    patterns = SCOPES.get(language, [])
+    for number in range(min(first, len(lines) - 1), max(-1, first - MAX_SCAN_LINES), -1):
+        for kind, opener, brackets in patterns:
+            if not opener.match(lines[number]):
+                continue
+            end = _block_end(lines, number, brackets, language) if brackets else _statement_end(lines, number)
+            if end is not None and end >= last:
+                return kind, number, end
+    return None
+
+
+def hunk_slices(lines, ranges, language):
+    """Merged (kind, header, start, end) 1-based slices for changed line ranges."""
+    slices = []
+    for first, last in ranges:
+        first = min(max(first, 1), len(lines)) - 1
+        last = min(max(last, 1), len(lines)) - 1
+        scope = enclosing_scope(lines, first, last, language)
+        if scope is None:
+            kind, header = "window", None
+            start, end = max(0, first - WINDOW_LINES), min(len(lines) - 1, last + WINDOW_LINES)
+        else:
+            kind, start, end = scope
+            header = lines[start].strip()
+            if end - start + 1 > MAX_SCOPE_LINES:
+                start = max(start, first - WINDOW_LINES)
+                end = min(end, last + WINDOW_LINES)
+        if slices and start <= slices[-1][3]:
+            previous = slices[-1]
+            slices[-1] = (previous[0], previous[1], previous[2], max(previous[3], end))
+        else:
+            slices.append((kind, header, start, end))
+    return [(kind, header, start + 1, end + 1) for kind, header, start, end in slices]
+
+
+def _file_entry(file_diff):
+    """What to fetch and slice for one file section of a diff."""
+    old_id = new_id = None
+    old_path = file_diff.path
+    deleted = binary = False
+    for line in file_diff.header:
+        match = _INDEX.match(line)
+        if match:
+            old_id, new_id = match.groups()
+        elif line.startswith("rename from "):
+            old_path = line[len("rename from "):].rstrip("\n")
+        elif line.startswith("deleted file mode"):
+            deleted = True
+        elif line.startswith(("Binary files ", "GIT binary patch")):
+            binary = True
+    blob = old_id if deleted else new_id
+    return {
+        "path": file_diff.path,
+        "side": "base" if deleted else "head",
+        "source_path": old_path if deleted else file_diff.path,
+        "blob": None if blob is None or _NULL_BLOB.match(blob) else blob,
+        "binary": binary,
+        "ranges": [hunk_changed_range(hunk, old=deleted) for hunk in file_diff.hunks],
+    }
+
+
+def extract_context(diff_text, repo=".", base=None, head=None, max_bytes=DEFAULT_MAX_BYTES, reader=None):
+    """Context pack for a diff: enclosing scopes of its hunks, in diff order."""
+    repo = Path(repo)
+    reader = reader or reader_for(repo)
+    base = resolve(repo, base) if base else None
+    head = resolve(repo, head) if head else None
+    entries = [
+        entry for entry in (_file_entry(file_diff) for file_diff in iter_file_diffs(diff_text.splitlines(True)))
+        if entry["ranges"] and not entry["binary"]
+    ]
+    with trace.span("context.extract", cat="context", files=len(entries)) as attrs:
+        for entry in entries:
+            rev = base if entry["side"] == "base" else head
+            entry["name"] = f"{rev}:{entry['source_path']}" if rev else entry["blob"]
+        hits, misses = reader.hits, reader.misses
+        blobs = reader.read_many([entry["name"] for entry in entries if entry["name"]])
+
+        scopes, omitted, used = [], [], 0
+        for entry in entries:
+            data = blobs.get(entry["name"]) if entry["name"] else None
+            if data is None and entry["side"] == "head" and (repo / entry["path"]).is_file():
+                data = (repo / entry["path"]).read_bytes()
+            if data is None:
+                omitted.append(f"{entry['path']}: blob not found")
+                continue
+            lines = data.decode("utf-8", errors="replace").splitlines()
+            if not lines:
+                continue
+            for kind, header, start, end in hunk_slices(lines, entry["ranges"], language_of(entry["path"])):
+                text = "\n".join(lines[start - 1:end])
+                size = len(text.encode("utf-8"))
+                if used + size > max_bytes:
+                    omitted.append(f"{entry['path']}:{start}-{end}")
+                    continue
+                used += size
+                scopes.append({"path": entry["path"], "side": entry["side"], "start": start, "end": end,
+                               "kind": kind, "header": header, "text": text})
+        attrs.update(scopes=len(scopes), bytes=used, omitted=len(omitted),
+                     blob_hits=reader.hits - hits, blob_misses=reader.misses - misses)
+    return {"version": PACK_VERSION, "base": base, "head": head, "bytes": used, "scopes": scopes,
+            "omitted": omitted}
+
+
+def render_context(pack):
+    """Markdown for the reviewer: one fenced block per scope."""
+    blocks = ["# Context"]
+    for scope in pack["scopes"]:
+        title = f"## {scope['path']} L{scope['start']}-L{scope['end']}"
+        if scope["side"] == "base":
+            title += " (base)"
+        fence = PurePosixPath(scope["path"]).suffix.lstrip(".")
+        blocks.append(f"{title}\n\n```{fence}\n{scope['text']}\n```")
+    if pack["omitted"]:
+        blocks.append("Omitted (byte cap or missing blob): " + ", ".join(pack["omitted"]))
+    return "\n\n".join(blocks) + "\n"
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("diff", help="diff file, or - for stdin")
+    parser.add_argument("--repo", default=".", help="git repository the diff applies to")
+    parser.add_argument("--base", help="read pre-image files from this revision")
+    parser.add_argument("--head", help="read post-image files from this revision")
+    parser.add_argument("--max-bytes", type=int, default=DEFAULT_MAX_BYTES, help="byte cap for scope text")
+    parser.add_argument("--format", choices=("markdown", "json"), default="markdown", help="output format")
+    parser.add_argument("-o", "--output", help="write here instead of stdout")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    diff_text = sys.stdin.read() if args.diff == "-" else Path(args.diff).read_text(encoding="utf-8")
+    pack = extract_context(diff_text, args.repo, args.base, args.head, args.max_bytes)
+    text = json.dumps(pack, indent=2) + "\n" if args.format == "json" else render_context(pack)
+    if args.output:
+        Path(args.output).write_text(text, encoding="utf-8")
+    else:
+        sys.stdout.write(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,303 @@
+"""Streaming unified diff parsing and mechanical signal extraction.
+
+Usage:
+    python -m second_opinion.diff change.diff -o tagger.seed.json --unmatched unmatched.json
+    git show <ref> | python -m second_opinion.diff -
+"""
+
+import argparse
+from dataclasses import asdict, dataclass, field
+import hashlib
+import json
+from pathlib import Path, PurePosixPath
+import re
+import sys
+
+from second_opinion.components import COMPONENTS_PATH, component_tags, load_components, resolve_repo
+
+# File extension -> taxonomy lang tag.
+LANGUAGES = {
+    ".go": "lang:go",
+    ".c": "lang:cpp",
+    ".cc": "lang:cpp",
+    ".cpp": "lang:cpp",
+    ".cxx": "lang:cpp",
+    ".h": "lang:cpp",
+    ".hh": "lang:cpp",
+    ".hpp": "lang:cpp",
+    ".rs": "lang:rust",
+    ".sql": "lang:sql",
+}
+
+_HUNK = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+@dataclass
+class FileDiff:
+    path: str
+    header: list = field(default_factory=list)
+    hunks: list = field(default_factory=list)
+
+    def text(self, hunks=None):
+        """Render the file section, optionally restricted to some hunks."""
+        chosen = self.hunks if hunks is None else hunks
+        return "".join(self.header) + "".join("".join(hunk) for hunk in chosen)
+
+
+@dataclass
+class FileRecord:
+    path: str
+    old_path: str
+    status: str = "modified"
+    language: str = None
+    hunks: int = 0
+    additions: int = 0
+    deletions: int = 0
+    # [start, end] line ranges in the new (added) and old (removed) file.
+    added: list = field(default_factory=list)
+    removed: list = field(default_factory=list)
+    binary: bool = False
+
+    def to_dict(self):
+        return asdict(self)
+
+
+def language_of(path):
+    return LANGUAGES.get(PurePosixPath(path).suffix.lower())
+
+
+def _path_from_header(line):
+    parts = line.rstrip("\n").split(" b/", 1)
+    return parts[1] if len(parts) == 2 else line.rstrip("\n")[len("diff --git "):]
+
+
+def _old_path_from_header(line):
+    rest = line.rstrip("\n")[len("diff --git "):]
+    if rest.startswith("a/") and " b/" in rest:
+        return rest[2:].split(" b/", 1)[0]
+    return _path_from_header(line)
+
+
+def iter_file_diffs(lines):
+    """Yield one FileDiff per `diff --git` section of an iterable of lines.
+
+    Lines must keep their line endings; anything before the first section
+    (for example a `git show` commit header) is skipped.
+    """
+    current = None
+    for line in lines:
+        if line.startswith("diff --git "):
+            if current is not None:
+                yield current
+            current = FileDiff(path=_path_from_header(line), header=[line])
+            continue
+        if current is None:
+            continue
+        if line.startswith("@@"):
+            current.hunks.append([line])
+        elif current.hunks:
+            current.hunks[-1].append(line)
+        else:
+            current.header.append(line)
+    if current is not None:
+        yield current
+
+
+def hunk_new_range(hunk):
+    """Return the (start, end) post-image lines a hunk covers."""
+    match = _HUNK.match(hunk[0])
+    start = int(match.group(3)) if match else 1
+    length = sum(1 for line in hunk[1:] if not line.startswith(("-", "\\")))
+    return start, start + max(length, 1) - 1
+
+
+def hunk_old_range(hunk):
+    """Return the (start, end) pre-image lines a hunk covers."""
+    match = _HUNK.match(hunk[0])
+    start = int(match.group(1)) if match else 1
+    length = sum(1 for line in hunk[1:] if not line.startswith(("+", "\\")))
+    return start, start + max(length, 1) - 1
+
+
+def hunk_changed_range(hunk, old=False):
+    """Return the (first, last) lines the hunk's +/- lines touch.
+
+    Lines are post-image numbers, or pre-image numbers with old=True; a
+    removal (or, pre-image, an addition) counts as the line it sits before.
+    """
+    match = _HUNK.match(hunk[0])
+    old_line = int(match.group(1)) if match else 1
+    new_line = int(match.group(3)) if match else 1
+    touched = []
+    for line in hunk[1:]:
+        if line.startswith("+"):
+            touched.append(old_line if old else new_line)
+            new_line += 1
+        elif line.startswith("-"):
+            touched.append(old_line if old else new_line)
+            old_line += 1
+        elif not line.startswith("\\"):
+            old_line += 1
+            new_line += 1
+    if not touched:
+        start = int(match.group(1 if old else 3)) if match else 1
+        return start, start
+    return min(touched), max(touched)
+
+
+def hunk_hash(hunk):
+    """Hash a hunk's body, ignoring its @@ header and trailing whitespace.
+
+    Hunks that only moved (different line numbers, same content) hash equal.
+    """
+    body = "\n".join(line.rstrip() for line in hunk[1:])
+    return hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+
+def _extend(ranges, line):
+    if ranges and ranges[-1][1] == line - 1:
+        ranges[-1][1] = line
+    else:
+        ranges.append([line, line])
+
+
+def parse_diff(lines):
+    """Yield a FileRecord per file, reading lines one at a time.
+
+    Only counters and line ranges are kept, so memory stays proportional to
+    the number of changed ranges rather than the diff size.
+    """
+    record = None
+    old_line = new_line = 0
+    in_hunk = False
+    for line in lines:
+        if line.startswith("diff --git "):
+            if record is not None:
+                yield record
+            path = _path_from_header(line)
+            record = FileRecord(path=path, old_path=_old_path_from_header(line), language=language_of(path))
+            in_hunk = False
+            continue
+        if record is None:
+            continue
+        if line.startswith("@@"):
+            match = _HUNK.match(line)
+            old_line = int(match.group(1)) if match else 1
+            new_line = int(match.group(3)) if match else 1
+            record.hunks += 1
+            in_hunk = True
+            continue
+        if not in_hunk:
+            if line.startswith("new file mode"):
+                record.status = "added"
+            elif line.startswith("deleted file mode"):
+                record.status = "deleted"
+            elif line.startswith("rename from "):
+                record.status = "renamed"
+                record.old_path = line[len("rename from "):].rstrip("\n")
+            elif line.startswith("Binary files ") or line.startswith("GIT binary patch"):
+                record.binary = True
+            continue
+        if line.startswith("+"):
+            _extend(record.added, new_line)
+            record.additions += 1
+            new_line += 1
+        elif line.startswith("-"):
+            _extend(record.removed, old_line)
+            record.deletions += 1
+            old_line += 1
+        elif line.startswith("\\"):
+            continue
+        else:
+            old_line += 1
+            new_line += 1
+    if record is not None:
+        yield record
+
+
+def changed_files(diff_text):
+    """Return the post-image paths listed in `diff --git` headers."""
+    files = []
+    for file_diff in iter_file_diffs(diff_text.splitlines(keepends=True)):
+        if file_diff.path not in files:
+            files.append(file_diff.path)
+    return files
+
+
+def lang_tags(records):
+    """Return {lang tag: changed file count} in first-seen order."""
+    counts = {}
+    for record in records:
+        if record.language:
+            counts[record.language] = counts.get(record.language, 0) + 1
+    return counts
+
+
+def mechanical_selection(records, components=None):
+    """Build the mechanical part of tagger.json.
+
+    Emits one signal per file plus lang tags and, when given
+    ComponentMatcher.classify() output, path-derived component tags.
+    """
+    records = list(records)
+    signals = []
+    for record in records:
+        kind = record.language.split(":", 1)[1] if record.language else "file"
+        signals.append(
+            {
+                "evidence": record.path,
+                "reason": (
+                    f"{record.status} {kind} file: +{record.additions}/-{record.deletions} "
+                    f"in {record.hunks} hunk(s)"
+                ),
+            }
+        )
+    tags = [
+        {"tag": tag, "why": f"{count} changed file(s) in this language"}
+        for tag, count in lang_tags(records).items()
+    ]
+    tags.extend(component_tags(components or {}))
+    return {"signals": signals, "tags": tags}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("diff", help="diff file, or - for stdin")
+    parser.add_argument("--records", help="also write per-file records as JSON lines here")
+    parser.add_argument("--components", default=str(COMPONENTS_PATH), help="path-to-component rule table")
+    parser.add_argument("--no-components", action="store_true", help="skip component tagging")
+    parser.add_argument("--repo-name", help="reviewed repository (tidb, pd, ...) for component rules")
+    parser.add_argument("--repo", help="checkout to detect the repository from when --repo-name is not given")
+    parser.add_argument("--unmatched", help="write paths no component rule covers here (JSON)")
+    parser.add_argument("-o", "--output", help="write the selection JSON here instead of stdout")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    handle = sys.stdin if args.diff == "-" else Path(args.diff).open("r", encoding="utf-8")
+    try:
+        records = list(parse_diff(handle))
+    finally:
+        if handle is not sys.stdin:
+            handle.close()
+    if args.records:
+        with Path(args.records).open("w", encoding="utf-8") as out:
+            for record in records:
+                out.write(json.dumps(record.to_dict()) + "\n")
+    by_tag, unmatched = {}, [record.path for record in records]
+    if not args.no_components:
+        repo = resolve_repo(args.repo_name, args.repo, args.components)
+        by_tag, unmatched = load_components(args.components, repo=repo).classify(unmatched)
+    if args.unmatched:
+        Path(args.unmatched).write_text(json.dumps(unmatched, indent=2) + "\n", encoding="utf-8")
+    text = json.dumps(mechanical_selection(records, by_tag), indent=2) + "\n"
+    if args.output:
+        Path(args.output).write_text(text, encoding="utf-8")
+    else:
+        sys.stdout.write(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,280 @@
+"""Pre-review filtering of generated, vendored and mechanical file changes.
+
+Regenerated files (vectorized builtins, parser output, protobuf, mocks),
+vendored dependencies and lock files, pure renames/moves and whitespace-only
+edits are kept out of the reviewer input: each such file keeps its
+`diff --git` header, minus the ---/+++ lines, followed by one summary line
+instead of its hunks. The file still counts toward min_files and still
+yields its lang/component tags and applies_to path matches; only the hunk
+text is dropped. Rules live in filters.yaml.
+
+Usage:
+    python -m second_opinion.diff_filter change.diff -o reviewed.diff --summary filtered.json
+    git show <ref> | python -m second_opinion.diff_filter - --repo ../tidb
+"""
+
+import argparse
+from dataclasses import asdict, dataclass, field
+import hashlib
+import json
+from pathlib import Path
+import re
+import sys
+
+from second_opinion import trace
+from second_opinion.assets import REPO_ROOT, parse_meta
+from second_opinion.diff import LANGUAGES, hunk_new_range, iter_file_diffs, language_of
+from second_opinion.globs import GlobSet
+
+FILTERS_PATH = REPO_ROOT / "filters.yaml"
+DEFAULT_MARKER_LINES = 5
+SUMMARY_PREFIX = "filtered: "
+# Languages where indentation and line layout never change meaning.
+WHITESPACE_LANGUAGES = tuple(sorted(set(LANGUAGES.values())))
+_TOKEN = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|`[^`]*`|\w+|[^\w\s]')
+
+
+@dataclass
+class FilteredFile:
+    path: str
+    reason: str
+    detail: str
+    hunks: int = 0
+    additions: int = 0
+    deletions: int = 0
+
+    def summary_line(self):
+        return (f"{SUMMARY_PREFIX}{self.reason} ({self.detail}), "
+                f"+{self.additions}/-{self.deletions} in {self.hunks} hunk(s)\n")
+
+    def to_dict(self):
+        return asdict(self)
+
+
+@dataclass
+class FilterResult:
+    text: str
+    filtered: list = field(default_factory=list)
+    bytes_in: int = 0
+    bytes_out: int = 0
+
+    def summary(self):
+        return {
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "filtered": [item.to_dict() for item in self.filtered],
+        }
+
+
+def _tokens(line):
+    """A diff line's tokens: literals verbatim, whitespace outside them ignored.
+
+    Whitespace between two words still separates them, so `a b` and `ab` differ.
+    """
+    return tuple(_TOKEN.findall(line[1:]))
+
+
+def _whitespace_only(hunk):
+    """True when the hunk's pre- and post-image match in order, token for token.
+
+    Context lines stay in both sequences, so moving a line past another is a change.
+    """
+    old = [tokens for tokens in (_tokens(line) for line in hunk[1:] if not line.startswith(("+", "\\"))) if tokens]
+    new = [tokens for tokens in (_tokens(line) for line in hunk[1:] if not line.startswith(("-", "\\"))) if tokens]
+    return old == new
+
+
+def _counts(file_diff):
+    lines = [line for hunk in file_diff.hunks for line in hunk[1:]]
+    return (len(file_diff.hunks), sum(1 for line in lines if line.startswith("+")),
+            sum(1 for line in lines if line.startswith("-")))
+
+
+def _header_flags(file_diff):
+    return {
+        "added": any(line.startswith("new file mode") for line in file_diff.header),
+        "deleted": any(line.startswith("deleted file mode") for line in file_diff.header),
+        "renamed": any(line.startswith("rename from ") for line in file_diff.header),
+        "identical": any(line.startswith("similarity index 100%") for line in file_diff.header),
+    }
+
+
+def _body_hash(file_diff, sign):
+    """Hash of a whole-file addition or removal, or None when the file has other lines."""
+    body = []
+    for hunk in file_diff.hunks:
+        for line in hunk[1:]:
+            if line.startswith("\\"):
+                continue
+            if not line.startswith(sign):
+                return None
+            body.append(line[1:].rstrip())
+    return hashlib.sha256("\n".join(body).encode("utf-8")).hexdigest() if body else None
+
+
+class DiffFilter:
+    def __init__(self, generated=(), vendored=(), markers=(), marker_lines=DEFAULT_MARKER_LINES,
+                 renames=True, whitespace=True, whitespace_languages=WHITESPACE_LANGUAGES):
+        self.generated = GlobSet(generated)
+        self.vendored = GlobSet(vendored)
+        self.markers = tuple(re.compile(marker) for marker in markers)
+        self.marker_lines = marker_lines
+        self.renames = renames
+        self.whitespace = whitespace
+        self.whitespace_languages = frozenset(whitespace_languages)
+
+    def _marker(self, file_diff, head_lines=None):
+        """The generated-code marker found near the top of the file, if any."""
+        top = list(head_lines or ())[:self.marker_lines]
+        # A deleted file is judged by its removed lines, anything else by its post-image.
+        dropped = ("+", "\\") if _header_flags(file_diff)["deleted"] else ("-", "\\")
+        for hunk in file_diff.hunks:
+            number = hunk_new_range(hunk)[0] if dropped[0] == "-" else 1
+            for line in hunk[1:]:
+                if number > self.marker_lines:
+                    break
+                if line.startswith(dropped):
+                    continue
+                top.append(line[1:])
+                number += 1
+        for line in top:
+            for marker in self.markers:
+                if marker.search(line):
+                    return marker.pattern
+        return None
+
+    def classify(self, file_diff, head_lines=None):
+        """(reason, detail) for a file the reviewer should not see in full, or None.
+
+        head_lines, when given, are the first lines of the post-image file, for
+        markers the hunks do not reach.
+        """
+        for reason, globs in (("vendored", self.vendored), ("generated", self.generated)):
+            patterns = globs.which(file_diff.path)
+            if patterns:
+                return reason, f"path matches {patterns[0]}"
+        if self.markers:
+            marker = self._marker(file_diff, head_lines)
+            if marker:
+                return "generated", f"header matches {marker!r}"
+        flags = _header_flags(file_diff)
+        if self.renames and flags["renamed"] and (flags["identical"] or not file_diff.hunks):
+            return "rename", "content unchanged"
+        if (self.whitespace and file_diff.hunks and not flags["added"] and not flags["deleted"]
+                and language_of(file_diff.path) in self.whitespace_languages):
+            if all(_whitespace_only(hunk) for hunk in file_diff.hunks):
+                return "whitespace", "only whitespace changed"
+        return None
+
+    def _moves(self, file_diffs, reasons):
+        """Pair whole-file deletions with identical whole-file additions."""
+        if not self.renames:
+            return
+        deleted = {}
+        for file_diff in file_diffs:
+            if file_diff.path not in reasons and _header_flags(file_diff)["deleted"]:
+                digest = _body_hash(file_diff, "-")
+                if digest:
+                    deleted.setdefault(digest, []).append(file_diff.path)
+        for file_diff in file_diffs:
+            if file_diff.path in reasons or not _header_flags(file_diff)["added"]:
+                continue
+            sources = deleted.get(_body_hash(file_diff, "+"))
+            if sources:
+                source = sources.pop(0)
+                reasons[source] = ("move", f"moved to {file_diff.path}")
+                reasons[file_diff.path] = ("move", f"moved from {source}")
+
+    def apply(self, diff_text, read_head=None):
+        """Filter a diff; read_head(path) may return the post-image's first lines."""
+        with trace.span("diff_filter", cat="diff") as attrs:
+            lines = diff_text.splitlines(keepends=True)
+            preamble = []
+            for line in lines:
+                if line.startswith("diff --git "):
+                    break
+                preamble.append(line)
+            file_diffs = list(iter_file_diffs(lines))
+            reasons = {}
+            for file_diff in file_diffs:
+                head = read_head(file_diff.path) if read_head and self.markers else None
+                found = self.classify(file_diff, head)
+                if found:
+                    reasons[file_diff.path] = found
+            self._moves(file_diffs, reasons)
+
+            parts = ["".join(preamble)]
+            filtered = []
+            for file_diff in file_diffs:
+                if file_diff.path not in reasons:
+                    parts.append(file_diff.text())
+                    continue
+                reason, detail = reasons[file_diff.path]
+                item = FilteredFile(file_diff.path, reason, detail, *_counts(file_diff))
+                filtered.append(item)
+                header = [line for line in file_diff.header if not line.startswith(("--- ", "+++ "))]
+                parts.append("".join(header) + item.summary_line())
+            text = "".join(parts)
+            result = FilterResult(text, filtered, len(diff_text.encode("utf-8")), len(text.encode("utf-8")))
+            attrs.update(files=len(file_diffs), filtered=len(filtered), bytes_in=result.bytes_in,
+                         bytes_out=result.bytes_out)
+        return result
+
+
+def load_filters(path=FILTERS_PATH):
+    """DiffFilter from a filters.yaml rule file."""
+    table = parse_meta(Path(path).read_text(encoding="utf-8")) or {}
+    generated = table.get("generated") or {}
+    vendored = table.get("vendored") or {}
+    return DiffFilter(
+        generated=[str(pattern) for pattern in generated.get("paths") or ()],
+        vendored=[str(pattern) for pattern in vendored.get("paths") or ()],
+        markers=[str(marker) for marker in generated.get("markers") or ()],
+        marker_lines=int(generated.get("marker_lines", DEFAULT_MARKER_LINES)),
+        renames=bool(table.get("renames", True)),
+        whitespace=bool(table.get("whitespace", True)),
+        whitespace_languages=[str(lang) for lang in table.get("whitespace_languages") or WHITESPACE_LANGUAGES],
+    )
+
+
+def working_tree_reader(repo, count):
+    """read_head() returning the first count lines of files in a checkout."""
+    repo = Path(repo)
+
+    def read_head(path):
+        try:
+            with (repo / path).open("r", encoding="utf-8", errors="replace") as handle:
+                return [handle.readline() for _ in range(count)]
+        except OSError:
+            return None
+
+    return read_head
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("diff", help="diff file, or - for stdin")
+    parser.add_argument("--filters", default=str(FILTERS_PATH), help="filter rule file")
+    parser.add_argument("--repo", help="checkout to read file headers from for marker detection")
+    parser.add_argument("--summary", help="write the filtered-file entries here (JSON)")
+    parser.add_argument("-o", "--output", help="write the filtered diff here instead of stdout")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    diff_text = sys.stdin.read() if args.diff == "-" else Path(args.diff).read_text(encoding="utf-8")
+    rules = load_filters(args.filters)
+    read_head = working_tree_reader(args.repo, rules.marker_lines) if args.repo else None
+    result = rules.apply(diff_text, read_head)
+    if args.summary:
+        Path(args.summary).write_text(json.dumps(result.summary(), indent=2) + "\n", encoding="utf-8")
+    if args.output:
+        Path(args.output).write_text(result.text, encoding="utf-8")
+    else:
+        sys.stdout.write(result.text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,248 @@
+"""BM25 retrieval over a reviewed repo's docs/agents/*/*.md domain knowledge.
+
+Docs are split into passages at markdown headings (long sections also at
+blank lines) and indexed on disk with per-file mtime/size invalidation, so a
+query after a doc edit only re-reads that doc. A query is built from the
+diff's changed paths, the identifiers on its changed lines and the selected
+tags; the best-scoring passages are kept up to a byte cap and appended to
+compiler.json as a final "docs" prompt segment, with one provenance entry
+per injected passage.
+
+Usage:
+    python -m second_opinion.docs_index query --repo ../tidb --diff change.diff --tags tagger.json
+    python -m second_opinion.docs_index attach --repo ../tidb --diff change.diff --compiler compiler.json \\
+        -o compiler.json
+"""
+
+import argparse
+from collections import Counter
+from dataclasses import dataclass
+import hashlib
+import json
+import math
+from pathlib import Path
+import re
+import sys
+
+from second_opinion.applicability import changed_lines
+from second_opinion.compiler import join_segments, read_tags, segment_digests
+from second_opinion.diff import changed_files
+from second_opinion.index import default_cache_dir, write_json_atomic
+
+DOCS_GLOB = "docs/agents/*/*.md"
+DOCS_VERSION = 1
+DEFAULT_TOP_K = 5
+DEFAULT_MAX_BYTES = 8 * 1024
+PASSAGE_BYTES = 1500
+MAX_IDENTIFIERS = 64
+K1 = 1.2
+B = 0.75
+
+_HEADING = re.compile(r"^#{1,6}\s")
+_WORD = re.compile(r"[A-Za-z][A-Za-z0-9_]+")
+_CAMEL = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from if in is it of on or that the this to with "
+    "func return nil err var const type package import else for range go true false int string".split()
+)
+
+
+@dataclass(frozen=True)
+class Passage:
+    path: str
+    heading: str
+    start: int
+    end: int
+    text: str
+    score: float = 0.0
+
+    @property
+    def ref(self):
+        return f"{self.path}#L{self.start}-L{self.end}"
+
+
+def tokenize(text):
+    """Lowercase word tokens; camelCase and snake_case words also yield their parts."""
+    tokens = []
+    for word in _WORD.findall(text):
+        lowered = word.lower()
+        if lowered not in STOPWORDS:
+            tokens.append(lowered)
+        parts = [part.lower() for piece in word.split("_") for part in _CAMEL.findall(piece)]
+        if len(parts) > 1:
+            tokens.extend(part for part in parts if len(part) > 1 and part not in STOPWORDS)
+    return tokens
+
+
+def split_passages(text):
+    """(heading, start line, end line, text) passages of one markdown doc."""
+    passages = []
+    heading, start, lines, size = "", 1, [], 0
+
+    def flush(end):
+        body = "".join(lines).strip()
+        if body:
+            passages.append((heading, start, end, body))
+
+    for number, line in enumerate(text.splitlines(keepends=True), 1):
+        if _HEADING.match(line) or (size >= PASSAGE_BYTES and not line.strip()):
+            flush(number - 1)
+            if _HEADING.match(line):
+                heading = line.strip("# \n")
+            start, lines, size = number, [], 0
+        lines.append(line)
+        size += len(line.encode("utf-8"))
+    flush(start + len(lines) - 1)
+    return passages
+
+
+class DocsIndex:
+    def __init__(self, repo, cache_dir=None):
+        self.repo = Path(repo).resolve()
+        cache_dir = Path(cache_dir) if cache_dir else default_cache_dir()
+        key = hashlib.sha256(str(self.repo).encode("utf-8")).hexdigest()[:16]
+        self.path = cache_dir / f"docs-{key}.json"
+        self.passages = []
+        self.reparsed = []
+        self._tf = []
+        self._df = Counter()
+        self._avg_length = 0.0
+
+    def _read(self):
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        return data.get("files", {}) if data.get("version") == DOCS_VERSION else {}
+
+    def load(self):
+        """Refresh the entries of docs whose mtime or size changed; return self."""
+        cached = self._read()
+        files = {}
+        self.reparsed = []
+        for doc in sorted(self.repo.glob(DOCS_GLOB)):
+            rel = doc.relative_to(self.repo).as_posix()
+            stat = doc.stat()
+            entry = cached.get(rel)
+            if not entry or entry["mtime_ns"] != stat.st_mtime_ns or entry["size"] != stat.st_size:
+                entry = {
+                    "mtime_ns": stat.st_mtime_ns,
+                    "size": stat.st_size,
+                    "passages": [
+                        {"heading": heading, "start": start, "end": end, "text": body,
+                         "tf": Counter(tokenize(f"{heading}\n{body}"))}
+                        for heading, start, end, body in split_passages(doc.read_text(encoding="utf-8"))
+                    ],
+                }
+                self.reparsed.append(rel)
+            files[rel] = entry
+        if self.reparsed or set(files) != set(cached):
+            write_json_atomic(self.path, {"version": DOCS_VERSION, "repo": str(self.repo), "files": files})
+
+        self.passages, self._tf, self._df = [], [], Counter()
+        for rel, entry in files.items():
+            for item in entry["passages"]:
+                self.passages.append(Passage(rel, item["heading"], item["start"], item["end"], item["text"]))
+                self._tf.append(item["tf"])
+                self._df.update(item["tf"].keys())
+        lengths = [sum(tf.values()) for tf in self._tf]
+        self._avg_length = sum(lengths) / len(lengths) if lengths else 0.0
+        return self
+
+    def search(self, terms, k=DEFAULT_TOP_K, max_bytes=DEFAULT_MAX_BYTES):
+        """Best BM25 passages for terms, at most k and max_bytes of text in total."""
+        terms = [term for term in dict.fromkeys(terms) if term in self._df]
+        count = len(self.passages)
+        idf = {term: math.log(1 + (count - self._df[term] + 0.5) / (self._df[term] + 0.5)) for term in terms}
+        scored = []
+        for position, tf in enumerate(self._tf):
+            length = sum(tf.values())
+            norm = K1 * (1 - B + B * length / self._avg_length) if self._avg_length else K1
+            score = sum(idf[t] * tf[t] * (K1 + 1) / (tf[t] + norm) for t in terms if t in tf)
+            if score > 0:
+                scored.append((-score, position))
+        scored.sort()
+        chosen = []
+        used = 0
+        for negative, position in scored:
+            passage = self.passages[position]
+            size = len(passage.text.encode("utf-8"))
+            if used + size > max_bytes:
+                continue
+            chosen.append(Passage(**{**passage.__dict__, "score": round(-negative, 3)}))
+            used += size
+            if len(chosen) == k:
+                break
+        return chosen
+
+
+def query_terms(diff_text, tags=()):
+    """Search terms from changed paths, identifiers on changed lines and tags."""
+    terms = []
+    for path in changed_files(diff_text):
+        terms.extend(tokenize(path.replace("/", " ").replace(".", " ")))
+    identifiers = Counter(tokenize(changed_lines(diff_text)))
+    terms.extend(term for term, _ in identifiers.most_common(MAX_IDENTIFIERS))
+    for tag in tags:
+        terms.extend(tokenize(tag.split(":", 1)[-1].replace("/", " ")))
+    return list(dict.fromkeys(terms))
+
+
+def render_passages(passages):
+    blocks = [f"## {passage.ref} ({passage.heading or 'untitled'})\n\n{passage.text}" for passage in passages]
+    return "# Domain knowledge\n\n" + "\n\n".join(blocks)
+
+
+def attach_docs(compiled, passages):
+    """Return compiler.json with the passages appended as the final "docs" segment."""
+    if not passages:
+        return compiled
+    segment = render_passages(passages)
+    result = dict(compiled)
+    result["compiled_prompt"] = join_segments([compiled["compiled_prompt"].rstrip("\n"), segment])
+    if "prompt_segments" in compiled:
+        result["prompt_segments"] = list(compiled["prompt_segments"]) + segment_digests([("docs", segment)])
+    result["provenance"] = list(compiled["provenance"]) + [
+        {"doc": passage.ref, "reason": f"retrieved: bm25 {passage.score}"} for passage in passages
+    ]
+    return result
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name, help_text in (("query", "print the passages retrieved for a diff"),
+                            ("attach", "append retrieved passages to compiler.json")):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument("--repo", required=True, help="reviewed repository holding docs/agents/")
+        command.add_argument("--diff", required=True, help="diff to retrieve passages for")
+        command.add_argument("--tags", help="tagger.json whose tags join the query")
+        command.add_argument("-k", "--top-k", type=int, default=DEFAULT_TOP_K, help="passages to keep")
+        command.add_argument("--max-bytes", type=int, default=DEFAULT_MAX_BYTES, help="byte cap for passages")
+        command.add_argument("--cache-dir", help="docs index directory")
+        command.add_argument("-o", "--output", help="write here instead of stdout")
+        if name == "attach":
+            command.add_argument("--compiler", required=True, help="compiler.json to extend")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    diff_text = Path(args.diff).read_text(encoding="utf-8")
+    tags = read_tags(args.tags) if args.tags else []
+    index = DocsIndex(args.repo, args.cache_dir).load()
+    passages = index.search(query_terms(diff_text, tags), args.top_k, args.max_bytes)
+    if args.command == "query":
+        payload = [passage.__dict__ | {"ref": passage.ref} for passage in passages]
+    else:
+        payload = attach_docs(json.loads(Path(args.compiler).read_text(encoding="utf-8")), passages)
+    text = json.dumps(payload, indent=2) + "\n"
+    if args.output:
+        Path(args.output).write_text(text, encoding="utf-8")
+    else:
+        sys.stdout.write(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
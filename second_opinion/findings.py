@@ -0,0 +1,133 @@
+"""Helpers for review.json findings."""
+
+import heapq
+import re
+
+_NUMBER = re.compile(r"\d+")
+_WORD = re.compile(r"\w+")
+
+SEVERITY_ORDER = {"low": 0, "medium": 1, "high": 2, "critical": 3}
+DEFAULT_SIMILARITY = 0.5
+
+
+def line_range(lines):
+    """Parse a finding's lines field ("L10-L25", "L42", "1-5") into (start, end).
+
+    Returns (0, 0) when no line number is present.
+    """
+    numbers = [int(n) for n in _NUMBER.findall(lines or "")]
+    if not numbers:
+        return 0, 0
+    return numbers[0], max(numbers[0], numbers[-1])
+
+
+def finding_key(finding):
+    source = finding.get("source") or {}
+    return (finding.get("file"), finding.get("lines"), source.get("type"), source.get("id"))
+
+
+def merge_reviews(reviews):
+    """Merge review.json payloads, deduplicating findings by (file, lines, source).
+
+    The first occurrence wins, and the result is sorted by file, start line and
+    source so the merge does not depend on shard completion order.
+    """
+    merged = {}
+    for review in reviews:
+        for finding in review.get("findings", []):
+            merged.setdefault(finding_key(finding), finding)
+    findings = sorted(
+        merged.values(),
+        key=lambda f: (
+            f.get("file") or "",
+            line_range(f.get("lines"))[0],
+            f.get("lines") or "",
+            (f.get("source") or {}).get("type") or "",
+            (f.get("source") or {}).get("id") or "",
+        ),
+    )
+    return {"findings": findings}
+
+
+def _words(message):
+    return frozenset(word.lower() for word in _WORD.findall(message or ""))
+
+
+def similarity(a, b):
+    """Jaccard similarity of two word sets."""
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def _sources(finding):
+    found = [finding.get("source") or {}]
+    found.extend(finding.get("sources") or ())
+    return found
+
+
+def _merge_cluster(cluster):
+    if len(cluster) == 1:
+        return cluster[0]
+    # Highest severity wins; ties keep the earliest finding.
+    lead = max(cluster, key=lambda f: SEVERITY_ORDER.get(f.get("severity"), -1))
+    ranges = [line_range(f.get("lines")) for f in cluster]
+    start, end = min(r[0] for r in ranges), max(r[1] for r in ranges)
+    tags = []
+    sources = []
+    for finding in [lead] + [f for f in cluster if f is not lead]:
+        tags.extend(tag for tag in finding.get("tags") or () if tag not in tags)
+        sources.extend(s for s in _sources(finding) if s and s not in sources)
+    merged = dict(lead, tags=tags)
+    # Members without line numbers only cluster with each other; keep the lead's lines as given.
+    if start:
+        merged["lines"] = f"L{start}" if start == end else f"L{start}-L{end}"
+    merged.pop("sources", None)
+    if len(sources) > 1:
+        merged["sources"] = sources
+    return merged
+
+
+def dedupe_findings(findings, threshold=DEFAULT_SIMILARITY):
+    """Merge near-duplicate findings: same file, overlapping lines, similar message.
+
+    Findings are swept per file in start-line order while a heap keyed by
+    range end keeps only the clusters that can still overlap, so the work is
+    near-linear in the number of findings. A merged finding has the union of
+    line ranges and tags, the highest severity, the message and source of its
+    most severe member, and every member's source in `sources`.
+    """
+    by_file = {}
+    for position, finding in enumerate(findings):
+        start, end = line_range(finding.get("lines"))
+        by_file.setdefault(finding.get("file") or "", []).append((start, end, position, finding))
+
+    clusters = []
+    for entries in by_file.values():
+        entries.sort(key=lambda entry: entry[:3])
+        active = []
+        for start, end, position, finding in entries:
+            while active and active[0][0] < start:
+                heapq.heappop(active)
+            words = _words(finding.get("message"))
+            for entry in active:
+                cluster = clusters[entry[1]]
+                if similarity(cluster["words"], words) >= threshold:
+                    cluster["members"].append((position, finding))
+                    if end > entry[0]:
+                        entry[0] = end
+                        heapq.heapify(active)
+                    break
+            else:
+                clusters.append({"words": words, "members": [(position, finding)]})
+                heapq.heappush(active, [end, len(clusters) - 1])
+
+    merged = []
+    for cluster in clusters:
+        members = sorted(cluster["members"], key=lambda member: member[0])
+        merged.append((members[0][0], _merge_cluster([finding for _, finding in members])))
+    return [finding for _, finding in sorted(merged, key=lambda item: item[0])]
+
+
+def dedupe_review(review, threshold=DEFAULT_SIMILARITY):
+    return dict(review, findings=dedupe_findings(review.get("findings", []), threshold))
@@ -0,0 +1,53 @@
+"""Path glob compilation shared by the path-based matchers.
+
+`*` and `?` stay within one path segment, `**` spans segments.
+"""
+
+import re
+
+
+def glob_to_regex(pattern):
+    """Translate a path glob into an anchored regular expression string."""
+    out = []
+    index = 0
+    while index < len(pattern):
+        char = pattern[index]
+        if pattern.startswith("**/", index):
+            out.append("(?:.*/)?")
+            index += 3
+            continue
+        if pattern.startswith("**", index):
+            out.append(".*")
+            index += 2
+            continue
+        if char == "*":
+            out.append("[^/]*")
+        elif char == "?":
+            out.append("[^/]")
+        else:
+            out.append(re.escape(char))
+        index += 1
+    return "".join(out)
+
+
+def has_wildcard(pattern):
+    return any(char in pattern for char in "*?")
+
+
+class GlobSet:
+    """Several globs compiled into one regex for a single-pass any-match test."""
+
+    def __init__(self, patterns):
+        self.patterns = list(patterns)
+        self._each = [re.compile(f"^{glob_to_regex(p)}$") for p in self.patterns]
+        self._any = re.compile("|".join(f"(?:^{glob_to_regex(p)}$)" for p in self.patterns)) \
+            if self.patterns else None
+
+    def matches(self, path):
+        return self._any is not None and self._any.match(path) is not None
+
+    def which(self, path):
+        """Return the patterns that match path, in declaration order."""
+        if not self.matches(path):
+            return []
+        return [pattern for pattern, regex in zip(self.patterns, self._each) if regex.match(path)]
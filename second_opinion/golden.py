@@ -0,0 +1,173 @@
+"""Golden regression runner over examples/<case>/ directories.
+
+Each case holds patch.diff plus the golden tagger.json, compiler.json and
+review.json (and optionally case.json with compile options: budget, focus,
+process, root, include_samples, max_tokens, and the repo that scopes the
+component table). Stages are replayed as far as they can be offline:
+
+- tagger: the mechanical tags derived from patch.diff must all be present in
+  the golden tagger.json (the model adds semantic tags on top).
+- compiler: recompiled from the golden tags and compared structurally with
+  the golden compiler.json.
+- reviewer: the golden review.json must validate against the recompiled
+  compiler output; the model itself is not replayed.
+
+Cases run across a process pool; each worker loads every asset tree once.
+The sample examples/foo case is a format reference and is skipped unless
+--include-samples is given.
+
+Usage:
+    python -m second_opinion.golden --workers 8
+    python -m second_opinion.golden --update
+"""
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import json
+import os
+from pathlib import Path
+import sys
+
+from second_opinion.applicability import changed_lines
+from second_opinion.assets import REPO_ROOT, SAMPLE_ID
+from second_opinion.compiler import compile_review, read_tags
+from second_opinion.components import load_components
+from second_opinion.diff import lang_tags, mechanical_selection, parse_diff
+from second_opinion.index import load_index
+from second_opinion.taxonomy import load_taxonomy
+from second_opinion.validate import Validator
+
+EXAMPLES_DIR = REPO_ROOT / "examples"
+CASE_FILES = ("patch.diff", "tagger.json", "compiler.json", "review.json")
+
+_workers = {}
+
+
+def discover_cases(examples=EXAMPLES_DIR, include_samples=False):
+    """Case directories holding every golden file, sorted by name."""
+    cases = []
+    for path in sorted(Path(examples).iterdir()):
+        if not path.is_dir() or (path.name == SAMPLE_ID and not include_samples):
+            continue
+        if all((path / name).is_file() for name in CASE_FILES):
+            cases.append(path)
+    return cases
+
+
+def json_diff(expected, actual, path="$"):
+    """Structural differences between two JSON values, as readable strings."""
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        diffs = [f"{path}.{key}: missing" for key in expected if key not in actual]
+        diffs.extend(f"{path}.{key}: unexpected" for key in actual if key not in expected)
+        for key in expected:
+            if key in actual:
+                diffs.extend(json_diff(expected[key], actual[key], f"{path}.{key}"))
+        return diffs
+    if isinstance(expected, list) and isinstance(actual, list):
+        diffs = []
+        for index, (want, got) in enumerate(zip(expected, actual)):
+            diffs.extend(json_diff(want, got, f"{path}[{index}]"))
+        if len(expected) != len(actual):
+            diffs.append(f"{path}: expected {len(expected)} items, got {len(actual)}")
+        return diffs
+    if isinstance(expected, str) and isinstance(actual, str) and "\n" in expected + actual:
+        if expected == actual:
+            return []
+        want, got = expected.splitlines(), actual.splitlines()
+        line = next((i for i, (a, b) in enumerate(zip(want, got)) if a != b), min(len(want), len(got)))
+        return [f"{path}: differs at line {line + 1}"]
+    if expected != actual or type(expected) is not type(actual):
+        return [f"{path}: expected {json.dumps(expected)}, got {json.dumps(actual)}"]
+    return []
+
+
+def _context(root, include_samples, repo=None):
+    """Per-process assets, validator and component table for one asset root and repository."""
+    key = (str(root), include_samples, repo)
+    if key not in _workers:
+        assets = load_index(root, include_samples=include_samples)
+        _workers[key] = (assets, Validator(assets, load_taxonomy()), load_components(repo=repo))
+    return _workers[key]
+
+
+def _load(path):
+    return json.loads(Path(path).read_text(encoding="utf-8"))
+
+
+def run_case(case, update=False):
+    """Replay one case and return {"case", "failures": {stage: [diffs]}}."""
+    case = Path(case)
+    options = _load(case / "case.json") if (case / "case.json").is_file() else {}
+    root = REPO_ROOT / options.get("root", ".")
+    include_samples = options.get("include_samples", case.name == SAMPLE_ID)
+    assets, validator, components = _context(root, include_samples, options.get("repo"))
+    patch = (case / "patch.diff").read_text(encoding="utf-8")
+    records = list(parse_diff(patch.splitlines(keepends=True)))
+    failures = {}
+
+    golden_tags = read_tags(case / "tagger.json")
+    by_tag, _ = components.classify(record.path for record in records)
+    mechanical = [item["tag"] for item in mechanical_selection(records, by_tag)["tags"]]
+    missing = [tag for tag in mechanical if tag not in golden_tags]
+    if missing:
+        failures["tagger"] = [f"$.tags: missing mechanical tag {tag}" for tag in missing]
+
+    compiled = compile_review(
+        assets,
+        golden_tags + list(lang_tags(records)),
+        files=[record.path for record in records],
+        budget=options.get("budget"),
+        focus=options.get("focus", ()),
+        user_override=options.get("process"),
+        max_tokens=options.get("max_tokens"),
+        changed=changed_lines(patch),
+    )
+    if update:
+        (case / "compiler.json").write_text(json.dumps(compiled, indent=2) + "\n", encoding="utf-8")
+    else:
+        diffs = json_diff(_load(case / "compiler.json"), compiled)
+        if diffs:
+            failures["compiler"] = diffs
+
+    errors = validator.validate("review", _load(case / "review.json"), compiler=compiled)
+    if errors:
+        failures["reviewer"] = errors
+    return {"case": case.name, "failures": failures}
+
+
+def run_corpus(cases, workers=None, update=False):
+    """Run cases across a process pool; results keep case order."""
+    workers = workers or min(len(cases), os.cpu_count() or 1) or 1
+    if workers == 1:
+        return [run_case(case, update) for case in cases]
+    chunksize = max(1, len(cases) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(run_case, cases, [update] * len(cases), chunksize=chunksize))
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--examples", default=str(EXAMPLES_DIR), help="directory of golden cases")
+    parser.add_argument("--workers", type=int, help="worker processes (default: CPU count)")
+    parser.add_argument("--update", action="store_true", help="rewrite golden compiler.json files")
+    parser.add_argument("--include-samples", action="store_true", help="also run the sample foo case")
+    parser.add_argument("-o", "--output", help="write the results here instead of stdout")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    cases = discover_cases(args.examples, args.include_samples)
+    results = run_corpus(cases, args.workers, args.update) if cases else []
+    failed = [result for result in results if result["failures"]]
+    payload = {"cases": len(results), "failed": len(failed), "results": failed}
+    text = json.dumps(payload, indent=2) + "\n"
+    if args.output:
+        Path(args.output).write_text(text, encoding="utf-8")
+    else:
+        sys.stdout.write(text)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,274 @@
+"""SQLite history of review runs, for per-rule hit-rate analytics.
+
+Each ingested run is a compiler.json/review.json pair (plus the sibling
+tagger.json's tags, when there is one): the rules it selected with the bytes
+each rule's criteria took in compiled_prompt, and its findings with their
+sources, file, severity and tags. Ingesting the same run (name and pair)
+twice is a no-op.
+
+`report` lists, per rule, how often it was selected, how many runs it
+produced findings in and how many prompt bytes it spent in runs where it
+produced none, sorted by those idle bytes. `suggest` turns that into
+per-expert input for participation.max_rules and budgets: rules selected at
+least --min-selected times without a single finding, and the most rules that
+ever fired together in one run.
+
+Usage:
+    python -m second_opinion.history ingest batch/ runs/pr-123
+    python -m second_opinion.history report --tag component:tidb/expression
+    python -m second_opinion.history suggest --min-selected 10
+"""
+
+import argparse
+import json
+from pathlib import Path
+import re
+import sqlite3
+import sys
+import time
+
+from second_opinion.assets import REPO_ROOT
+from second_opinion.cache import json_key
+from second_opinion.compiler import segment_blocks
+from second_opinion.index import default_cache_dir, load_index
+
+SCHEMA_VERSION = 1
+DEFAULT_MIN_SELECTED = 5
+_RULE_START = re.compile(r"^- rule_id: *(\S+)", re.MULTILINE)
+
+SCHEMA = """
+CREATE TABLE runs (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE,
+    name TEXT,
+    ingested_at REAL NOT NULL,
+    prompt_bytes INTEGER NOT NULL
+);
+CREATE TABLE run_tags (run_id INTEGER NOT NULL REFERENCES runs(id), tag TEXT NOT NULL);
+CREATE TABLE selections (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    rule_id TEXT NOT NULL,
+    expert TEXT NOT NULL,
+    prompt_bytes INTEGER NOT NULL
+);
+CREATE TABLE findings (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    file TEXT,
+    lines TEXT,
+    severity TEXT,
+    message TEXT
+);
+CREATE TABLE finding_sources (
+    finding_id INTEGER NOT NULL REFERENCES findings(id),
+    source_type TEXT NOT NULL,
+    source_id TEXT NOT NULL
+);
+CREATE TABLE finding_tags (finding_id INTEGER NOT NULL REFERENCES findings(id), tag TEXT NOT NULL);
+CREATE INDEX run_tags_tag ON run_tags(tag);
+CREATE INDEX selections_rule ON selections(rule_id);
+CREATE INDEX selections_run ON selections(run_id);
+CREATE INDEX findings_run ON findings(run_id);
+CREATE INDEX findings_file ON findings(file);
+CREATE INDEX findings_severity ON findings(severity);
+CREATE INDEX finding_sources_source ON finding_sources(source_id, source_type);
+CREATE INDEX finding_tags_tag ON finding_tags(tag);
+"""
+
+# Per (run, rule): findings attributed to the rule in that run, or NULL.
+_RULE_STATS = """
+SELECT s.rule_id, s.expert, s.run_id, s.prompt_bytes, f.hits
+FROM selections s
+LEFT JOIN (
+    SELECT fi.run_id, fs.source_id, COUNT(*) AS hits
+    FROM finding_sources fs JOIN findings fi ON fi.id = fs.finding_id
+    WHERE fs.source_type = 'rule'
+    GROUP BY fi.run_id, fs.source_id
+) f ON f.run_id = s.run_id AND f.source_id = s.rule_id
+"""
+
+
+def default_db_path():
+    return default_cache_dir() / "history.sqlite3"
+
+
+def rule_prompt_bytes(compiled):
+    """{rule_id: bytes of its criteria entry in compiled_prompt}."""
+    text = compiled.get("compiled_prompt", "")
+    for segment, block in segment_blocks(text, compiled.get("prompt_segments") or []):
+        if segment["segment"] == "rules":
+            text = block.decode("utf-8")
+            break
+    starts = list(_RULE_START.finditer(text))
+    sizes = {}
+    for index, match in enumerate(starts):
+        end = starts[index + 1].start() if index + 1 < len(starts) else len(text)
+        sizes[match.group(1)] = len(text[match.start():end].rstrip().encode("utf-8"))
+    return sizes
+
+
+def _sources(finding):
+    sources = finding.get("sources") or [finding["source"]]
+    return list({(source["type"], source["id"]): source for source in sources}.values())
+
+
+class History:
+    def __init__(self, path=None):
+        self.path = Path(path) if path else default_db_path()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(self.path)
+        version = self.db.execute("PRAGMA user_version").fetchone()[0]
+        if version == 0:
+            with self.db:
+                self.db.executescript(SCHEMA)
+                self.db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        elif version != SCHEMA_VERSION:
+            raise ValueError(f"{self.path}: unsupported history schema version {version}")
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def ingest(self, compiled, review, tags=(), name=None):
+        """Store one run; return its id, or None when it was already stored."""
+        key = json_key({"name": name, "compiler": compiled, "review": review})
+        if self.db.execute("SELECT 1 FROM runs WHERE key = ?", (key,)).fetchone():
+            return None
+        sizes = rule_prompt_bytes(compiled)
+        with self.db:
+            run_id = self.db.execute(
+                "INSERT INTO runs (key, name, ingested_at, prompt_bytes) VALUES (?, ?, ?, ?)",
+                (key, name, time.time(), len(compiled.get("compiled_prompt", "").encode("utf-8"))),
+            ).lastrowid
+            self.db.executemany("INSERT INTO run_tags VALUES (?, ?)", [(run_id, tag) for tag in dict.fromkeys(tags)])
+            self.db.executemany(
+                "INSERT INTO selections VALUES (?, ?, ?, ?)",
+                [(run_id, rule_id, expert, sizes.get(rule_id, 0))
+                 for expert, rule_ids in compiled.get("rules_used", {}).items() for rule_id in rule_ids],
+            )
+            for finding in review.get("findings", []):
+                finding_id = self.db.execute(
+                    "INSERT INTO findings (run_id, file, lines, severity, message) VALUES (?, ?, ?, ?, ?)",
+                    (run_id, finding.get("file"), finding.get("lines"), finding.get("severity"),
+                     finding.get("message")),
+                ).lastrowid
+                self.db.executemany("INSERT INTO finding_sources VALUES (?, ?, ?)",
+                                    [(finding_id, source["type"], source["id"]) for source in _sources(finding)])
+                self.db.executemany("INSERT INTO finding_tags VALUES (?, ?)",
+                                    [(finding_id, tag) for tag in dict.fromkeys(finding.get("tags", []))])
+        return run_id
+
+    def _rule_rows(self, tag=None):
+        query, params = _RULE_STATS, ()
+        if tag:
+            query += " WHERE s.run_id IN (SELECT run_id FROM run_tags WHERE tag = ?)"
+            params = (tag,)
+        return self.db.execute(query, params).fetchall()
+
+    def rule_report(self, tag=None):
+        """Per-rule selection and finding counts, most idle prompt bytes first."""
+        stats = {}
+        for rule_id, expert, _, prompt_bytes, hits in self._rule_rows(tag):
+            entry = stats.setdefault(rule_id, {"rule_id": rule_id, "expert": expert, "selected": 0, "fired": 0,
+                                               "findings": 0, "prompt_bytes": 0, "idle_bytes": 0})
+            entry["selected"] += 1
+            entry["prompt_bytes"] = max(entry["prompt_bytes"], prompt_bytes)
+            if hits:
+                entry["fired"] += 1
+                entry["findings"] += hits
+            else:
+                entry["idle_bytes"] += prompt_bytes
+        for entry in stats.values():
+            entry["hit_rate"] = round(entry["fired"] / entry["selected"], 3)
+        return sorted(stats.values(), key=lambda entry: (-entry["idle_bytes"], entry["rule_id"]))
+
+    def suggestions(self, assets, min_selected=DEFAULT_MIN_SELECTED, tag=None):
+        """Per-expert max_rules input: never-firing rules and the most rules fired in one run."""
+        report = {entry["rule_id"]: entry for entry in self.rule_report(tag)}
+        fired_together = {}
+        for rule_id, expert, run_id, _, hits in self._rule_rows(tag):
+            if hits:
+                key = (expert, run_id)
+                fired_together[key] = fired_together.get(key, 0) + 1
+        suggestions = []
+        for expert in assets.experts:
+            entries = [report[rule.rule_id] for rule in expert.rules if rule.rule_id in report]
+            if not entries:
+                continue
+            dead = [entry["rule_id"] for entry in entries
+                    if entry["selected"] >= min_selected and not entry["fired"]]
+            peak = max((count for (name, _), count in fired_together.items() if name == expert.id), default=0)
+            suggestions.append({
+                "expert": expert.id,
+                "max_rules": expert.max_rules,
+                "suggested_max_rules": min(expert.max_rules, max(peak, 1)),
+                "dead_rules": dead,
+                "idle_bytes": sum(entry["idle_bytes"] for entry in entries),
+            })
+        return sorted(suggestions, key=lambda entry: (-entry["idle_bytes"], entry["expert"]))
+
+
+def _read_json(path):
+    return json.loads(Path(path).read_text(encoding="utf-8"))
+
+
+def iter_runs(paths):
+    """Yield (name, compiler.json, review.json, tags) for run directories under paths."""
+    for path in map(Path, paths):
+        for review_path in ([path] if path.is_file() else sorted(path.rglob("review.json"))):
+            compiler_path = review_path.with_name("compiler.json")
+            if not compiler_path.is_file():
+                continue
+            tagger_path = review_path.with_name("tagger.json")
+            tags = [item["tag"] for item in _read_json(tagger_path).get("tags", [])] if tagger_path.is_file() else []
+            yield str(review_path.parent), _read_json(compiler_path), _read_json(review_path), tags
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", help="history database (default: history.sqlite3 in the cache dir)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    ingest = commands.add_parser("ingest", help="store compiler.json/review.json pairs")
+    ingest.add_argument("paths", nargs="+", help="run directories or review.json files (searched recursively)")
+    report = commands.add_parser("report", help="per-rule selection vs finding counts")
+    report.add_argument("--tag", help="only runs tagged with this tag")
+    report.add_argument("-o", "--output", help="write here instead of stdout")
+    suggest = commands.add_parser("suggest", help="per-expert max_rules and dead-rule suggestions")
+    suggest.add_argument("--tag", help="only runs tagged with this tag")
+    suggest.add_argument("--min-selected", type=int, default=DEFAULT_MIN_SELECTED,
+                         help="selections without a finding before a rule counts as dead")
+    suggest.add_argument("--root", default=str(REPO_ROOT), help="asset root directory")
+    suggest.add_argument("--cache-dir", help="asset index directory")
+    suggest.add_argument("-o", "--output", help="write here instead of stdout")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    with History(args.db) as history:
+        if args.command == "ingest":
+            runs = list(iter_runs(args.paths))
+            added = sum(history.ingest(compiled, review, tags, name) is not None
+                        for name, compiled, review, tags in runs)
+            sys.stdout.write(json.dumps({"runs": len(runs), "added": added}) + "\n")
+            return 0
+        if args.command == "report":
+            payload = history.rule_report(args.tag)
+        else:
+            assets = load_index(args.root, cache_dir=args.cache_dir)
+            payload = history.suggestions(assets, args.min_selected, args.tag)
+    text = json.dumps(payload, indent=2) + "\n"
+    if args.output:
+        Path(args.output).write_text(text, encoding="utf-8")
+    else:
+        sys.stdout.write(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,253 @@
+"""Incremental review rounds backed by a persisted review state.
+
+The state records the last reviewed commit, a content hash and post-image
+line range for every hunk of the reviewed diff, and the findings reported so
+far. On the next round the full PR diff is compared hunk by hunk against the
+state: only new or modified hunks go to the reviewer, findings on untouched
+hunks are carried forward (with their lines shifted if the hunk moved), and
+findings whose code changed are re-checked and marked fixed or still-open.
+Findings between hunks are shifted by the line delta of the hunks above
+them.
+
+Usage:
+    python -m second_opinion.incremental plan --diff pr.diff --state review-state.json --out delta.diff
+    python -m second_opinion.incremental finalize --diff pr.diff --state review-state.json \\
+        --review delta-review.json --commit <sha> -o review.json --status status.json
+"""
+
+import argparse
+from dataclasses import dataclass, field
+import json
+from pathlib import Path
+import sys
+
+from second_opinion.diff import hunk_hash, hunk_new_range, hunk_old_range, iter_file_diffs
+from second_opinion.findings import line_range, merge_reviews
+from second_opinion.index import write_json_atomic
+
+STATE_VERSION = 2
+
+
+@dataclass
+class Hunk:
+    path: str
+    hash: str
+    start: int
+    end: int
+    old_start: int = 0
+    old_end: int = 0
+    # Post-image minus pre-image line count.
+    delta: int = 0
+
+    def record(self):
+        return {"hash": self.hash, "start": self.start, "end": self.end, "delta": self.delta}
+
+
+@dataclass
+class Plan:
+    round: str
+    delta_diff: str
+    new_hunks: list = field(default_factory=list)
+    unchanged_hunks: int = 0
+    # Prior findings on untouched code, with lines remapped to the new diff.
+    carried: list = field(default_factory=list)
+    # Prior findings whose code changed since the baseline.
+    recheck: list = field(default_factory=list)
+    hunks: dict = field(default_factory=dict)
+
+    def summary(self):
+        return {
+            "round": self.round,
+            "new_hunks": len(self.new_hunks),
+            "unchanged_hunks": self.unchanged_hunks,
+            "carried_findings": len(self.carried),
+            "recheck_findings": len(self.recheck),
+        }
+
+
+def load_state(path):
+    """Return the persisted state, or None when there is no usable baseline."""
+    try:
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if data.get("version") != STATE_VERSION:
+        return None
+    return data
+
+
+def _overlaps(start, end, other_start, other_end):
+    return start <= other_end and other_start <= end
+
+
+def _shift(finding, offset):
+    if not offset:
+        return finding
+    start, end = line_range(finding.get("lines"))
+    lines = f"L{start + offset}" if start == end else f"L{start + offset}-L{end + offset}"
+    return dict(finding, lines=lines)
+
+
+def _delta(hunk_lines):
+    body = hunk_lines[1:]
+    return sum(1 for line in body if line.startswith("+")) - sum(1 for line in body if line.startswith("-"))
+
+
+def _remap_between(finding, stored, current):
+    """Move a finding outside every stored hunk to the current diff.
+
+    Returns (finding, touched): lines are translated to the base file through
+    the stored hunks above them and back through the current ones. touched is
+    True when a current hunk covers the base lines.
+    """
+    start, end = line_range(finding.get("lines"))
+    if not start:
+        return finding, False
+    above = [h for h in stored if h["end"] < start]
+    base = sum(h["delta"] for h in above)
+    base_start, base_end = start - base, end - base
+    offset = 0
+    for hunk in sorted(current, key=lambda h: h.old_start):
+        if hunk.old_end < base_start:
+            offset += hunk.delta
+        elif _overlaps(base_start, base_end, hunk.old_start, hunk.old_end):
+            return finding, True
+    return _shift(finding, offset - base), False
+
+
+def plan_review(diff, state):
+    """Compare the current PR diff against the state and plan this round."""
+    lines = diff.splitlines(keepends=True) if isinstance(diff, str) else diff
+    plan = Plan(round="first" if state is None else "incremental", delta_diff="")
+    previous = (state or {}).get("hunks", {})
+    current = {}
+    delta = []
+
+    for file_diff in iter_file_diffs(lines):
+        known = {h["hash"]: h for h in previous.get(file_diff.path, [])}
+        fresh = []
+        for hunk_lines in file_diff.hunks:
+            start, end = hunk_new_range(hunk_lines)
+            hunk = Hunk(file_diff.path, hunk_hash(hunk_lines), start, end, *hunk_old_range(hunk_lines),
+                        _delta(hunk_lines))
+            current.setdefault(file_diff.path, []).append(hunk)
+            if state is not None and hunk.hash in known:
+                plan.unchanged_hunks += 1
+            else:
+                fresh.append(hunk_lines)
+                plan.new_hunks.append(hunk)
+        if fresh:
+            delta.append(file_diff.text(fresh))
+
+    plan.delta_diff = "".join(delta)
+    plan.hunks = {path: [h.record() for h in hunks] for path, hunks in current.items()}
+
+    for finding in (state or {}).get("findings", []):
+        path = finding.get("file")
+        start, end = line_range(finding.get("lines"))
+        now = {h.hash: h for h in current.get(path, [])}
+        stored = next(
+            (h for h in previous.get(path, []) if _overlaps(start, end, h["start"], h["end"])),
+            None,
+        )
+        if stored is not None:
+            moved = now.get(stored["hash"])
+            if moved is not None:
+                plan.carried.append(_shift(finding, moved.start - stored["start"]))
+            else:
+                plan.recheck.append(finding)
+            continue
+        remapped, touched = _remap_between(finding, previous.get(path, []), current.get(path, []))
+        if touched:
+            plan.recheck.append(finding)
+        else:
+            plan.carried.append(remapped)
+    return plan
+
+
+def _source(finding):
+    source = finding.get("source") or {}
+    return finding.get("file"), source.get("type"), source.get("id")
+
+
+def finalize(plan, review):
+    """Merge this round's review with carried findings.
+
+    Returns (review.json payload, status list). A re-checked finding is
+    still-open when the new review reports the same source on the same file,
+    and fixed otherwise.
+    """
+    new_findings = review.get("findings", [])
+    reported = {_source(f) for f in new_findings}
+    statuses = [{"status": "open", "finding": f} for f in plan.carried]
+    for finding in plan.recheck:
+        status = "still-open" if _source(finding) in reported else "fixed"
+        statuses.append({"status": status, "finding": finding})
+    rechecked = {_source(f) for f in plan.recheck}
+    statuses.extend(
+        {"status": "new", "finding": f} for f in new_findings if _source(f) not in rechecked
+    )
+    return merge_reviews([{"findings": plan.carried}, {"findings": new_findings}]), statuses
+
+
+def save_state(path, plan, review, commit=None):
+    return write_json_atomic(
+        path,
+        {
+            "version": STATE_VERSION,
+            "commit": commit,
+            "hunks": plan.hunks,
+            "findings": review.get("findings", []),
+        },
+    )
+
+
+def _write(path, payload):
+    text = json.dumps(payload, indent=2) + "\n"
+    if path:
+        Path(path).write_text(text, encoding="utf-8")
+    else:
+        sys.stdout.write(text)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    plan = commands.add_parser("plan", help="write the delta diff for this round")
+    plan.add_argument("--diff", required=True, help="full PR diff")
+    plan.add_argument("--state", required=True, help="review state file")
+    plan.add_argument("--out", required=True, help="where to write the delta diff")
+    plan.add_argument("-o", "--output", help="write the plan summary here instead of stdout")
+
+    final = commands.add_parser("finalize", help="merge the delta review and update the state")
+    final.add_argument("--diff", required=True, help="full PR diff")
+    final.add_argument("--state", required=True, help="review state file")
+    final.add_argument("--review", required=True, help="review.json for the delta diff")
+    final.add_argument("--commit", help="head commit that was reviewed")
+    final.add_argument("--status", help="write per-finding statuses here")
+    final.add_argument("-o", "--output", help="write the merged review.json here instead of stdout")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    with Path(args.diff).open("r", encoding="utf-8") as handle:
+        plan = plan_review(handle, load_state(args.state))
+
+    if args.command == "plan":
+        Path(args.out).write_text(plan.delta_diff, encoding="utf-8")
+        _write(args.output, plan.summary())
+        return 0
+
+    review = json.loads(Path(args.review).read_text(encoding="utf-8"))
+    merged, statuses = finalize(plan, review)
+    save_state(args.state, plan, merged, commit=args.commit)
+    if args.status:
+        Path(args.status).write_text(json.dumps(statuses, indent=2) + "\n", encoding="utf-8")
+    _write(args.output, merged)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+"""On-disk asset index with per-file mtime/hash invalidation.
+
+The index keeps one parsed record per asset file plus the derived lookup
+tables (tag -> rule_ids, tag -> processes). A load only
+stats the asset tree; files whose mtime and size are unchanged reuse their
+record, and files whose content hash is unchanged are not re-parsed either.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+import threading
+
+from second_opinion import trace
+from second_opinion.bundle import is_bundle, load_pack
+from second_opinion.assets import (
+    REPO_ROOT,
+    assemble_assets,
+    list_asset_files,
+    parse_record,
+    tree_digest,
+)
+
+INDEX_VERSION = 2
+
+
+def default_cache_dir():
+    return Path(os.environ.get("SECOND_OPINION_CACHE_DIR", REPO_ROOT / ".cache" / "second-opinion"))
+
+
+def write_json_atomic(path, payload):
+    """Write JSON next to path and rename it into place; return False on OSError."""
+    path = Path(path)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp.write_text(json.dumps(payload), encoding="utf-8")
+        os.replace(tmp, path)
+    except OSError:
+        tmp.unlink(missing_ok=True)
+        return False
+    return True
+
+
+class AssetIndex:
+    def __init__(self, root=REPO_ROOT, include_samples=False, cache_dir=None):
+        self.root = Path(root).resolve()
+        self.include_samples = include_samples
+        self.cache_dir = Path(cache_dir) if cache_dir else default_cache_dir()
+        key = hashlib.sha256(f"{self.root}|{int(include_samples)}".encode("utf-8")).hexdigest()[:16]
+        self.path = self.cache_dir / f"assets-{key}.json"
+        # Relative paths parsed during the last load(); empty on a warm index.
+        self.reparsed = []
+
+    def _read(self):
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        if data.get("version") != INDEX_VERSION:
+            return {}
+        return data
+
+    def load(self):
+        """Return Assets, refreshing only the index entries whose files changed."""
+        with trace.span("assets.load", cat="assets", root=str(self.root)) as attrs:
+            assets = self._load()
+            attrs.update(experts=len(assets.experts), processes=len(assets.processes),
+                         policies=len(assets.policies), reparsed=len(self.reparsed))
+            return assets
+
+    def _load(self):
+        previous = self._read()
+        cached = previous.get("files", {})
+        files = list_asset_files(self.root, self.include_samples)
+        entries = {}
+        self.reparsed = []
+        dirty = set(cached) != {rel for _, rel in files}
+
+        for kind, rel in files:
+            stat = (self.root / rel).stat()
+            entry = cached.get(rel)
+            if entry and entry["kind"] == kind and entry["mtime_ns"] == stat.st_mtime_ns \
+                    and entry["size"] == stat.st_size:
+                entries[rel] = entry
+                continue
+            raw = (self.root / rel).read_bytes()
+            digest = hashlib.sha256(raw).hexdigest()
+            dirty = True
+            if entry and entry["kind"] == kind and entry["sha256"] == digest:
+                record = entry["record"]
+            else:
+                with trace.span("assets.parse", cat="assets", path=rel):
+                    record = parse_record(kind, raw.decode("utf-8"), rel)
+                self.reparsed.append(rel)
+            entries[rel] = {
+                "kind": kind,
+                "mtime_ns": stat.st_mtime_ns,
+                "size": stat.st_size,
+                "sha256": digest,
+                "record": record,
+            }
+
+        records = {rel: entry["record"] for rel, entry in entries.items()}
+        digest = tree_digest((rel, entry["sha256"]) for rel, entry in entries.items())
+        if previous and not dirty:
+            assets = assemble_assets(
+                self.root,
+                files,
+                records,
+                rules_by_tag=previous["rules_by_tag"],
+                processes_by_tag=previous["processes_by_tag"],
+                digest=digest,
+            )
+        else:
+            assets = assemble_assets(self.root, files, records, digest=digest)
+
+        if dirty:
+            write_json_atomic(
+                self.path,
+                {
+                    "version": INDEX_VERSION,
+                    "root": str(self.root),
+                    "files": entries,
+                    "rules_by_tag": assets.rules_by_tag,
+                    "processes_by_tag": assets.processes_by_tag,
+                },
+            )
+        return assets
+
+
+def load_index(root=REPO_ROOT, include_samples=False, cache_dir=None):
+    """Load assets through the on-disk index, or from the pack of a skill bundle."""
+    if is_bundle(root):
+        return load_pack(root)
+    return AssetIndex(root, include_samples=include_samples, cache_dir=cache_dir).load()
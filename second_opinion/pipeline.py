@@ -0,0 +1,197 @@
+"""Asyncio orchestrator running tagger -> compiler -> reviewer as a pipeline.
+
+Shards (or whole diffs) flow through bounded queues between the stages, so
+tagging shard N+1 overlaps compiling and reviewing shard N, and a slow
+reviewer applies backpressure instead of letting tagged work pile up. Each
+stage has its own worker count; tagger and reviewer calls are retried on
+timeout. Plain callables run in worker threads, coroutine functions are
+awaited directly. A failure in any stage cancels the whole run. The diff
+goes through the pre-review filter (second_opinion.diff_filter) before it is
+sharded, unless --no-filter is given.
+
+Outputs match the sharded workflow: shard-NNN/{change.diff, tagger.json,
+compiler.json, review.json} and the merged review.json.
+
+Usage:
+    python -m second_opinion.pipeline --diff change.diff --out run/ --reviewer-cmd "my-reviewer {prompt} {diff}"
+"""
+
+import argparse
+import asyncio
+import inspect
+import json
+from pathlib import Path
+import sys
+
+from second_opinion import trace
+from second_opinion.applicability import changed_lines
+from second_opinion.assets import REPO_ROOT
+from second_opinion.batch import command_reviewer, mechanical_tagger
+from second_opinion.components import load_components, resolve_repo
+from second_opinion.compiler import compile_review
+from second_opinion.diff_filter import FILTERS_PATH, load_filters
+from second_opinion.findings import merge_reviews
+from second_opinion.index import load_index
+from second_opinion.shard import DEFAULT_MAX_BYTES, ShardResult, split_diff
+
+DEFAULT_TAGGER_WORKERS = 2
+DEFAULT_REVIEWER_WORKERS = 4
+DEFAULT_QUEUE_SIZE = 4
+DEFAULT_RETRIES = 1
+
+_DONE = object()
+
+
+class StageTimeout(Exception):
+    def __init__(self, stage, attempts):
+        super().__init__(f"{stage} timed out after {attempts} attempt(s)")
+        self.stage = stage
+        self.attempts = attempts
+
+
+async def _call(stage, fn, args, timeout, retries):
+    for attempt in range(1, retries + 2):
+        if inspect.iscoroutinefunction(fn):
+            pending = fn(*args)
+        else:
+            # A timed-out thread keeps running to completion; its result is dropped.
+            pending = asyncio.to_thread(fn, *args)
+        with trace.span(stage, cat="model", attempt=attempt) as attrs:
+            try:
+                result = await asyncio.wait_for(pending, timeout)
+            except asyncio.TimeoutError:
+                attrs["timeout"] = True
+                if attempt > retries:
+                    raise StageTimeout(stage, attempt) from None
+                continue
+            if trace.enabled():
+                attrs.update(trace.call_stats(args, result))
+            return result
+
+
+async def run_pipeline(shards, assets, tagger, reviewer, tagger_workers=DEFAULT_TAGGER_WORKERS,
+                       reviewer_workers=DEFAULT_REVIEWER_WORKERS, queue_size=DEFAULT_QUEUE_SIZE,
+                       timeout=None, retries=DEFAULT_RETRIES, **compile_options):
+    """Drive every shard through the three stages; return ShardResults in shard order.
+
+    tagger(diff_text) and reviewer(compiled_prompt, diff_text) have the same
+    contract as in second_opinion.shard. timeout (seconds) applies per call.
+    """
+    shards = list(shards)
+    results = [None] * len(shards)
+    tagged_queue = asyncio.Queue(queue_size)
+    compiled_queue = asyncio.Queue(queue_size)
+    pending = iter(enumerate(shards))
+
+    async def tag_worker():
+        for position, shard in pending:
+            tagged = await _call("tagger", tagger, (shard.text,), timeout, retries)
+            await tagged_queue.put((position, shard, tagged))
+
+    async def compile_worker():
+        while (item := await tagged_queue.get()) is not _DONE:
+            position, shard, tagged = item
+            tags = [entry["tag"] for entry in tagged.get("tags", [])]
+            compiled = compile_review(assets, tags, files=shard.files, changed=changed_lines(shard.text),
+                                      **compile_options)
+            await compiled_queue.put((position, shard, tagged, compiled))
+
+    async def review_worker():
+        while (item := await compiled_queue.get()) is not _DONE:
+            position, shard, tagged, compiled = item
+            arguments = (compiled["compiled_prompt"], shard.text)
+            review = await _call("reviewer", reviewer, arguments, timeout, retries)
+            results[position] = ShardResult(shard=shard, tagger=tagged, compiler=compiled, review=review)
+
+    async def stage(workers, count, queue=None, downstream=0):
+        await asyncio.gather(*(workers() for _ in range(max(1, count))))
+        for _ in range(downstream):
+            await queue.put(_DONE)
+
+    tasks = [
+        asyncio.ensure_future(stage(tag_worker, tagger_workers, tagged_queue, 1)),
+        asyncio.ensure_future(stage(compile_worker, 1, compiled_queue, max(1, reviewer_workers))),
+        asyncio.ensure_future(stage(review_worker, reviewer_workers)),
+    ]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    return results
+
+
+async def review_pipelined(diff, assets, tagger, reviewer, max_bytes=DEFAULT_MAX_BYTES, **options):
+    """Async counterpart of shard.review_sharded: (merged review.json, results)."""
+    results = await run_pipeline(split_diff(diff, max_bytes), assets, tagger, reviewer, **options)
+    return merge_reviews(result.review for result in results), results
+
+
+def write_results(out, merged, results):
+    out = Path(out)
+    for result in results:
+        directory = out / f"shard-{result.shard.index:03d}"
+        directory.mkdir(parents=True, exist_ok=True)
+        (directory / "change.diff").write_text(result.shard.text, encoding="utf-8")
+        for name, payload in (("tagger.json", result.tagger), ("compiler.json", result.compiler),
+                              ("review.json", result.review)):
+            (directory / name).write_text(json.dumps(payload, indent=2) + "\n", encoding="utf-8")
+    (out / "review.json").write_text(json.dumps(merged, indent=2) + "\n", encoding="utf-8")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--diff", required=True, help="diff to review")
+    parser.add_argument("--out", required=True, help="output directory")
+    parser.add_argument("--reviewer-cmd", required=True,
+                        help="command template printing review.json for {prompt} and {diff} (or {input})")
+    parser.add_argument("--max-bytes", type=int, default=DEFAULT_MAX_BYTES, help="byte budget per shard")
+    parser.add_argument("--tagger-workers", type=int, default=DEFAULT_TAGGER_WORKERS, help="concurrent taggers")
+    parser.add_argument("--reviewer-workers", type=int, default=DEFAULT_REVIEWER_WORKERS,
+                        help="concurrent reviewer calls")
+    parser.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE, help="items buffered between stages")
+    parser.add_argument("--timeout", type=float, help="seconds per tagger/reviewer call")
+    parser.add_argument("--retries", type=int, default=DEFAULT_RETRIES, help="retries after a timeout")
+    parser.add_argument("--root", default=str(REPO_ROOT), help="asset root directory")
+    parser.add_argument("--budget", help="depth hint (quick/standard/deep/...)")
+    parser.add_argument("--cache-dir", help="asset index directory")
+    parser.add_argument("--repo-name", help="reviewed repository (tidb, pd, ...) for component rules")
+    parser.add_argument("--repo", help="checkout to detect the repository from when --repo-name is not given")
+    parser.add_argument("--filters", default=str(FILTERS_PATH), help="pre-review diff filter rules")
+    parser.add_argument("--no-filter", action="store_true", help="send generated/vendored files in full")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    assets = load_index(args.root, cache_dir=args.cache_dir)
+    with Path(args.diff).open("r", encoding="utf-8") as handle:
+        diff = handle.read()
+    if not args.no_filter:
+        diff = load_filters(args.filters).apply(diff).text
+    reviewer = command_reviewer(args.reviewer_cmd, Path(args.out) / ".scratch")
+    components = load_components(repo=resolve_repo(args.repo_name, args.repo))
+    merged, results = asyncio.run(
+        review_pipelined(
+            diff,
+            assets,
+            mechanical_tagger(components),
+            reviewer,
+            max_bytes=args.max_bytes,
+            tagger_workers=args.tagger_workers,
+            reviewer_workers=args.reviewer_workers,
+            queue_size=args.queue_size,
+            timeout=args.timeout,
+            retries=args.retries,
+            budget=args.budget,
+        )
+    )
+    write_results(args.out, merged, results)
+    sys.stdout.write(json.dumps({"shards": len(results), "findings": len(merged["findings"])}) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
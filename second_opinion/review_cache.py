@@ -0,0 +1,198 @@
+"""Finding-level reuse of reviewer output for unchanged hunks.
+
+Rebases and force-pushes keep producing hunks that are byte-identical to
+hunks already reviewed under the same compiled rules. Findings are cached per
+hunk, keyed by the normalized hunk hash, the rules/process/policy set in
+effect (plus the compiled prompt) and the reviewer prompt hash. Only hunks
+without a cache entry are sent to the reviewer; cached findings are remapped
+to the hunk's current line numbers.
+
+Usage:
+    python -m second_opinion.review_cache prepare --diff change.diff --compiler compiler.json \\
+        --out miss.diff --cached cached.json
+    python -m second_opinion.review_cache complete --diff change.diff --compiler compiler.json \\
+        --review miss-review.json -o review.json
+"""
+
+import argparse
+from dataclasses import dataclass, field
+import hashlib
+import json
+from pathlib import Path
+import sys
+
+from second_opinion import trace
+from second_opinion.assets import REPO_ROOT
+from second_opinion.cache import JsonCache, json_key
+from second_opinion.diff import hunk_hash, hunk_new_range, iter_file_diffs
+from second_opinion.findings import line_range, merge_reviews
+
+REVIEWER_PROMPT = REPO_ROOT / "prompts" / "reviewer.prompt"
+DEFAULT_MAX_AGE = 14 * 24 * 3600
+
+
+class FindingsCache(JsonCache):
+    subdir = "findings"
+
+    def __init__(self, cache_dir=None, max_age=DEFAULT_MAX_AGE, **options):
+        super().__init__(cache_dir, max_age=max_age, **options)
+
+
+def prompt_hash(path=REVIEWER_PROMPT):
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+
+def rules_fingerprint(compiler):
+    """Identify the rule set a compiler.json puts in effect."""
+    return json_key(
+        {
+            "rules": sorted(rule for rules in compiler.get("rules_used", {}).values() for rule in rules),
+            "processes": sorted(compiler.get("selected_processes", [])),
+            "policies": sorted(compiler.get("selected_policies", [])),
+            "prompt": hashlib.sha256(compiler.get("compiled_prompt", "").encode("utf-8")).hexdigest(),
+        }
+    )
+
+
+@dataclass
+class HunkEntry:
+    path: str
+    start: int
+    end: int
+    key: str
+
+
+@dataclass
+class ReusePlan:
+    cached: list = field(default_factory=list)
+    missed: list = field(default_factory=list)
+    miss_diff: str = ""
+    hits: int = 0
+
+    def summary(self):
+        return {"hunks": self.hits + len(self.missed), "hits": self.hits, "misses": len(self.missed)}
+
+
+def _remap(entry, hunk):
+    start = hunk.start + entry["offset"][0]
+    end = hunk.start + entry["offset"][1]
+    lines = f"L{start}" if start == end else f"L{start}-L{end}"
+    return dict(entry["finding"], file=hunk.path, lines=lines)
+
+
+def plan_reuse(diff, compiler, cache, prompt_digest=None):
+    """Split a diff into hunks with cached findings and hunks that need review."""
+    lines = diff.splitlines(keepends=True) if isinstance(diff, str) else diff
+    fingerprint = rules_fingerprint(compiler)
+    prompt_digest = prompt_digest or prompt_hash()
+    plan = ReusePlan()
+    parts = []
+    for file_diff in iter_file_diffs(lines):
+        missing = []
+        for hunk_lines in file_diff.hunks:
+            start, end = hunk_new_range(hunk_lines)
+            key = json_key([hunk_hash(hunk_lines), fingerprint, prompt_digest])
+            hunk = HunkEntry(file_diff.path, start, end, key)
+            entries = cache.get(key)
+            if entries is None:
+                plan.missed.append(hunk)
+                missing.append(hunk_lines)
+                continue
+            plan.hits += 1
+            plan.cached.extend(_remap(entry, hunk) for entry in entries)
+        if missing:
+            parts.append(file_diff.text(missing))
+    plan.miss_diff = "".join(parts)
+    return plan
+
+
+def store_review(plan, review, cache):
+    """Cache the review of plan.miss_diff per hunk and return the merged review.
+
+    Findings are attributed to the missed hunk containing their start line.
+    A finding that fits no hunk (file-level, no lines, outside every hunk)
+    keeps the hunks of its file uncached, or all of them when its file is not
+    among the missed hunks, so the next run reviews them again rather than
+    dropping it. Hunks without findings are cached too, as empty lists.
+    """
+    per_hunk = {hunk.key: [] for hunk in plan.missed}
+    uncached = set()
+    for finding in review.get("findings", []):
+        start, end = line_range(finding.get("lines"))
+        for hunk in plan.missed:
+            if start and hunk.path == finding.get("file") and hunk.start <= start <= hunk.end:
+                rest = {k: v for k, v in finding.items() if k not in ("file", "lines")}
+                per_hunk[hunk.key].append({"finding": rest, "offset": [start - hunk.start, end - hunk.start]})
+                break
+        else:
+            uncached.add(finding.get("file"))
+    missed_paths = {hunk.path for hunk in plan.missed}
+    for hunk in plan.missed:
+        if hunk.path in uncached or not uncached <= missed_paths:
+            continue
+        cache.put(hunk.key, per_hunk[hunk.key])
+    return merge_reviews([{"findings": plan.cached}, review])
+
+
+def review_with_cache(diff, compiler, reviewer, cache, prompt_digest=None):
+    """Review only uncached hunks with reviewer(compiled_prompt, diff_text)."""
+    with trace.span("findings_cache", cat="cache") as attrs:
+        plan = plan_reuse(diff, compiler, cache, prompt_digest)
+        attrs.update(hits=plan.hits, misses=len(plan.missed))
+    review = {"findings": []}
+    if plan.miss_diff:
+        with trace.span("reviewer", cat="model") as attrs:
+            review = reviewer(compiler["compiled_prompt"], plan.miss_diff)
+            if trace.enabled():
+                attrs.update(trace.call_stats((compiler["compiled_prompt"], plan.miss_diff), review))
+    return store_review(plan, review, cache), plan
+
+
+def _load_json(path):
+    return json.loads(Path(path).read_text(encoding="utf-8"))
+
+
+def _write(path, payload):
+    text = json.dumps(payload, indent=2) + "\n"
+    if path:
+        Path(path).write_text(text, encoding="utf-8")
+    else:
+        sys.stdout.write(text)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cache-dir", help="cache directory")
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name, help_text in (("prepare", "write the diff of uncached hunks"),
+                            ("complete", "cache the miss review and merge it with cached findings")):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument("--diff", required=True, help="diff under review")
+        command.add_argument("--compiler", required=True, help="compiler.json in effect")
+        command.add_argument("-o", "--output", help="write JSON output here instead of stdout")
+        if name == "prepare":
+            command.add_argument("--out", required=True, help="where to write the uncached hunks diff")
+            command.add_argument("--cached", help="write cached findings (review.json shape) here")
+        else:
+            command.add_argument("--review", required=True, help="review.json for the uncached hunks")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    cache = FindingsCache(args.cache_dir)
+    compiler = _load_json(args.compiler)
+    with Path(args.diff).open("r", encoding="utf-8") as handle:
+        plan = plan_reuse(handle, compiler, cache)
+    if args.command == "prepare":
+        Path(args.out).write_text(plan.miss_diff, encoding="utf-8")
+        if args.cached:
+            _write(args.cached, {"findings": plan.cached})
+        _write(args.output, plan.summary())
+        return 0
+    _write(args.output, store_review(plan, _load_json(args.review), cache))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,174 @@
+"""Diff sharding and parallel reviewer fan-out for large diffs.
+
+A large diff is split by file (and by hunk for oversized files) into shards
+that stay under a byte budget. Each shard is tagged and compiled on its own,
+so it only carries the experts and rules its files trigger, and shards are
+reviewed concurrently. The per-shard review.json outputs are merged
+deterministically; with --dedupe, near-duplicate findings from different
+sources are collapsed too (findings.dedupe_findings).
+
+Usage:
+    python -m second_opinion.shard split --diff change.diff --out shards
+    python -m second_opinion.shard merge shards/*/review.json -o review.json
+    python -m second_opinion.shard merge --dedupe review.json -o review.json
+"""
+
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+import json
+from pathlib import Path
+import sys
+
+from second_opinion import trace
+from second_opinion.applicability import changed_lines
+from second_opinion.compiler import compile_review
+from second_opinion.diff import iter_file_diffs
+from second_opinion.findings import DEFAULT_SIMILARITY, dedupe_review, merge_reviews
+
+DEFAULT_MAX_BYTES = 48 * 1024
+DEFAULT_WORKERS = 4
+
+
+@dataclass
+class Shard:
+    index: int
+    files: list
+    text: str
+
+
+@dataclass
+class ShardResult:
+    shard: Shard
+    tagger: dict
+    compiler: dict
+    review: dict
+
+
+def _pieces(file_diff, max_bytes):
+    """Yield diff text for a file, splitting by hunk when it exceeds max_bytes."""
+    whole = file_diff.text()
+    if len(whole.encode("utf-8")) <= max_bytes or len(file_diff.hunks) < 2:
+        yield whole
+        return
+    header_size = len(file_diff.text([]).encode("utf-8"))
+    group, size = [], header_size
+    for hunk in file_diff.hunks:
+        hunk_size = len("".join(hunk).encode("utf-8"))
+        if group and size + hunk_size > max_bytes:
+            yield file_diff.text(group)
+            group, size = [], header_size
+        group.append(hunk)
+        size += hunk_size
+    if group:
+        yield file_diff.text(group)
+
+
+def split_diff(diff, max_bytes=DEFAULT_MAX_BYTES):
+    """Split a diff (text or iterable of lines) into byte-bounded shards.
+
+    Files are packed greedily in diff order; a single hunk larger than
+    max_bytes still becomes its own shard.
+    """
+    lines = diff.splitlines(keepends=True) if isinstance(diff, str) else diff
+    shards = []
+    files, parts, size = [], [], 0
+    for file_diff in iter_file_diffs(lines):
+        for piece in _pieces(file_diff, max_bytes):
+            piece_size = len(piece.encode("utf-8"))
+            if parts and size + piece_size > max_bytes:
+                shards.append(Shard(len(shards), files, "".join(parts)))
+                files, parts, size = [], [], 0
+            if file_diff.path not in files:
+                files.append(file_diff.path)
+            parts.append(piece)
+            size += piece_size
+    if parts:
+        shards.append(Shard(len(shards), files, "".join(parts)))
+    return shards
+
+
+def review_shard(shard, assets, tagger, reviewer, **compile_options):
+    """Tag, compile and review one shard.
+
+    tagger(diff_text) returns a tagger.json payload and
+    reviewer(compiled_prompt, diff_text) returns a review.json payload.
+    """
+    with trace.span("tagger", cat="model", shard=shard.index) as attrs:
+        tagged = tagger(shard.text)
+        if trace.enabled():
+            attrs.update(trace.call_stats((shard.text,), tagged))
+    tags = [item["tag"] for item in tagged.get("tags", [])]
+    compiled = compile_review(assets, tags, files=shard.files, changed=changed_lines(shard.text), **compile_options)
+    with trace.span("reviewer", cat="model", shard=shard.index) as attrs:
+        review = reviewer(compiled["compiled_prompt"], shard.text)
+        if trace.enabled():
+            attrs.update(trace.call_stats((compiled["compiled_prompt"], shard.text), review))
+    return ShardResult(shard=shard, tagger=tagged, compiler=compiled, review=review)
+
+
+def review_sharded(diff, assets, tagger, reviewer, max_bytes=DEFAULT_MAX_BYTES,
+                   workers=DEFAULT_WORKERS, **compile_options):
+    """Review a diff shard by shard with at most `workers` concurrent reviews.
+
+    Returns (merged review.json payload, per-shard results in shard order).
+    """
+    shards = split_diff(diff, max_bytes)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        results = list(
+            pool.map(
+                lambda shard: review_shard(shard, assets, tagger, reviewer, **compile_options),
+                shards,
+            )
+        )
+    return merge_reviews(result.review for result in results), results
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    split = commands.add_parser("split", help="write byte-bounded shards of a diff")
+    split.add_argument("--diff", required=True, help="diff file to split")
+    split.add_argument("--out", required=True, help="directory for shard-NNN/change.diff")
+    split.add_argument("--max-bytes", type=int, default=DEFAULT_MAX_BYTES, help="byte budget per shard")
+
+    merge = commands.add_parser("merge", help="merge per-shard review.json files")
+    merge.add_argument("reviews", nargs="+", help="review.json files")
+    merge.add_argument("--dedupe", action="store_true",
+                       help="also merge near-duplicate findings on overlapping lines")
+    merge.add_argument("--similarity", type=float, default=DEFAULT_SIMILARITY,
+                       help="message word overlap (0-1) at which --dedupe merges findings")
+    merge.add_argument("-o", "--output", help="write review.json here instead of stdout")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == "split":
+        out = Path(args.out)
+        with Path(args.diff).open("r", encoding="utf-8") as handle:
+            shards = split_diff(handle, args.max_bytes)
+        manifest = []
+        for shard in shards:
+            directory = out / f"shard-{shard.index:03d}"
+            directory.mkdir(parents=True, exist_ok=True)
+            (directory / "change.diff").write_text(shard.text, encoding="utf-8")
+            manifest.append({"shard": directory.name, "files": shard.files})
+        (out / "shards.json").write_text(json.dumps(manifest, indent=2) + "\n", encoding="utf-8")
+        return 0
+
+    reviews = [json.loads(Path(path).read_text(encoding="utf-8")) for path in args.reviews]
+    merged = merge_reviews(reviews)
+    if args.dedupe:
+        merged = dedupe_review(merged, args.similarity)
+    text = json.dumps(merged, indent=2) + "\n"
+    if args.output:
+        Path(args.output).write_text(text, encoding="utf-8")
+    else:
+        sys.stdout.write(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+"""Deterministic stand-in for the model-backed pipeline stages.
+
+The stub tagger returns the mechanical tagger.json (signals, lang tags and
+path-derived component tags); the stub reviewer reports one low-severity
+finding on the first added line of every file, attributed to the first rule
+in the compiled prompt (or the first policy when no rule was selected). It
+does no semantic work: it exists so benchmarks and offline end-to-end runs
+exercise the real parsing, compiling and merging code with stable outputs.
+"""
+
+import re
+
+from second_opinion.components import load_components
+from second_opinion.diff import mechanical_selection, parse_diff
+
+RULE_RE = re.compile(r"^- rule_id: (\S+)", re.MULTILINE)
+POLICY_RE = re.compile(r"^## Policy: (\S+)", re.MULTILINE)
+
+
+def _lines(diff_text):
+    return diff_text.splitlines(keepends=True)
+
+
+class StubModel:
+    def __init__(self, matcher=None, repo=None):
+        self.matcher = matcher if matcher is not None else load_components(repo=repo)
+
+    def tag(self, diff_text):
+        records = list(parse_diff(_lines(diff_text)))
+        by_tag, _ = self.matcher.classify(record.path for record in records)
+        return mechanical_selection(records, by_tag)
+
+    def review(self, compiled_prompt, diff_text):
+        rule = RULE_RE.search(compiled_prompt)
+        policy = POLICY_RE.search(compiled_prompt)
+        if rule:
+            source = {"type": "rule", "id": rule.group(1)}
+        elif policy:
+            source = {"type": "policy", "id": policy.group(1)}
+        else:
+            return {"findings": []}
+        findings = []
+        for record in parse_diff(_lines(diff_text)):
+            if not record.added:
+                continue
+            start = record.added[0][0]
+            findings.append(
+                {
+                    "file": record.path,
+                    "lines": f"L{start}",
+                    "source": source,
+                    "tags": [],
+                    "severity": "low",
+                    "message": f"Stub finding for {record.path}.",
+                }
+            )
+        return {"findings": findings}
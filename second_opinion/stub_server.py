@@ -0,0 +1,188 @@
+"""Local OpenAI-compatible stub server with record/replay.
+
+Every POST under /v1 (chat completions, responses, ...) is keyed by a hash of
+the request path and body, with volatile fields dropped and temp-directory
+paths scrubbed so the same prompt from a fresh test workspace hits the same
+recording. In replay mode a recorded response is served verbatim (streamed
+SSE bodies included); a request without a recording gets a 404 naming its
+key. In record mode requests are forwarded to --upstream and the responses
+saved, one JSON file per key.
+
+Usage:
+    python -m second_opinion.stub_server --recordings tests/recordings --port 8765
+    python -m second_opinion.stub_server --recordings tests/recordings --record --upstream https://api.openai.com
+"""
+
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import os
+from pathlib import Path
+import re
+import sys
+import tempfile
+import threading
+import urllib.error
+import urllib.request
+
+from second_opinion.cache import json_key
+from second_opinion.index import write_json_atomic
+
+# Request fields that change between otherwise identical runs.
+VOLATILE_FIELDS = ("user", "metadata", "prompt_cache_key", "previous_response_id")
+TMP_PLACEHOLDER = "<tmp>"
+_TMP_DIRS = sorted({tempfile.gettempdir(), os.path.realpath(tempfile.gettempdir())}, key=len, reverse=True)
+TMP_PATH = re.compile("(?:" + "|".join(re.escape(d) for d in _TMP_DIRS) + r")/[^/\s\"']+")
+UPSTREAM_TIMEOUT = 600
+
+
+def request_key(path, body, scrub=()):
+    """Hash of the request path and normalized JSON body."""
+    try:
+        payload = json.loads(body or b"{}")
+    except ValueError:
+        payload = body.decode("utf-8", "replace")
+    if isinstance(payload, dict):
+        payload = {k: v for k, v in payload.items() if k not in VOLATILE_FIELDS}
+    text = json.dumps(payload, sort_keys=True)
+    for pattern in (TMP_PATH, *scrub):
+        text = pattern.sub(TMP_PLACEHOLDER, text)
+    return json_key({"path": path, "body": text})
+
+
+class Recordings:
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        try:
+            entry = json.loads((self.directory / f"{key}.json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            entry = None
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return entry
+
+    def put(self, key, entry):
+        return write_json_atomic(self.directory / f"{key}.json", entry)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    server_version = "second-opinion-stub"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send(self, status, body, content_type="application/json"):
+        data = body.encode("utf-8") if isinstance(body, str) else body
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _error(self, status, message, kind):
+        self._send(status, json.dumps({"error": {"message": message, "type": kind}}))
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self._send(200, json.dumps({"object": "list", "data": [{"id": "stub", "object": "model"}]}))
+        else:
+            self._error(404, f"unknown path: {self.path}", "not_found")
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        key = request_key(self.path, body, self.server.scrub)
+        if self.server.upstream:
+            entry = self._forward(body)
+            if entry is None:
+                return
+            self.server.recordings.put(key, entry)
+        else:
+            entry = self.server.recordings.get(key)
+            if entry is None:
+                self._error(404, f"no recording for request {key}", "stub_miss")
+                return
+        self._send(entry["status"], entry["body"], entry["content_type"])
+
+    def _forward(self, body):
+        request = urllib.request.Request(self.server.upstream + self.path, data=body, method="POST")
+        for header in ("Authorization", "Content-Type", "Accept", "OpenAI-Organization", "OpenAI-Beta"):
+            if self.headers.get(header):
+                request.add_header(header, self.headers[header])
+        try:
+            with urllib.request.urlopen(request, timeout=UPSTREAM_TIMEOUT) as response:
+                status, headers, data = response.status, response.headers, response.read()
+        except urllib.error.HTTPError as exc:
+            status, headers, data = exc.code, exc.headers, exc.read()
+        except OSError as exc:
+            self._error(502, f"upstream failed: {exc}", "upstream_error")
+            return None
+        return {
+            "status": status,
+            "content_type": headers.get("Content-Type", "application/json"),
+            "body": data.decode("utf-8", "replace"),
+        }
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, recordings, host="127.0.0.1", port=0, upstream=None, scrub=(), verbose=False):
+        super().__init__((host, port), StubHandler)
+        self.recordings = recordings if isinstance(recordings, Recordings) else Recordings(recordings)
+        self.upstream = upstream.rstrip("/") if upstream else None
+        self.scrub = tuple(re.compile(p) if isinstance(p, str) else p for p in scrub)
+        self.verbose = verbose
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        """Serve from a daemon thread and return self."""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--recordings", required=True, help="directory of recorded responses")
+    parser.add_argument("--host", default="127.0.0.1", help="bind address")
+    parser.add_argument("--port", type=int, default=8765, help="port (0 picks a free one)")
+    parser.add_argument("--record", action="store_true", help="forward to --upstream and save responses")
+    parser.add_argument("--upstream", default="https://api.openai.com", help="upstream base URL for --record")
+    parser.add_argument("--scrub", action="append", default=[], help="extra regex to blank out before hashing")
+    parser.add_argument("-v", "--verbose", action="store_true", help="log every request")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    server = StubServer(args.recordings, args.host, args.port, args.upstream if args.record else None,
+                        args.scrub, args.verbose)
+    sys.stderr.write(f"serving {'record' if args.record else 'replay'} mode at {server.base_url}\n")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,20 @@
+"""Access to the controlled tag vocabulary in taxonomy.md."""
+
+from pathlib import Path
+import re
+
+from second_opinion.assets import REPO_ROOT
+
+TAXONOMY_PATH = REPO_ROOT / "taxonomy.md"
+
+_TAG_LINE = re.compile(r"^- ([a-z]+:[\w./-]+)\s*$")
+
+
+def load_taxonomy(path=TAXONOMY_PATH):
+    """Return the taxonomy tags in file order."""
+    tags = []
+    for line in Path(path).read_text(encoding="utf-8").splitlines():
+        match = _TAG_LINE.match(line)
+        if match:
+            tags.append(match.group(1))
+    return tags
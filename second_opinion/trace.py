@@ -0,0 +1,250 @@
+"""Lightweight span tracing for the pipeline, exported as JSON lines.
+
+Tracing is off unless $SECOND_OPINION_TRACE names a trace file (or
+configure() is called). When off, span() hands back a shared no-op context,
+so instrumented code pays one attribute lookup per span. When on, finished
+spans are buffered and appended to the file in batches; several processes
+can append to the same file.
+
+Each line is {"name", "cat", "ts", "dur", "pid", "tid", "args"} with
+microsecond timestamps; instant events have no "dur". `chrome` converts a
+trace to the Chrome trace-event format (chrome://tracing, Perfetto) and
+`summary` aggregates time per span name.
+
+Usage:
+    SECOND_OPINION_TRACE=trace.jsonl python -m second_opinion.compiler --tags tagger.json
+    python -m second_opinion.trace chrome trace.jsonl -o trace.json
+    python -m second_opinion.trace summary trace.jsonl
+"""
+
+import argparse
+import atexit
+from contextlib import contextmanager
+import json
+import os
+from pathlib import Path
+import sys
+import threading
+import time
+
+TRACE_ENV = "SECOND_OPINION_TRACE"
+FLUSH_EVERY = 256
+
+
+class _Discard(dict):
+    """Span attributes sink used while tracing is off."""
+
+    def __setitem__(self, key, value):
+        pass
+
+    def update(self, *args, **kwargs):
+        pass
+
+
+class _NullSpan:
+    def __enter__(self):
+        return _Discard()
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    enabled = True
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._buffer = []
+        self._lock = threading.Lock()
+
+    def _record(self, record):
+        with self._lock:
+            self._buffer.append(record)
+            if len(self._buffer) < FLUSH_EVERY:
+                return
+            lines, self._buffer = self._buffer, []
+        self._write(lines)
+
+    def _write(self, records):
+        text = "".join(json.dumps(record, separators=(",", ":")) + "\n" for record in records)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("a", encoding="utf-8") as handle:
+            handle.write(text)
+
+    @contextmanager
+    def span(self, name, cat="pipeline", **attrs):
+        """Time the block; attributes set on the yielded dict land in args."""
+        ts = time.time_ns() // 1000
+        started = time.perf_counter_ns()
+        try:
+            yield attrs
+        except BaseException as exc:
+            attrs["error"] = type(exc).__name__
+            raise
+        finally:
+            self._record(
+                {
+                    "name": name,
+                    "cat": cat,
+                    "ts": ts,
+                    "dur": (time.perf_counter_ns() - started) // 1000,
+                    "pid": os.getpid(),
+                    "tid": threading.get_ident(),
+                    "args": attrs,
+                }
+            )
+
+    def event(self, name, cat="pipeline", **attrs):
+        self._record(
+            {
+                "name": name,
+                "cat": cat,
+                "ts": time.time_ns() // 1000,
+                "pid": os.getpid(),
+                "tid": threading.get_ident(),
+                "args": attrs,
+            }
+        )
+
+    def flush(self):
+        with self._lock:
+            lines, self._buffer = self._buffer, []
+        if lines:
+            self._write(lines)
+
+
+class NullTracer:
+    enabled = False
+
+    def span(self, name, cat="pipeline", **attrs):
+        return _NULL_SPAN
+
+    def event(self, name, cat="pipeline", **attrs):
+        pass
+
+    def flush(self):
+        pass
+
+
+_tracer = None
+
+
+def configure(path=None):
+    """Trace to path from now on (None turns tracing off); return the tracer."""
+    global _tracer
+    if _tracer is not None:
+        _tracer.flush()
+    _tracer = Tracer(path) if path else NullTracer()
+    return _tracer
+
+
+def get_tracer():
+    if _tracer is None:
+        configure(os.environ.get(TRACE_ENV))
+    return _tracer
+
+
+def span(name, cat="pipeline", **attrs):
+    return get_tracer().span(name, cat, **attrs)
+
+
+def event(name, cat="pipeline", **attrs):
+    get_tracer().event(name, cat, **attrs)
+
+
+def enabled():
+    return get_tracer().enabled
+
+
+def call_stats(args, result):
+    """Input/output sizes of a tagger or reviewer call, as span attributes."""
+    from second_opinion.budget import estimate_tokens
+
+    text = "".join(arg for arg in args if isinstance(arg, str))
+    stats = {
+        "input_bytes": len(text.encode("utf-8")),
+        "input_tokens": estimate_tokens(text),
+        "output_bytes": len(json.dumps(result)),
+    }
+    if isinstance(result, dict):
+        for key in ("findings", "tags"):
+            if isinstance(result.get(key), list):
+                stats[key] = len(result[key])
+    return stats
+
+
+atexit.register(lambda: _tracer is not None and _tracer.flush())
+
+
+def read_trace(path):
+    with Path(path).open("r", encoding="utf-8") as handle:
+        return [json.loads(line) for line in handle if line.strip()]
+
+
+def to_chrome(records):
+    """Convert trace records to the Chrome trace-event JSON object format."""
+    events = []
+    for record in records:
+        event = {
+            "name": record["name"],
+            "cat": record["cat"],
+            "ts": record["ts"],
+            "pid": record["pid"],
+            "tid": record["tid"],
+            "args": record.get("args", {}),
+        }
+        if "dur" in record:
+            event.update(ph="X", dur=record["dur"])
+        else:
+            event.update(ph="i", s="t")
+        events.append(event)
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def summarize(records):
+    """{span name: {"count", "total_ms", "max_ms"}} sorted by total time."""
+    totals = {}
+    for record in records:
+        if "dur" not in record:
+            continue
+        entry = totals.setdefault(record["name"], {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+        ms = record["dur"] / 1000
+        entry["count"] += 1
+        entry["total_ms"] += ms
+        entry["max_ms"] = max(entry["max_ms"], ms)
+    ordered = sorted(totals.items(), key=lambda item: -item[1]["total_ms"])
+    return {
+        name: {key: round(value, 3) if isinstance(value, float) else value for key, value in entry.items()}
+        for name, entry in ordered
+    }
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    chrome = commands.add_parser("chrome", help="convert a JSON-lines trace to Chrome trace format")
+    chrome.add_argument("trace", help="JSON-lines trace file")
+    chrome.add_argument("-o", "--output", help="write here instead of stdout")
+    summary = commands.add_parser("summary", help="time per span name")
+    summary.add_argument("trace", help="JSON-lines trace file")
+    summary.add_argument("-o", "--output", help="write here instead of stdout")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    records = read_trace(args.trace)
+    payload = to_chrome(records) if args.command == "chrome" else summarize(records)
+    text = json.dumps(payload, indent=2) + "\n"
+    if args.output:
+        Path(args.output).write_text(text, encoding="utf-8")
+    else:
+        sys.stdout.write(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
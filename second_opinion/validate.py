@@ -0,0 +1,312 @@
+"""Offline validation of tagger.json, compiler.json and review.json outputs.
+
+Schemas under schemas/ are compiled once into plain Python checks (the
+subset of JSON Schema they use: type, enum, required, properties,
+additionalProperties, items, anyOf). On top of the schema, outputs are
+checked against the asset tree: tags must be in taxonomy.md, selected rules,
+processes and policies must exist, provenance must cover every selected
+item, prompt segment hashes must match compiled_prompt, and every finding's
+source must resolve.
+
+Usage:
+    python -m second_opinion.validate archive/ --cross-check
+    python -m second_opinion.validate examples/ --include-samples
+    python -m second_opinion.validate --kind review path/to/output.json
+"""
+
+import argparse
+import hashlib
+import json
+import os
+from pathlib import Path
+import sys
+import time
+
+from second_opinion.assets import REPO_ROOT
+from second_opinion.compiler import SEGMENT_SEPARATOR, segment_blocks
+from second_opinion.index import load_index
+from second_opinion.taxonomy import load_taxonomy
+
+SCHEMA_DIR = REPO_ROOT / "schemas"
+SCHEMA_FILES = {
+    "selection": "selection.schema.json",
+    "compile": "compile.schema.json",
+    "review": "review.schema.json",
+}
+# Output file name -> kind, for directory sweeps.
+KINDS_BY_NAME = {
+    "tagger.json": "selection",
+    "compiler.json": "compile",
+    "review.json": "review",
+}
+
+_TYPES = {
+    "object": dict,
+    "array": list,
+    "string": str,
+    "boolean": bool,
+    "null": type(None),
+}
+
+
+def _is_type(value, name):
+    if name == "integer":
+        return isinstance(value, int) and not isinstance(value, bool)
+    if name == "number":
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+    return isinstance(value, _TYPES[name])
+
+
+def compile_schema(schema):
+    """Compile a JSON Schema node into check(value, path, errors)."""
+    checks = []
+    if "type" in schema:
+        names = schema["type"] if isinstance(schema["type"], list) else [schema["type"]]
+
+        def check_type(value, path, errors):
+            if not any(_is_type(value, name) for name in names):
+                errors.append(f"{path}: expected {'/'.join(names)}")
+                return False
+            return True
+
+        checks.append(check_type)
+    if "enum" in schema:
+        allowed = schema["enum"]
+
+        def check_enum(value, path, errors):
+            if value not in allowed:
+                errors.append(f"{path}: {value!r} not in {allowed}")
+            return True
+
+        checks.append(check_enum)
+    if "anyOf" in schema:
+        options = [compile_schema(option) for option in schema["anyOf"]]
+
+        def check_any(value, path, errors):
+            for option in options:
+                if not option(value, path, []):
+                    return True
+            errors.append(f"{path}: matches no allowed shape")
+            return True
+
+        checks.append(check_any)
+    if "required" in schema or "properties" in schema or "additionalProperties" in schema:
+        required = schema.get("required", [])
+        properties = {key: compile_schema(sub) for key, sub in schema.get("properties", {}).items()}
+        extra = schema.get("additionalProperties", True)
+        extra_check = compile_schema(extra) if isinstance(extra, dict) else None
+
+        def check_object(value, path, errors):
+            if not isinstance(value, dict):
+                return True
+            for key in required:
+                if key not in value:
+                    errors.append(f"{path}: missing {key}")
+            for key, item in value.items():
+                check = properties.get(key)
+                if check is not None:
+                    check(item, f"{path}.{key}", errors)
+                elif extra_check is not None:
+                    extra_check(item, f"{path}.{key}", errors)
+                elif extra is False:
+                    errors.append(f"{path}: unexpected {key}")
+            return True
+
+        checks.append(check_object)
+    if "items" in schema:
+        item_check = compile_schema(schema["items"])
+
+        def check_items(value, path, errors):
+            if isinstance(value, list):
+                for index, item in enumerate(value):
+                    item_check(item, f"{path}[{index}]", errors)
+            return True
+
+        checks.append(check_items)
+
+    def check(value, path, errors):
+        before = len(errors)
+        for step in checks:
+            if not step(value, path, errors):
+                break
+        return len(errors) - before
+
+    return check
+
+
+class Validator:
+    """Schema plus semantic checks against one asset tree and taxonomy."""
+
+    def __init__(self, assets, taxonomy, schema_dir=SCHEMA_DIR):
+        self.assets = assets
+        self.taxonomy = set(taxonomy)
+        self.schemas = {
+            kind: compile_schema(json.loads((Path(schema_dir) / name).read_text(encoding="utf-8")))
+            for kind, name in SCHEMA_FILES.items()
+        }
+        self.experts = {expert.id for expert in assets.experts}
+        self.sources = {
+            "rule": {rule.rule_id for expert in assets.experts for rule in expert.rules},
+            "process": {process.id for process in assets.processes},
+            "policy": {policy.id for policy in assets.policies},
+        }
+
+    def validate(self, kind, data, compiler=None):
+        """Return a list of error strings; compiler narrows review source checks."""
+        errors = []
+        self.schemas[kind](data, "$", errors)
+        if errors or not isinstance(data, dict):
+            return errors
+        getattr(self, f"_check_{kind}")(data, errors, compiler)
+        return errors
+
+    def _check_tags(self, tags, path, errors):
+        for index, tag in enumerate(tags):
+            if tag not in self.taxonomy:
+                errors.append(f"{path}[{index}]: tag not in taxonomy: {tag}")
+
+    def _check_selection(self, data, errors, _compiler):
+        self._check_tags([item["tag"] for item in data["tags"]], "$.tags", errors)
+
+    def _check_compile(self, data, errors, _compiler):
+        rules_used = data["rules_used"]
+        if list(rules_used) != data["selected_experts"]:
+            errors.append("$.selected_experts: does not match rules_used keys")
+        for expert, rule_ids in rules_used.items():
+            if expert not in self.experts:
+                errors.append(f"$.rules_used.{expert}: unknown expert")
+            for rule_id in rule_ids:
+                if rule_id not in self.sources["rule"]:
+                    errors.append(f"$.rules_used.{expert}: unknown rule {rule_id}")
+                elif self.assets.rule(rule_id).expert != expert:
+                    errors.append(f"$.rules_used.{expert}: {rule_id} belongs to another expert")
+        for key, kind in (("selected_processes", "process"), ("selected_policies", "policy")):
+            for item in data[key]:
+                if item not in self.sources[kind]:
+                    errors.append(f"$.{key}: unknown {kind} {item}")
+
+        covered = {"rule": set(), "process": set(), "policy": set()}
+        for entry in data["provenance"]:
+            if entry.get("reason", "").startswith("dropped"):
+                continue
+            for kind, field in (("rule", "rule_id"), ("process", "process"), ("policy", "policy")):
+                if field in entry:
+                    covered[kind].add(entry[field])
+        selected = {
+            "rule": [rule_id for rule_ids in rules_used.values() for rule_id in rule_ids],
+            "process": data["selected_processes"],
+            "policy": data["selected_policies"],
+        }
+        for kind, items in selected.items():
+            for item in items:
+                if item not in covered[kind]:
+                    errors.append(f"$.provenance: no entry for {kind} {item}")
+        # Only the python compiler records segments; model-written outputs have none.
+        if "prompt_segments" in data:
+            self._check_segments(data["compiled_prompt"], data["prompt_segments"], errors)
+
+    def _check_segments(self, prompt, segments, errors):
+        for index, (segment, block) in enumerate(segment_blocks(prompt, segments)):
+            if hashlib.sha256(block).hexdigest() != segment["sha256"]:
+                errors.append(f"$.prompt_segments[{index}]: hash does not match compiled_prompt")
+                return
+        separators = len(SEGMENT_SEPARATOR.encode("utf-8")) * (len(segments) - 1)
+        covered = sum(segment["bytes"] for segment in segments) + separators
+        if segments and covered + 1 != len(prompt.encode("utf-8")):
+            errors.append("$.prompt_segments: do not cover compiled_prompt")
+
+    def _check_review(self, data, errors, compiler):
+        allowed = None
+        if compiler is not None:
+            allowed = {
+                "rule": {r for rule_ids in compiler.get("rules_used", {}).values() for r in rule_ids},
+                "process": set(compiler.get("selected_processes", [])),
+                "policy": set(compiler.get("selected_policies", [])),
+            }
+        for index, finding in enumerate(data["findings"]):
+            path = f"$.findings[{index}]"
+            attributions = [(f"{path}.source", finding["source"])]
+            attributions.extend((f"{path}.sources[{n}]", s) for n, s in enumerate(finding.get("sources", ())))
+            for where, source in attributions:
+                if source["id"] not in self.sources[source["type"]]:
+                    errors.append(f"{where}: unknown {source['type']} {source['id']}")
+                elif allowed is not None and source["id"] not in allowed[source["type"]]:
+                    errors.append(f"{where}: {source['type']} {source['id']} was not selected")
+            self._check_tags(finding["tags"], f"{path}.tags", errors)
+
+
+def iter_outputs(paths):
+    """Yield (kind, path) for output files, walking directories."""
+    for path in map(Path, paths):
+        if path.is_file():
+            yield KINDS_BY_NAME.get(path.name), path
+            continue
+        for dirpath, _, filenames in os.walk(path):
+            for name in sorted(filenames):
+                if name in KINDS_BY_NAME:
+                    yield KINDS_BY_NAME[name], Path(dirpath) / name
+
+
+def validate_paths(validator, paths, kind=None, cross_check=False):
+    """Validate every output under paths; return (count, {path: [errors]}).
+
+    With cross_check, a review.json is also checked against the compiler.json
+    in the same directory, when there is one.
+    """
+    failures = {}
+    compilers = {}
+    count = 0
+    for found_kind, path in iter_outputs(paths):
+        found_kind = kind or found_kind
+        if found_kind is None:
+            failures[str(path)] = ["cannot infer output kind; pass --kind"]
+            continue
+        count += 1
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as exc:
+            failures[str(path)] = [f"unreadable: {exc}"]
+            continue
+        compiler = None
+        if cross_check and found_kind == "review":
+            sibling = path.with_name("compiler.json")
+            if sibling not in compilers:
+                try:
+                    compilers[sibling] = json.loads(sibling.read_text(encoding="utf-8"))
+                except (OSError, ValueError):
+                    compilers[sibling] = None
+            compiler = compilers[sibling]
+        errors = validator.validate(found_kind, data, compiler)
+        if errors:
+            failures[str(path)] = errors
+    return count, failures
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("paths", nargs="+", help="output files or directories to sweep")
+    parser.add_argument("--kind", choices=sorted(SCHEMA_FILES), help="treat every file as this kind")
+    parser.add_argument("--root", default=str(REPO_ROOT), help="asset root directory")
+    parser.add_argument("--include-samples", action="store_true", help="accept sample foo assets")
+    parser.add_argument("--cross-check", action="store_true",
+                        help="require review sources to be selected in the sibling compiler.json")
+    parser.add_argument("--cache-dir", help="asset index directory")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    assets = load_index(args.root, include_samples=args.include_samples, cache_dir=args.cache_dir)
+    validator = Validator(assets, load_taxonomy(Path(args.root) / "taxonomy.md"))
+    started = time.perf_counter()
+    count, failures = validate_paths(validator, args.paths, args.kind, args.cross_check)
+    elapsed = time.perf_counter() - started
+    for path, errors in failures.items():
+        for error in errors:
+            sys.stdout.write(f"{path}: {error}\n")
+    sys.stderr.write(f"{count} outputs validated in {elapsed:.3f}s, {len(failures)} invalid\n")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
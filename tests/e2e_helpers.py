@@ -1,3 +1,4 @@
+import hashlib
 import json
 import os
 from pathlib import Path
@@ -6,6 +7,8 @@ import subprocess
 import tempfile
 import unittest
 
+from second_opinion.bundle import build as build_bundle
+
 REPO_ROOT = Path(__file__).resolve().parents[1]
 
 
@@ -65,14 +68,19 @@ def _copy_config(codex_home):
         shutil.copy2(config_src, codex_home / "config.toml")
 
 
-def _install_skills(codex_home):
+SKILL_IGNORE = shutil.ignore_patterns(".git", "__pycache__", ".cache", ".pytest_cache")
+SAMPLE_BEFORE = "package main\n\nfunc add(a, b int) int { return a + b }\n"
+SAMPLE_AFTER = SAMPLE_BEFORE + "\nfunc sub(a, b int) int { return a - b }\n"
+
+
+def _install_skills(codex_home, install="bundle"):
+    """Install the skill as a packed bundle, or as a full repo copy with install="tree"."""
     skill_dst = codex_home / "skills" / "second-opinion"
     skill_dst.parent.mkdir(parents=True, exist_ok=True)
-    shutil.copytree(
-        REPO_ROOT,
-        skill_dst,
-        ignore=shutil.ignore_patterns(".git", "__pycache__"),
-    )
+    if install == "tree":
+        shutil.copytree(REPO_ROOT, skill_dst, ignore=SKILL_IGNORE)
+    else:
+        build_bundle(skill_dst, REPO_ROOT)
 
     skills_src = REPO_ROOT / "skills"
     if skills_src.is_dir():
@@ -82,11 +90,82 @@ def _install_skills(codex_home):
             if not (child / "SKILL.md").is_file():
                 continue
             dst = codex_home / "skills" / child.name
-            shutil.copytree(
-                child,
-                dst,
-                ignore=shutil.ignore_patterns(".git", "__pycache__"),
-            )
+            shutil.copytree(child, dst, ignore=SKILL_IGNORE)
+
+
+def _seed_repo(repo):
+    repo.mkdir()
+    _run(["git", "init"], cwd=repo)
+    _run(["git", "config", "user.email", "codex@example.com"], cwd=repo)
+    _run(["git", "config", "user.name", "Codex"], cwd=repo)
+
+    sample_file = repo / "main.go"
+    sample_file.write_text(SAMPLE_BEFORE, encoding="utf-8")
+    _run(["git", "add", "main.go"], cwd=repo)
+    _run(["git", "commit", "-m", "init"], cwd=repo)
+    sample_file.write_text(SAMPLE_AFTER, encoding="utf-8")
+
+    diff = _run(["git", "diff"], cwd=repo).stdout
+    if not diff.strip():
+        raise AssertionError("git diff returned empty output")
+    (repo / "change.diff").write_text(diff, encoding="utf-8")
+
+
+def _tree_digest():
+    """Hash of every file the installed skills tree is copied from."""
+    digest = hashlib.sha256()
+    for dirpath, dirnames, filenames in os.walk(REPO_ROOT):
+        dirnames[:] = sorted(d for d in dirnames if d not in (".git", "__pycache__", ".cache", ".pytest_cache"))
+        for name in sorted(filenames):
+            path = Path(dirpath) / name
+            stat = path.stat()
+            digest.update(f"{path.relative_to(REPO_ROOT)}\0{stat.st_mtime_ns}\0{stat.st_size}\n".encode())
+    return digest.hexdigest()[:16]
+
+
+def _prune_templates(base, install, keep):
+    """Remove finished templates of the same install kind built for older trees."""
+    for stale in base.glob(f"second-opinion-e2e-{install}-*"):
+        # Staging directories ("<template>.<suffix>") may belong to a build in progress.
+        if stale != keep and "." not in stale.name:
+            shutil.rmtree(stale, ignore_errors=True)
+
+
+def workspace_template(install="bundle"):
+    """Build (once per asset tree and install kind) the installed skills and seed git repo.
+
+    Templates live under $CODEX_E2E_TEMPLATE_DIR (default: the system temp
+    dir) keyed by a digest of the repo tree, so every test process of a run,
+    including the subprocesses of tests/run_e2e.py, shares one build; building
+    a new template removes the ones left from earlier trees. Tests whose
+    prompts read the raw asset directories or tests/fixtures use
+    install="tree".
+    """
+    base = Path(os.environ.get("CODEX_E2E_TEMPLATE_DIR", tempfile.gettempdir()))
+    template = base / f"second-opinion-e2e-{install}-{_tree_digest()}"
+    if (template / "workspace" / "change.diff").is_file():
+        return template
+    base.mkdir(parents=True, exist_ok=True)
+    staging = Path(tempfile.mkdtemp(prefix=f"{template.name}.", dir=base))
+    try:
+        _install_skills(staging / "codex_home", install)
+        _seed_repo(staging / "workspace")
+        os.rename(staging, template)
+        _prune_templates(base, install, template)
+    except OSError:
+        # Another process published the same template first.
+        if not (template / "workspace" / "change.diff").is_file():
+            raise
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    return template
+
+
+def _link_or_copy(src, dst):
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
 
 
 def codex_exec(codex_cmd, repo, codex_home, prompt, auth_key):
@@ -123,43 +202,28 @@ def codex_exec(codex_cmd, repo, codex_home, prompt, auth_key):
         )
 
 
-def prepare_workspace(add_cleanup):
+def prepare_workspace(add_cleanup, install="bundle"):
+    """Give a test its own CODEX_HOME and workspace cloned from the template.
+
+    The skills tree is hardlinked (the agent only reads it); the small seed
+    repo is copied so each test can write to it freely.
+    """
     codex_cmd = os.environ.get("CODEX_E2E_CMD", "codex")
     _require_tool(codex_cmd)
     _require_tool("git")
+    template = workspace_template(install)
 
     tmp = tempfile.TemporaryDirectory()
     add_cleanup(tmp.cleanup)
     tmp_path = Path(tmp.name)
 
     codex_home = tmp_path / "codex_home"
+    shutil.copytree(template / "codex_home", codex_home, copy_function=_link_or_copy)
     auth_key = _ensure_auth(codex_home)
     _copy_config(codex_home)
-    _install_skills(codex_home)
 
     repo = tmp_path / "workspace"
-    repo.mkdir()
-    _run(["git", "init"], cwd=repo)
-    _run(["git", "config", "user.email", "codex@example.com"], cwd=repo)
-    _run(["git", "config", "user.name", "Codex"], cwd=repo)
-
-    sample_file = repo / "main.go"
-    sample_file.write_text(
-        "package main\n\nfunc add(a, b int) int { return a + b }\n",
-        encoding="utf-8",
-    )
-    _run(["git", "add", "main.go"], cwd=repo)
-    _run(["git", "commit", "-m", "init"], cwd=repo)
-
-    sample_file.write_text(
-        "package main\n\nfunc add(a, b int) int { return a + b }\n\nfunc sub(a, b int) int { return a - b }\n",
-        encoding="utf-8",
-    )
-
-    diff = _run(["git", "diff"], cwd=repo).stdout
-    if not diff.strip():
-        raise AssertionError("git diff returned empty output")
+    shutil.copytree(template / "workspace", repo, symlinks=True)
     diff_path = repo / "change.diff"
-    diff_path.write_text(diff, encoding="utf-8")
 
     return codex_cmd, codex_home, repo, diff_path, auth_key
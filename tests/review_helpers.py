@@ -0,0 +1,14 @@
+"""Diff and finding builders shared by the hunk-level review tests."""
+
+HEADER = "diff --git a/{0} b/{0}\n--- a/{0}\n+++ b/{0}\n"
+
+
+def hunk(start, body):
+    lines = body.splitlines()
+    added = sum(1 for line in lines if not line.startswith("-"))
+    return f"@@ -{start},1 +{start},{added} @@\n" + "".join(f"{line}\n" for line in lines)
+
+
+def finding(path, lines, rule, message="m"):
+    return {"file": path, "lines": lines, "source": {"type": "rule", "id": rule},
+            "tags": [], "severity": "medium", "message": message}
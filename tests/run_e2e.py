@@ -0,0 +1,125 @@
+"""Run the Codex end-to-end tests concurrently against the local stub server.
+
+Each test method runs in its own `python -m unittest` subprocess with
+CODEX_E2E=1 and OPENAI_BASE_URL pointing at an in-process StubServer, so the
+suite needs no network in replay mode. Use --record once (with real
+credentials) to capture responses into the recordings directory; replay mode
+stops early when that directory holds no recordings.
+
+Usage:
+    python -m tests.run_e2e --workers 8
+    python -m tests.run_e2e --record -k fixture
+"""
+
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import os
+from pathlib import Path
+import subprocess
+import sys
+import time
+import unittest
+
+from second_opinion.stub_server import StubServer
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+RECORDINGS = REPO_ROOT / "tests" / "recordings"
+E2E_PATTERNS = ("test_e2e_*.py", "test_integration_*.py")
+DEFAULT_WORKERS = 4
+DEFAULT_TIMEOUT = 120
+
+
+def _iter_tests(suite):
+    for item in suite:
+        if isinstance(item, unittest.TestSuite):
+            yield from _iter_tests(item)
+        else:
+            yield item
+
+
+def e2e_test_ids(patterns=E2E_PATTERNS, keyword=None):
+    loader = unittest.TestLoader()
+    ids = []
+    for pattern in patterns:
+        for path in (REPO_ROOT / "tests").glob(pattern):
+            suite = loader.loadTestsFromName(f"tests.{path.stem}")
+            ids.extend(test.id() for test in _iter_tests(suite))
+    return sorted(i for i in set(ids) if not keyword or keyword in i)
+
+
+def run_test(test_id, env, timeout):
+    started = time.perf_counter()
+    try:
+        result = subprocess.run(
+            [sys.executable, "-m", "unittest", test_id],
+            cwd=REPO_ROOT,
+            env=env,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            timeout=timeout,
+        )
+        returncode, output = result.returncode, result.stdout
+    except subprocess.TimeoutExpired as exc:
+        returncode, output = -1, f"timed out after {timeout}s\n{exc.stdout or ''}"
+    return test_id, returncode, output, time.perf_counter() - started
+
+
+def has_recordings(directory):
+    directory = Path(directory)
+    return directory.is_dir() and any(directory.glob("*.json"))
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--recordings", default=str(RECORDINGS), help="recorded responses directory")
+    parser.add_argument("--record", action="store_true", help="forward to --upstream and record responses")
+    parser.add_argument("--upstream", default="https://api.openai.com", help="upstream base URL for --record")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="concurrent tests")
+    parser.add_argument("--timeout", type=int, default=DEFAULT_TIMEOUT, help="per-test timeout in seconds")
+    parser.add_argument("-k", "--keyword", help="only run tests whose id contains this")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if not args.record and not has_recordings(args.recordings):
+        sys.stderr.write(
+            f"no recordings in {args.recordings}; run `python -m tests.run_e2e --record` with real "
+            "credentials first to capture them\n"
+        )
+        return 2
+    server = StubServer(args.recordings, upstream=args.upstream if args.record else None).start()
+    env = os.environ.copy()
+    env.update(
+        {
+            "CODEX_E2E": "1",
+            "OPENAI_BASE_URL": server.base_url,
+            "CODEX_E2E_TIMEOUT": str(args.timeout),
+        }
+    )
+    if not args.record:
+        env.setdefault("OPENAI_API_KEY", "stub")
+    failed = 0
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+            tests = e2e_test_ids(keyword=args.keyword)
+            for test_id, returncode, output, seconds in pool.map(
+                lambda test_id: run_test(test_id, env, args.timeout + 30), tests
+            ):
+                status = "FAIL" if returncode else "skip" if "OK (skipped" in output else "ok"
+                sys.stdout.write(f"{status:4} {seconds:7.2f}s {test_id}\n")
+                if returncode != 0:
+                    failed += 1
+                    sys.stdout.write(output)
+    finally:
+        server.stop()
+    recordings = server.recordings
+    sys.stdout.write(
+        f"{len(tests)} tests, {failed} failed; recordings: {recordings.hits} hits, {recordings.misses} misses\n"
+    )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+from pathlib import Path
+import tempfile
+import unittest
+
+from second_opinion.applicability import PRUNE_REASON, RuleFilter, changed_lines
+from second_opinion.assets import Rule, load_assets
+from second_opinion.compiler import compile_review
+
+ROOT = Path(__file__).resolve().parents[1]
+TAGS = ["lang:go", "component:tidb/expression", "risk:correctness", "risk:perf"]
+
+
+def rule(rule_id, paths=(), patterns=()):
+    return Rule(rule_id=rule_id, expert="e", tags=(), text="", paths=tuple(paths), patterns=tuple(patterns))
+
+
+def diff(path, *added):
+    body = "".join(f"+{line}\n" for line in added)
+    return f"diff --git a/{path} b/{path}\n--- a/{path}\n+++ b/{path}\n@@ -1,1 +1,{len(added) + 1} @@\n ctx\n{body}"
+
+
+class RuleFilterTests(unittest.TestCase):
+    def setUp(self):
+        self.filter = RuleFilter([
+            rule("PATH", paths=["**/*_vec.go"]),
+            rule("CONTENT", patterns=[r"\bvecEval\w*"]),
+            rule("EITHER", paths=["pkg/ddl/**"], patterns=["schemaVersion"]),
+            rule("ALWAYS"),
+        ])
+
+    def test_changed_lines_skip_context_and_headers(self):
+        text = diff("a.go", "x := 1", "vecEvalInt()")
+        self.assertEqual("x := 1\nvecEvalInt()", changed_lines(text))
+
+    def test_prune_by_paths_and_lines(self):
+        self.assertEqual({"PATH", "CONTENT", "EITHER"}, self.filter.prune(["pkg/a.go"], ""))
+        self.assertEqual({"CONTENT", "EITHER"}, self.filter.prune(["pkg/expression/builtin_vec.go"], ""))
+        self.assertEqual({"PATH"}, self.filter.prune(["pkg/a.go"], "vecEvalInt(schemaVersion)"))
+        self.assertEqual({"PATH", "CONTENT"}, self.filter.prune(["pkg/ddl/ddl.go"], ""))
+
+    def test_unknown_facts_prune_nothing(self):
+        self.assertEqual(set(), self.filter.prune([], "anything"))
+        self.assertEqual({"PATH"}, self.filter.prune(["pkg/a.go"]))
+
+    def test_invalid_pattern_names_file_and_rule(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            (root / "experts" / "bad").mkdir(parents=True)
+            (root / "experts" / "bad" / "meta.yaml").write_text("id: bad\n", encoding="utf-8")
+            (root / "experts" / "bad" / "criteria.md").write_text(
+                "- rule_id: BAD-001\n  applies_to:\n    patterns:\n      - 'vecEval('\n", encoding="utf-8"
+            )
+            with self.assertRaisesRegex(ValueError, r"experts/bad/criteria\.md: rule BAD-001: invalid applies_to"):
+                load_assets(root)
+
+
+class CompilerPruneTests(unittest.TestCase):
+    def setUp(self):
+        self.assets = load_assets(ROOT)
+
+    def test_inapplicable_rules_listed_in_rationale(self):
+        text = diff("pkg/executor/join.go", "x := 1")
+        data = compile_review(self.assets, TAGS, files=["pkg/executor/join.go"], changed=changed_lines(text))
+        used = {rule_id for rule_ids in data["rules_used"].values() for rule_id in rule_ids}
+        pruned = data["selection_rationale"]["pruned_rules"]
+        self.assertIn({"rule_id": "RUOXI-EXPR-001", "expert": "ruoxi", "reason": PRUNE_REASON}, pruned)
+        self.assertNotIn("RUOXI-EXPR-001", used)
+        self.assertNotIn("RUOXI-EXPR-003", used)
+        self.assertIn("RUOXI-EXPR-002", used)
+
+    def test_matching_diff_keeps_rules(self):
+        text = diff("pkg/expression/builtin_math.go", "return b.vecEvalReal(ctx, input, result)")
+        data = compile_review(self.assets, TAGS, files=["pkg/expression/builtin_math.go"],
+                              changed=changed_lines(text))
+        self.assertEqual([], data["selection_rationale"]["pruned_rules"])
+        self.assertIn("RUOXI-EXPR-001", data["rules_used"]["ruoxi"])
+        self.assertIn("RUOXI-EXPR-003", data["rules_used"]["ruoxi"])
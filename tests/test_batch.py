@@ -0,0 +1,92 @@
+import json
+from pathlib import Path
+import sys
+import tempfile
+import threading
+import unittest
+
+from second_opinion.assets import load_assets
+from second_opinion.batch import PullRequest, command_reviewer, main, mechanical_tagger, review_batch
+from tests.test_shard import make_diff
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+class BatchTests(unittest.TestCase):
+    def test_identical_tag_sets_share_one_compile(self):
+        prs = [
+            PullRequest("a", make_diff(["pkg/expression/a.go"])),
+            PullRequest("b", make_diff(["pkg/expression/b.go"])),
+            PullRequest("c", make_diff(["pkg/ddl/c.go"])),
+        ]
+        lock = threading.Lock()
+        prompts = []
+
+        def reviewer(compiled_prompt, diff_text):
+            with lock:
+                prompts.append(compiled_prompt)
+            return {"findings": []}
+
+        compiled = review_batch(prs, load_assets(ROOT), mechanical_tagger(), reviewer, workers=2)
+        self.assertEqual(2, len(compiled))
+        self.assertEqual([0, 0, 1], [pr.group for pr in prs])
+        self.assertEqual(3, len(prompts))
+        self.assertEqual({"findings": []}, prs[2].review)
+        self.assertIn("component:tidb/expression", [t["tag"] for t in prs[0].tagger["tags"]])
+
+    def test_reviewer_error_is_recorded_per_pr(self):
+        prs = [PullRequest(name, make_diff([f"pkg/expression/{name}.go"])) for name in ("a", "b", "c")]
+
+        def reviewer(compiled_prompt, diff_text):
+            if "b.go" in diff_text:
+                raise RuntimeError("reviewer timed out")
+            return {"findings": []}
+
+        review_batch(prs, load_assets(ROOT), mechanical_tagger(), reviewer, workers=2)
+        self.assertEqual([None, "RuntimeError: reviewer timed out", None], [pr.error for pr in prs])
+        self.assertEqual([{"findings": []}, None, {"findings": []}], [pr.review for pr in prs])
+
+    def test_command_reviewer_substitutes_only_placeholders(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            script = Path(tmp) / "reviewer.py"
+            script.write_text(
+                "import json, sys\n"
+                "print(json.dumps({'argv': sys.argv[1:], 'diff': open(sys.argv[1]).read()}))\n",
+                encoding="utf-8",
+            )
+            reviewer = command_reviewer(f"{sys.executable} {script} {{diff}} '{{\"k\": 1}}' {{other}}", tmp)
+            result = reviewer("prompt", "the diff")
+        self.assertEqual("the diff", result["diff"])
+        self.assertEqual(['{"k": 1}', "{other}"], result["argv"][1:])
+
+    def test_cli_writes_per_pr_outputs_and_summary(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp_path = Path(tmp)
+            diffs = []
+            for name in ("pr-1", "pr-2", "pr-3"):
+                path = tmp_path / f"{name}.diff"
+                path.write_text(make_diff([f"pkg/expression/{name}.go"]), encoding="utf-8")
+                diffs.append(str(path))
+            reviewer = tmp_path / "reviewer.py"
+            reviewer.write_text(
+                "import json, sys\n"
+                "diff = open(sys.argv[2]).read()\n"
+                "if 'pr-3' in diff:\n"
+                "    sys.exit('reviewer crashed')\n"
+                "print(json.dumps({'findings': [] if 'pr-1' in diff else [{'file': 'x', 'lines': 'L1', "
+                "'source': {'type': 'policy', 'id': 'p'}, 'tags': [], 'severity': 'low', 'message': 'm'}]}))\n",
+                encoding="utf-8",
+            )
+            out = tmp_path / "out"
+            self.assertEqual(1, main(diffs + ["--out", str(out), "--cache-dir", str(tmp_path / "cache"),
+                                              "--reviewer-cmd", f"{sys.executable} {reviewer} {{prompt}} {{diff}}"]))
+            summary = json.loads((out / "summary.json").read_text(encoding="utf-8"))
+            self.assertEqual(1, summary["groups"])
+            self.assertEqual([("pr-1", 0), ("pr-2", 1), ("pr-3", None)],
+                             [(p["name"], p["findings"]) for p in summary["prs"]])
+            self.assertEqual([None, None], [p["error"] for p in summary["prs"][:2]])
+            self.assertIn("CalledProcessError", summary["prs"][2]["error"])
+            for name in ("pr-1", "pr-2"):
+                self.assertTrue((out / name / "compiler.json").is_file())
+                self.assertTrue((out / name / "review.json").is_file())
+            self.assertFalse((out / "pr-3" / "review.json").exists())
@@ -0,0 +1,50 @@
+import json
+from pathlib import Path
+import tempfile
+import unittest
+
+from second_opinion.bench import compare, main, run, synthetic_diff
+from second_opinion.diff import parse_diff
+
+
+class BenchTests(unittest.TestCase):
+    def test_synthetic_diff_has_requested_size(self):
+        records = list(parse_diff(synthetic_diff(250).splitlines(keepends=True)))
+        self.assertEqual(2, len(records))
+        self.assertEqual(250, sum(record.additions for record in records))
+        self.assertEqual(synthetic_diff(250), synthetic_diff(250))
+
+    def test_run_reports_every_stage_and_warm_caches(self):
+        report = run(sizes=(50,), repeat=2)
+        self.assertEqual(["examples/foo", "synthetic-50"], [case["name"] for case in report["cases"]])
+        case = report["cases"][1]
+        self.assertEqual({"tagger", "compiler", "reviewer"}, set(case["stages"]))
+        self.assertGreater(case["tokens"]["prompt"], 0)
+        self.assertEqual(len(synthetic_diff(50).encode("utf-8")), case["bytes"])
+        # The second iteration is served from both caches.
+        self.assertEqual({"compile": 0.5, "findings": 0.5}, case["cache"])
+        self.assertEqual(1, case["findings"])
+
+    def test_compare_flags_slowdowns_and_token_growth(self):
+        def report(seconds, prompt):
+            return {"cases": [{"name": "c", "stages": {"compiler": {"seconds": seconds}},
+                               "tokens": {"prompt": prompt, "response": 10}}]}
+
+        self.assertEqual([], compare(report(0.1, 100), report(0.11, 110)))
+        # Large relative changes within timer noise are ignored.
+        self.assertEqual([], compare(report(0.0001, 100), report(0.001, 100)))
+        self.assertEqual(
+            ["compiler.seconds", "tokens.prompt"],
+            [r["metric"] for r in compare(report(0.1, 100), report(0.2, 200))],
+        )
+
+    def test_cli_compare_exit_code(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            base = Path(tmp) / "base.json"
+            self.assertEqual(0, main(["run", "--sizes", "20", "--repeat", "1", "-o", str(base)]))
+            self.assertEqual(0, main(["compare", str(base), str(base)]))
+            slower = json.loads(base.read_text(encoding="utf-8"))
+            slower["cases"][0]["tokens"]["prompt"] *= 2
+            current = Path(tmp) / "current.json"
+            current.write_text(json.dumps(slower), encoding="utf-8")
+            self.assertEqual(1, main(["compare", str(base), str(current)]))
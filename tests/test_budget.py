@@ -0,0 +1,72 @@
+from contextlib import redirect_stdout
+import io
+import json
+from pathlib import Path
+import unittest
+
+from second_opinion.assets import load_assets
+from second_opinion.budget import OVER_CEILING_REASON, TOKEN_CEILINGS, estimate_tokens, main
+from second_opinion.compiler import compile_review
+
+ROOT = Path(__file__).resolve().parents[1]
+WIDE_TAGS = [
+    "lang:go",
+    "component:tidb/expression",
+    "component:tidb/execution",
+    "risk:correctness",
+    "risk:compat",
+    "risk:perf",
+    "risk:concurrency",
+]
+
+
+class BudgetTests(unittest.TestCase):
+    def setUp(self):
+        self.assets = load_assets(ROOT)
+
+    def test_default_ceiling_leaves_prompt_untouched(self):
+        data = compile_review(self.assets, WIDE_TAGS, files=["a.go"], budget="thorough")
+        self.assertLessEqual(estimate_tokens(data["compiled_prompt"]), TOKEN_CEILINGS["high"])
+        self.assertFalse([p for p in data["provenance"] if p.get("reason", "").startswith("dropped")])
+
+    def test_lowest_priority_rules_dropped_to_fit(self):
+        full = compile_review(self.assets, WIDE_TAGS, files=["a.go"])
+        ceiling = estimate_tokens(full["compiled_prompt"]) - 300
+        data = compile_review(self.assets, WIDE_TAGS, files=["a.go"], max_tokens=ceiling)
+        self.assertLessEqual(estimate_tokens(data["compiled_prompt"]), ceiling)
+
+        cut = [p for p in data["provenance"] if p.get("reason") == "dropped: over token budget"]
+        self.assertTrue(cut)
+        kept = {rule for rules in data["rules_used"].values() for rule in rules}
+        for entry in cut:
+            self.assertNotIn(entry["rule_id"], kept)
+            self.assertNotIn(self.assets.rule(entry["rule_id"]).text, data["compiled_prompt"])
+        # Single-tag matches go before rules matching several of the change's tags.
+        overlap = lambda rule_id: sum(tag in WIDE_TAGS for tag in self.assets.rule(rule_id).tags)
+        self.assertLessEqual(max(overlap(e["rule_id"]) for e in cut), min(overlap(r) for r in kept))
+
+    def test_required_assets_never_cut(self):
+        data = compile_review(self.assets, WIDE_TAGS, files=["a.go"], max_tokens=1)
+        self.assertEqual({}, data["rules_used"])
+        self.assertEqual([], data["selected_experts"])
+        self.assertEqual(["pr-review"], data["selected_processes"])
+        self.assertEqual(["github-side-effects", "baseline-high-severity"], data["selected_policies"])
+        self.assertIn("# Output contract", data["compiled_prompt"])
+
+    def test_required_assets_over_ceiling_recorded(self):
+        data = compile_review(self.assets, WIDE_TAGS, files=["a.go"], max_tokens=10)
+        over = [p for p in data["provenance"] if p.get("reason", "").startswith(OVER_CEILING_REASON)]
+        tokens = estimate_tokens(data["compiled_prompt"])
+        self.assertEqual([{"reason": f"{OVER_CEILING_REASON}: {tokens} > 10"}], over)
+
+        fitting = compile_review(self.assets, WIDE_TAGS, files=["a.go"], max_tokens=tokens)
+        self.assertFalse([p for p in fitting["provenance"] if p.get("reason", "").startswith(OVER_CEILING_REASON)])
+
+    def test_cli_reports_asset_costs(self):
+        out = io.StringIO()
+        with redirect_stdout(out):
+            self.assertEqual(0, main(["--root", str(ROOT)]))
+        report = json.loads(out.getvalue())
+        self.assertEqual(TOKEN_CEILINGS, report["ceilings"])
+        self.assertIn("RUOXI-EXPR-001", report["costs"]["rules"])
+        self.assertGreater(report["costs"]["processes"]["pr-review"], 0)
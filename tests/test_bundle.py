@@ -0,0 +1,71 @@
+from contextlib import redirect_stdout
+import io
+from pathlib import Path
+import tempfile
+import unittest
+
+from second_opinion.assets import load_assets
+from second_opinion.bundle import CRITERIA_PACK, build, main, verify
+from second_opinion.compiler import compile_review
+from second_opinion.index import load_index
+
+ROOT = Path(__file__).resolve().parents[1]
+TAGS = ["lang:go", "component:tidb/expression", "risk:perf"]
+
+
+class BundleTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.bundle = Path(cls.tmp.name) / "second-opinion"
+        cls.manifest = build(cls.bundle, ROOT)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def test_bundle_leaves_out_tree_and_samples(self):
+        names = {path.name for path in self.bundle.iterdir()}
+        self.assertIn("SKILL.md", names)
+        self.assertIn(CRITERIA_PACK, names)
+        self.assertTrue((self.bundle / "agents" / "openai.yaml").is_file())
+        for name in ("experts", "processes", "policies", "fragments", "tests", "examples", "skills"):
+            self.assertNotIn(name, names)
+        self.assertNotIn(b"FOO-EXPERT-001", (self.bundle / CRITERIA_PACK).read_bytes())
+        self.assertNotIn("second_opinion/__pycache__", str(self.manifest["files"]))
+
+    def test_packed_assets_compile_identically(self):
+        packed = load_index(self.bundle)
+        source = load_assets(ROOT)
+        self.assertEqual(source.digest, packed.digest)
+        self.assertEqual(compile_review(source, TAGS, files=["a.go"]), compile_review(packed, TAGS, files=["a.go"]))
+
+    def test_criteria_text_read_only_when_selected(self):
+        packed = load_assets(self.bundle)
+
+        def loaded():
+            return {rule.rule_id for expert in packed.experts for rule in expert.rules if "_text" in rule.__dict__}
+
+        self.assertEqual(set(), loaded())
+        data = compile_review(packed, TAGS, files=["a.go"])
+        selected = {rule_id for rule_ids in data["rules_used"].values() for rule_id in rule_ids}
+        self.assertTrue(selected)
+        self.assertLessEqual(selected, loaded())
+        self.assertEqual(source_text("RUOXI-EXPR-003"), packed.rule("RUOXI-EXPR-003").text)
+
+    def test_verify_and_show(self):
+        self.assertEqual([], verify(self.bundle))
+        out = io.StringIO()
+        with redirect_stdout(out):
+            self.assertEqual(0, main(["show", str(self.bundle), "RUOXI-EXPR-001"]))
+        self.assertTrue(out.getvalue().startswith("- rule_id: RUOXI-EXPR-001"))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            copy = Path(tmp) / "bundle"
+            build(copy, ROOT)
+            (copy / "taxonomy.md").write_text("edited\n", encoding="utf-8")
+            self.assertEqual(["taxonomy.md"], verify(copy))
+
+
+def source_text(rule_id):
+    return load_assets(ROOT).rule(rule_id).text
@@ -0,0 +1,64 @@
+from pathlib import Path
+import shutil
+import tempfile
+import unittest
+
+from second_opinion.cache import CompileCache, compile_key
+from second_opinion.compiler import compile_review
+from second_opinion.index import load_index
+
+ROOT = Path(__file__).resolve().parents[1]
+TAGS = ["lang:go", "component:tidb/execution", "risk:perf"]
+
+
+class CompileCacheTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = Path(tmp.name)
+        self.root = self.tmp / "assets"
+        for name in ["experts", "processes", "policies", "fragments"]:
+            shutil.copytree(ROOT / name, self.root / name)
+        self.cache_dir = self.tmp / "cache"
+
+    def _assets(self):
+        return load_index(self.root, cache_dir=self.cache_dir)
+
+    def test_key_ignores_tag_order(self):
+        a = compile_key(["b", "a"], "medium", [], None, 1, "d")
+        b = compile_key(["a", "b", "a"], "medium", [], None, 1, "d")
+        self.assertEqual(a, b)
+        self.assertNotEqual(a, compile_key(["a", "b"], "low", [], None, 1, "d"))
+        self.assertNotEqual(a, compile_key(["a", "b"], "medium", [], None, 1, "e"))
+
+    def test_repeat_compile_hits(self):
+        cache = CompileCache(self.cache_dir)
+        first = compile_review(self._assets(), TAGS, cache=cache)
+        second = compile_review(self._assets(), list(reversed(TAGS)), cache=cache)
+        self.assertEqual(first, second)
+        self.assertEqual({"hits": 1, "misses": 1}, cache.stats())
+
+    def test_asset_change_invalidates(self):
+        cache = CompileCache(self.cache_dir)
+        compile_review(self._assets(), TAGS, cache=cache)
+        criteria = self.root / "experts" / "windtalker" / "criteria.md"
+        criteria.write_text(
+            criteria.read_text(encoding="utf-8").replace("Treat the normal hot path", "Guard the hot path"),
+            encoding="utf-8",
+        )
+        result = compile_review(self._assets(), TAGS, cache=cache)
+        self.assertEqual({"hits": 0, "misses": 2}, cache.stats())
+        self.assertIn("Guard the hot path", result["compiled_prompt"])
+
+    def test_lru_eviction_and_size_cap(self):
+        cache = CompileCache(self.cache_dir, max_entries=2)
+        for index in range(3):
+            cache.put(f"k{index}", {"n": index})
+        self.assertEqual(2, len(cache.entries()))
+        self.assertIsNone(cache.get("k0"))
+
+        tiny = CompileCache(self.tmp / "tiny", max_bytes=100)
+        tiny.put("a", {"payload": "x" * 10})
+        tiny.put("b", {"payload": "y" * 10})
+        self.assertEqual(1, len(tiny.entries()))
+        self.assertIsNotNone(tiny.get("b"))
@@ -0,0 +1,154 @@
+import json
+from pathlib import Path
+import tempfile
+import unittest
+
+from second_opinion.assets import load_assets, parse_meta
+from second_opinion.compiler import compile_review, main, review_input
+from second_opinion.diff import changed_files
+
+ROOT = Path(__file__).resolve().parents[1]
+FIXTURES = ROOT / "tests" / "fixtures"
+COMPILE_SCHEMA = ROOT / "schemas" / "compile.schema.json"
+
+
+class CompilerTests(unittest.TestCase):
+    def setUp(self):
+        self.assets = load_assets(ROOT)
+
+    def _assert_schema_shape(self, data):
+        schema = json.loads(COMPILE_SCHEMA.read_text(encoding="utf-8"))
+        # The python compiler emits every field, optional ones included.
+        self.assertEqual(sorted(schema["properties"]), sorted(data))
+        self.assertLessEqual(set(schema["required"]), set(data))
+        rationale_schema = schema["properties"]["selection_rationale"]
+        self.assertEqual(sorted(rationale_schema["properties"]), sorted(data["selection_rationale"]))
+        allowed = set(schema["properties"]["provenance"]["items"]["properties"])
+        for entry in data["provenance"]:
+            self.assertLessEqual(set(entry), allowed)
+        try:
+            import jsonschema
+        except ImportError:
+            return
+        jsonschema.validate(data, schema)
+
+    def test_parse_meta_keeps_prose_verbatim(self):
+        meta = parse_meta(
+            "id: x\npriority: 3\nrequirements:\n"
+            '  - set source to {type: "policy", id: "x"}.\n'
+            "activation:\n  any_tags: []\n  min_files: 0\n"
+        )
+        self.assertEqual(3, meta["priority"])
+        self.assertEqual(['set source to {type: "policy", id: "x"}.'], meta["requirements"])
+        self.assertEqual({"any_tags": [], "min_files": 0}, meta["activation"])
+
+    def test_sample_assets_excluded(self):
+        ids = [e.id for e in self.assets.experts] + [p.id for p in self.assets.processes]
+        ids += [p.id for p in self.assets.policies] + [f.name for f in self.assets.fragments]
+        self.assertNotIn("foo", ids)
+
+    def test_real_assets_selection(self):
+        data = compile_review(
+            self.assets,
+            ["lang:go", "component:tidb/ddl", "risk:concurrency"],
+            files=["main.go"],
+        )
+        self._assert_schema_shape(data)
+        self.assertEqual(["pr-review"], data["selected_processes"])
+        self.assertEqual(["xuhuaiyu"], data["selected_experts"])
+        self.assertIn("XUHUAIYU-PR-002", data["rules_used"]["xuhuaiyu"])
+        self.assertEqual(["github-side-effects", "baseline-high-severity"], data["selected_policies"])
+        self.assertEqual("pr-review", data["selection_rationale"]["primary_process"]["process"])
+        self.assertIn("Output contract: review.md and review.json", data["compiled_prompt"])
+        self.assertIn({"process": "pr-review", "triggered_by": ["lang:go"]}, data["provenance"])
+
+    def test_rules_inserted_verbatim_in_order(self):
+        data = compile_review(self.assets, ["component:tidb/expression", "risk:perf"])
+        prompt = data["compiled_prompt"]
+        rule = self.assets.rule("RUOXI-EXPR-003")
+        self.assertIn(rule.text, prompt)
+        self.assertLess(prompt.index("# Policies"), prompt.index("# Output contract"))
+        self.assertLess(prompt.index("# Output contract"), prompt.index("# Reviewer rules"))
+
+    def test_prompt_prefix_shared_across_reviews(self):
+        expression = compile_review(self.assets, ["lang:go", "component:tidb/expression", "risk:perf"])
+        ddl = compile_review(self.assets, ["lang:go", "component:tidb/ddl", "risk:concurrency"])
+        names = [segment["segment"] for segment in expression["prompt_segments"]]
+        self.assertEqual(["policies", "output_contract", "primary_process", "rules"], names)
+        self.assertEqual(expression["prompt_segments"][:3], ddl["prompt_segments"][:3])
+        self.assertNotEqual(expression["prompt_segments"][3], ddl["prompt_segments"][3])
+
+        shared = sum(segment["bytes"] + 2 for segment in expression["prompt_segments"][:3])
+        self.assertEqual(expression["compiled_prompt"][:shared], ddl["compiled_prompt"][:shared])
+        self.assertEqual(expression, compile_review(self.assets, ["lang:go", "component:tidb/expression", "risk:perf"]))
+
+    def test_review_input_puts_diff_last(self):
+        prompt = compile_review(self.assets, ["risk:perf"])["compiled_prompt"]
+        text = review_input(prompt, "diff --git a/a.go b/a.go\n+x\n")
+        self.assertTrue(text.startswith(prompt))
+        self.assertTrue(text.endswith("# Diff\n\n```diff\ndiff --git a/a.go b/a.go\n+x\n```\n"))
+        with_context = review_input(prompt, "+x\n", context="# Context\n\nfunc f() {}\n")
+        self.assertTrue(with_context.startswith(prompt))
+        self.assertIn("# Context\n\nfunc f() {}\n\n# Diff\n", with_context)
+
+    def test_max_rules_respected(self):
+        data = compile_review(
+            self.assets,
+            ["component:tidb/execution", "risk:correctness", "risk:compat", "risk:perf"],
+        )
+        self.assertLessEqual(len(data["rules_used"]["xuhuaiyu"]), 6)
+        self.assertLessEqual(len(data["rules_used"]["windtalker"]), 8)
+
+    def test_default_fallback(self):
+        data = compile_review(self.assets, ["risk:ops"])
+        rationale = data["selection_rationale"]
+        self.assertEqual([], rationale["candidates"])
+        self.assertEqual({"process": "pr-review", "reason": "default fallback"}, rationale["primary_process"])
+
+    def test_user_override(self):
+        data = compile_review(self.assets, ["risk:ops"], user_override="pr-review")
+        self.assertEqual("pr-review", data["selection_rationale"]["user_override"])
+        with self.assertRaises(ValueError):
+            compile_review(self.assets, [], user_override="missing")
+
+    def test_focus_is_hard_constraint(self):
+        data = compile_review(
+            self.assets,
+            ["lang:go", "risk:security", "risk:concurrency", "theme:error-handling"],
+            focus=["security-only"],
+            budget="quick",
+        )
+        self.assertEqual({"xuhuaiyu": ["XUHUAIYU-PR-004"]}, data["rules_used"])
+        self.assertEqual([], data["selected_processes"])
+        self.assertIsNone(data["selection_rationale"]["primary_process"])
+        self.assertEqual("low", data["selection_rationale"]["budget"])
+
+    def test_fixture_assets_sentinels(self):
+        assets = load_assets(FIXTURES)
+        diff = (FIXTURES / "patch.diff").read_text(encoding="utf-8")
+        data = compile_review(
+            assets,
+            ["lang:go", "component:tidb/ddl", "risk:security", "risk:concurrency"],
+            files=changed_files(diff),
+        )
+        self._assert_schema_shape(data)
+        self.assertEqual(["evil"], data["selected_experts"])
+        self.assertEqual(["evil-process"], data["selected_processes"])
+        self.assertEqual(["evil"], data["selected_policies"])
+        for sentinel in ["TEST-EXPERT-SENTINEL", "TEST-POLICY-SENTINEL", "TEST-FRAGMENT-SENTINEL"]:
+            self.assertIn(sentinel, data["compiled_prompt"])
+
+    def test_cli_writes_compiler_json(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp_path = Path(tmp)
+            tagger = tmp_path / "tagger.json"
+            tagger.write_text((ROOT / "examples" / "foo" / "tagger.json").read_text(encoding="utf-8"))
+            output = tmp_path / "compiler.json"
+            self.assertEqual(
+                0,
+                main(["--tags", str(tagger), "--diff", str(ROOT / "examples" / "foo" / "patch.diff"),
+                      "--cache-dir", str(tmp_path / "cache"), "-o", str(output)]),
+            )
+            data = json.loads(output.read_text(encoding="utf-8"))
+        self._assert_schema_shape(data)
+        self.assertEqual(["pr-review"], data["selected_processes"])
@@ -0,0 +1,107 @@
+import json
+from pathlib import Path
+import tempfile
+import unittest
+
+from second_opinion.assets import parse_meta
+from second_opinion.components import COMPONENTS_PATH, ComponentMatcher, detect_repo, load_components, resolve_repo
+from second_opinion.diff import main
+from second_opinion.taxonomy import load_taxonomy
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+class ComponentTableTests(unittest.TestCase):
+    def setUp(self):
+        self.matcher = load_components()
+
+    def test_table_tags_are_in_taxonomy(self):
+        table = parse_meta(COMPONENTS_PATH.read_text(encoding="utf-8"))
+        taxonomy = set(load_taxonomy())
+        for entry in table["components"]:
+            self.assertIn(entry["tag"], taxonomy)
+            self.assertTrue(entry["paths"], f"{entry['tag']} has no path patterns")
+
+    def test_prefix_and_longest_match(self):
+        self.assertEqual(["component:tidb/ddl"], self.matcher.match("pkg/ddl/ddl.go"))
+        self.assertEqual(["component:pd/scheduling"], self.matcher.match("pkg/schedule/checker/merge.go"))
+        self.assertEqual(["component:pd/placement"], self.matcher.match("pkg/schedule/placement/rule.go"))
+        self.assertEqual([], self.matcher.match("pkg/ddlx/ddl.go"))
+
+    def test_glob_patterns(self):
+        self.assertEqual(
+            ["component:tikv/coprocessor"],
+            self.matcher.match("components/tidb_query_expr/src/impl_math.rs"),
+        )
+        matcher = ComponentMatcher([("component:tidb/expression", ["pkg/**/*_vec.go"])])
+        self.assertEqual(["component:tidb/expression"], matcher.match("pkg/expression/builtin_vec.go"))
+        self.assertEqual([], matcher.match("pkg/expression/builtin.go"))
+
+    def test_entries_are_scoped_per_repository(self):
+        # TiDB and PD both have pkg/statistics/; without a repository the TiDB entry wins.
+        self.assertEqual(["component:tidb/statistics"], self.matcher.match("pkg/statistics/handle.go"))
+        pd = load_components(repo="pd")
+        self.assertEqual([], pd.match("pkg/statistics/handle.go"))
+        self.assertEqual(["component:pd/placement"], pd.match("pkg/schedule/placement/rule.go"))
+        tidb = load_components(repo="tidb")
+        self.assertEqual(["component:tidb/statistics"], tidb.match("pkg/statistics/handle.go"))
+        self.assertEqual([], tidb.match("pkg/schedule/checker/merge.go"))
+        scoped = ComponentMatcher([("component:tidb/ddl", ["ddl/"], "tiflash")], repo="tiflash")
+        self.assertEqual(["component:tidb/ddl"], scoped.match("ddl/x.cpp"))
+        with self.assertRaises(ValueError):
+            load_components(repo="bogus")
+
+    def test_detect_repo_from_checkout(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            checkout = Path(tmp)
+            self.assertIsNone(detect_repo(checkout))
+            (checkout / "go.mod").write_text("module github.com/tikv/pd\n\ngo 1.21\n", encoding="utf-8")
+            self.assertEqual("pd", detect_repo(checkout))
+            (checkout / "go.mod").unlink()
+            (checkout / "dbms" / "src" / "Flash").mkdir(parents=True)
+            self.assertEqual("tiflash", detect_repo(checkout))
+            self.assertEqual("tiflash", resolve_repo(None, checkout))
+            self.assertEqual("pd", resolve_repo("pd", checkout))
+            self.assertIsNone(resolve_repo())
+
+    def test_classify_reports_unmatched(self):
+        by_tag, unmatched = self.matcher.classify(["pkg/ddl/a.go", "README.md", "pkg/ddl/b.go", "go.mod"])
+        self.assertEqual({"component:tidb/ddl": ["pkg/ddl/a.go", "pkg/ddl/b.go"]}, by_tag)
+        self.assertEqual(["README.md", "go.mod"], unmatched)
+
+    def test_unknown_tag_rejected(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            table = Path(tmp) / "components.yaml"
+            table.write_text("components:\n  - tag: component:tidb/bogus\n    paths:\n      - x/\n")
+            with self.assertRaises(ValueError):
+                load_components(table)
+
+    def test_diff_cli_emits_component_tags(self):
+        diff = (
+            "diff --git a/pkg/ddl/ddl.go b/pkg/ddl/ddl.go\n--- a/pkg/ddl/ddl.go\n+++ b/pkg/ddl/ddl.go\n"
+            "@@ -1 +1 @@\n-a\n+b\n"
+            "diff --git a/README.md b/README.md\n--- a/README.md\n+++ b/README.md\n@@ -1 +1 @@\n-a\n+b\n"
+        )
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp_path = Path(tmp)
+            (tmp_path / "change.diff").write_text(diff, encoding="utf-8")
+            main([str(tmp_path / "change.diff"), "--unmatched", str(tmp_path / "unmatched.json"),
+                  "-o", str(tmp_path / "seed.json")])
+            seed = json.loads((tmp_path / "seed.json").read_text(encoding="utf-8"))
+            unmatched = json.loads((tmp_path / "unmatched.json").read_text(encoding="utf-8"))
+        self.assertEqual(["lang:go", "component:tidb/ddl"], [t["tag"] for t in seed["tags"]])
+        self.assertEqual(["README.md"], unmatched)
+
+    def test_diff_cli_scopes_components_to_the_repository(self):
+        diff = ("diff --git a/pkg/statistics/a.go b/pkg/statistics/a.go\n--- a/pkg/statistics/a.go\n"
+                "+++ b/pkg/statistics/a.go\n@@ -1 +1 @@\n-a\n+b\n")
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp_path = Path(tmp)
+            (tmp_path / "change.diff").write_text(diff, encoding="utf-8")
+            (tmp_path / "go.mod").write_text("module github.com/tikv/pd\n", encoding="utf-8")
+            main([str(tmp_path / "change.diff"), "--repo", tmp, "--unmatched", str(tmp_path / "unmatched.json"),
+                  "-o", str(tmp_path / "seed.json")])
+            seed = json.loads((tmp_path / "seed.json").read_text(encoding="utf-8"))
+            unmatched = json.loads((tmp_path / "unmatched.json").read_text(encoding="utf-8"))
+        self.assertEqual(["lang:go"], [t["tag"] for t in seed["tags"]])
+        self.assertEqual(["pkg/statistics/a.go"], unmatched)
@@ -0,0 +1,141 @@
+from pathlib import Path
+import subprocess
+import tempfile
+import unittest
+
+from second_opinion.context import BlobReader, enclosing_scope, extract_context, main, render_context
+
+GO_BASE = """package core
+
+import (
+\t"fmt"
+)
+
+func a() int {
+\treturn 1
+}
+
+func b(x int) int {
+\tif x > 0 {
+\t\treturn x
+\t}
+\treturn 0
+}
+
+type T int
+"""
+
+GO_HEAD = GO_BASE.replace("\t\treturn x\n", "\t\tfmt.Println(x)\n\t\treturn x * 2\n")
+
+CPP = """namespace tiflash {
+int add(int a,
+        int b)
+{
+    return a + b;
+}
+}
+""".splitlines()
+
+RUST = """impl Store {
+    pub async fn get(&self, key: &[u8]) -> Option<Vec<u8>> {
+        self.map.get(key).cloned()
+    }
+}
+""".splitlines()
+
+SQL = """CREATE TABLE t (
+  a INT, -- id;
+  b VARCHAR(10)
+);
+SELECT a
+FROM t;
+""".splitlines()
+
+
+def git(repo, *args):
+    return subprocess.run(
+        ["git", "-C", str(repo), "-c", "user.name=t", "-c", "user.email=t@example.com", *args],
+        check=True, stdout=subprocess.PIPE, text=True,
+    ).stdout
+
+
+class ScopeTests(unittest.TestCase):
+    def test_scopes_per_language(self):
+        go = GO_HEAD.splitlines()
+        self.assertEqual(("func", 10, 16), enclosing_scope(go, 12, 12, "lang:go"))
+        self.assertEqual(("block", 2, 4), enclosing_scope(go, 3, 3, "lang:go"))
+        self.assertIsNone(enclosing_scope(go, 18, 18, "lang:go"))
+        self.assertEqual(("func", 1, 5), enclosing_scope(CPP, 4, 4, "lang:cpp"))
+        self.assertEqual(("type", 0, 6), enclosing_scope(CPP, 0, 6, "lang:cpp"))
+        self.assertEqual(("func", 1, 3), enclosing_scope(RUST, 2, 2, "lang:rust"))
+        self.assertEqual(("type", 0, 4), enclosing_scope(RUST, 0, 4, "lang:rust"))
+        self.assertEqual(("statement", 0, 3), enclosing_scope(SQL, 1, 2, "lang:sql"))
+        self.assertEqual(("statement", 4, 5), enclosing_scope(SQL, 5, 5, "lang:sql"))
+
+
+class ExtractTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.repo = Path(tmp.name)
+        git(self.repo, "init", "-q")
+        (self.repo / "core.go").write_text(GO_BASE, encoding="utf-8")
+        (self.repo / "old.sql").write_text("\n".join(SQL) + "\n", encoding="utf-8")
+        git(self.repo, "add", ".")
+        git(self.repo, "commit", "-q", "-m", "base")
+        (self.repo / "core.go").write_text(GO_HEAD, encoding="utf-8")
+        git(self.repo, "rm", "-q", "old.sql")
+        git(self.repo, "commit", "-q", "-am", "head")
+        self.reader = BlobReader(self.repo)
+        self.addCleanup(self.reader.close)
+
+    def test_show_diff_uses_index_blobs(self):
+        pack = extract_context(git(self.repo, "show", "HEAD"), self.repo, reader=self.reader)
+        core, old = pack["scopes"]
+        self.assertEqual(("core.go", "head", 11, 17, "func", "func b(x int) int {"),
+                         (core["path"], core["side"], core["start"], core["end"], core["kind"], core["header"]))
+        self.assertIn("fmt.Println(x)", core["text"])
+        self.assertEqual(("old.sql", "base", "window", 1, 6), (old["path"], old["side"], old["kind"],
+                                                                   old["start"], old["end"]))
+        self.assertEqual([], pack["omitted"])
+        self.assertIn("## old.sql L1-L6 (base)\n\n```sql\nCREATE TABLE t (", render_context(pack))
+
+    def test_blobs_fetched_once_per_process(self):
+        diff = git(self.repo, "show", "HEAD")
+        first = extract_context(diff, self.repo, reader=self.reader)
+        pid = self.reader._process.pid
+        self.assertEqual((0, 2), (self.reader.hits, self.reader.misses))
+        self.assertEqual(first, extract_context(diff, self.repo, reader=self.reader))
+        self.assertEqual((2, 2), (self.reader.hits, self.reader.misses))
+        self.assertEqual(pid, self.reader._process.pid)
+
+        small = BlobReader(self.repo, cache_size=1)
+        self.addCleanup(small.close)
+        extract_context(diff, self.repo, reader=small)
+        self.assertEqual(1, len(small._cache))
+
+    def test_missing_paths_with_spaces(self):
+        found = self.reader.read_many(["HEAD:no such file.go", "HEAD:a b", "HEAD:core.go"])
+        self.assertEqual((None, None), (found["HEAD:no such file.go"], found["HEAD:a b"]))
+        self.assertEqual(GO_HEAD.encode("utf-8"), found["HEAD:core.go"])
+
+    def test_revisions_worktree_and_byte_cap(self):
+        diff = git(self.repo, "diff", "HEAD~1", "HEAD", "--", "core.go")
+        by_rev = extract_context(diff, self.repo, base="HEAD~1", head="HEAD", reader=self.reader)
+        self.assertEqual(git(self.repo, "rev-parse", "HEAD").strip(), by_rev["head"])
+        self.assertEqual(extract_context(diff, self.repo, reader=self.reader)["scopes"], by_rev["scopes"])
+
+        (self.repo / "core.go").write_text(GO_HEAD.replace("return 1", "return 2"), encoding="utf-8")
+        pack = extract_context(git(self.repo, "diff"), self.repo, reader=self.reader)
+        self.assertEqual(("func", "\treturn 2"), (pack["scopes"][0]["kind"], pack["scopes"][0]["text"].split("\n")[1]))
+
+        capped = extract_context(git(self.repo, "show", "HEAD"), self.repo, max_bytes=70, reader=self.reader)
+        self.assertEqual(["old.sql"], [scope["path"] for scope in capped["scopes"]])
+        self.assertEqual(["core.go:11-17"], capped["omitted"])
+
+    def test_cli_writes_markdown(self):
+        diff_path = self.repo / "change.diff"
+        diff_path.write_text(git(self.repo, "show", "HEAD"), encoding="utf-8")
+        out = self.repo / "context.md"
+        self.assertEqual(0, main([str(diff_path), "--repo", str(self.repo), "-o", str(out)]))
+        self.assertTrue(out.read_text(encoding="utf-8").startswith("# Context\n\n## core.go L11-L17\n"))
@@ -0,0 +1,112 @@
+import json
+from pathlib import Path
+import tempfile
+import unittest
+
+from second_opinion.diff import main, mechanical_selection, parse_diff
+
+ROOT = Path(__file__).resolve().parents[1]
+TAXONOMY = (ROOT / "taxonomy.md").read_text(encoding="utf-8")
+
+MIXED_DIFF = """commit 0123456789abcdef
+Author: Someone <someone@example.com>
+
+    sample commit
+
+diff --git a/pkg/ddl/ddl.go b/pkg/ddl/ddl.go
+index 1111111..2222222 100644
+--- a/pkg/ddl/ddl.go
++++ b/pkg/ddl/ddl.go
+@@ -10,4 +10,5 @@ func f() {
+ a
+-b
++c
++d
+ e
+@@ -40,2 +41,2 @@ func g() {
+--- removed dashes
++++ added pluses
+\\ No newline at end of file
+diff --git a/src/new.rs b/src/new.rs
+new file mode 100644
+--- /dev/null
++++ b/src/new.rs
+@@ -0,0 +1,2 @@
++fn main() {}
++
+diff --git a/old.sql b/old.sql
+deleted file mode 100644
+--- a/old.sql
++++ /dev/null
+@@ -1 +0,0 @@
+-select 1;
+diff --git a/a.cpp b/b.cpp
+similarity index 90%
+rename from a.cpp
+rename to b.cpp
+diff --git a/logo.png b/logo.png
+Binary files a/logo.png and b/logo.png differ
+"""
+
+
+class DiffParserTests(unittest.TestCase):
+    def test_fixture_patch(self):
+        with (ROOT / "tests" / "fixtures" / "patch.diff").open("r", encoding="utf-8") as handle:
+            records = list(parse_diff(handle))
+        self.assertEqual(1, len(records))
+        record = records[0]
+        self.assertEqual(("main.go", "lang:go", 1), (record.path, record.language, record.hunks))
+        self.assertEqual([[3, 7], [9, 17]], record.added)
+        self.assertEqual((14, 0), (record.additions, record.deletions))
+
+    def test_mixed_diff_records(self):
+        records = {r.path: r for r in parse_diff(MIXED_DIFF.splitlines(keepends=True))}
+        self.assertEqual(["pkg/ddl/ddl.go", "src/new.rs", "old.sql", "b.cpp", "logo.png"], list(records))
+
+        ddl = records["pkg/ddl/ddl.go"]
+        self.assertEqual(2, ddl.hunks)
+        self.assertEqual([[11, 12], [41, 41]], ddl.added)
+        self.assertEqual([[11, 11], [40, 40]], ddl.removed)
+
+        self.assertEqual(("added", "lang:rust", [[1, 2]]), (records["src/new.rs"].status,
+                                                          records["src/new.rs"].language,
+                                                          records["src/new.rs"].added))
+        self.assertEqual(("deleted", [[1, 1]]), (records["old.sql"].status, records["old.sql"].removed))
+        self.assertEqual(("renamed", "a.cpp", 0), (records["b.cpp"].status, records["b.cpp"].old_path,
+                                                   records["b.cpp"].hunks))
+        self.assertTrue(records["logo.png"].binary)
+        self.assertIsNone(records["logo.png"].language)
+
+    def test_parser_streams(self):
+        consumed = []
+
+        def lines():
+            for line in MIXED_DIFF.splitlines(keepends=True):
+                consumed.append(line)
+                yield line
+
+        first = next(parse_diff(lines()))
+        self.assertEqual("pkg/ddl/ddl.go", first.path)
+        self.assertLess(len(consumed), len(MIXED_DIFF.splitlines()))
+
+    def test_mechanical_selection_uses_taxonomy(self):
+        selection = mechanical_selection(parse_diff(MIXED_DIFF.splitlines(keepends=True)))
+        self.assertEqual(["lang:go", "lang:rust", "lang:sql", "lang:cpp"], [t["tag"] for t in selection["tags"]])
+        for tag in selection["tags"]:
+            self.assertIn(tag["tag"], TAXONOMY)
+            self.assertEqual({"tag", "why"}, set(tag))
+        self.assertEqual(5, len(selection["signals"]))
+        for signal in selection["signals"]:
+            self.assertEqual({"evidence", "reason"}, set(signal))
+
+    def test_cli(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp_path = Path(tmp)
+            diff_path = tmp_path / "change.diff"
+            diff_path.write_text(MIXED_DIFF, encoding="utf-8")
+            self.assertEqual(0, main([str(diff_path), "--records", str(tmp_path / "records.jsonl"),
+                                      "-o", str(tmp_path / "seed.json")]))
+            seed = json.loads((tmp_path / "seed.json").read_text(encoding="utf-8"))
+            records = (tmp_path / "records.jsonl").read_text(encoding="utf-8").splitlines()
+        self.assertEqual({"signals", "tags"}, set(seed))
+        self.assertEqual(5, len(records))
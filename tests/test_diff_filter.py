@@ -0,0 +1,106 @@
+import json
+from pathlib import Path
+import tempfile
+import unittest
+
+from second_opinion.assets import load_assets
+from second_opinion.compiler import compile_review
+from second_opinion.diff import changed_files, lang_tags, parse_diff
+from second_opinion.diff_filter import SUMMARY_PREFIX, load_filters, main, working_tree_reader
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def section(path, body, header=()):
+    lines = [f"diff --git a/{path} b/{path}\n", *header, f"--- a/{path}\n", f"+++ b/{path}\n"]
+    return "".join(lines) + body
+
+
+def hunk(start, *lines):
+    old = sum(1 for line in lines if not line.startswith("+"))
+    new = sum(1 for line in lines if not line.startswith("-"))
+    return f"@@ -{start},{old} +{start},{new} @@\n" + "".join(f"{line}\n" for line in lines)
+
+
+GENERATED = section(
+    "pkg/expression/builtin_math_vec_generated.go",
+    hunk(40, " func (b *builtinX) vecEvalReal() {", *[f"+\tx{i} := {i}" for i in range(200)], " }"),
+)
+MARKED = section("pkg/util/codec_gen.go", hunk(1, "+// Code generated by gen.go. DO NOT EDIT.", "+package util"),
+                 header=["new file mode 100644\n", "index 0000000..abc1234\n"])
+VENDORED = section("go.sum", hunk(1, "-a v1 h1:x", "+a v2 h1:y"))
+WHITESPACE = section("pkg/ddl/ddl.go", hunk(10, "-\tif x {", "+\tif  x  {", " \t}"))
+RENAME = ("diff --git a/pkg/a.go b/pkg/b.go\nsimilarity index 100%\nrename from pkg/a.go\nrename to pkg/b.go\n")
+MOVED_FROM = section("pkg/old/util.go", hunk(1, "-package old", "-func F() {}"),
+                     header=["deleted file mode 100644\n"]).replace("@@ -1,2 +1,0 @@", "@@ -1,2 +0,0 @@")
+MOVED_TO = section("pkg/new/util.go", hunk(1, "+package old", "+func F() {}"),
+                   header=["new file mode 100644\n"]).replace("@@ -1,0 +1,2 @@", "@@ -0,0 +1,2 @@")
+REAL = section("pkg/expression/builtin_math.go", hunk(5, " func f() {", "+\treturn vecEvalReal()", " }"))
+
+
+class DiffFilterTests(unittest.TestCase):
+    def setUp(self):
+        self.rules = load_filters()
+
+    def test_each_rule_reduces_a_file_to_its_summary(self):
+        diff = "commit abc\n\n" + "".join([GENERATED, MARKED, VENDORED, WHITESPACE, RENAME, MOVED_FROM, MOVED_TO, REAL])
+        result = self.rules.apply(diff)
+        self.assertEqual(
+            [("pkg/expression/builtin_math_vec_generated.go", "generated"), ("pkg/util/codec_gen.go", "generated"),
+             ("go.sum", "vendored"), ("pkg/ddl/ddl.go", "whitespace"), ("pkg/b.go", "rename"),
+             ("pkg/old/util.go", "move"), ("pkg/new/util.go", "move")],
+            [(item.path, item.reason) for item in result.filtered],
+        )
+        self.assertTrue(result.text.startswith("commit abc\n\n"))
+        self.assertIn(REAL, result.text)
+        self.assertIn(f"{SUMMARY_PREFIX}generated (path matches **/*_vec_generated.go), +200/-0 in 1 hunk(s)\n",
+                      result.text)
+        self.assertIn("move (moved from pkg/old/util.go)", result.text)
+        self.assertNotIn("x199", result.text)
+        self.assertLess(result.bytes_out * 2, result.bytes_in)
+
+    def test_files_tags_and_selection_survive(self):
+        diff = GENERATED + VENDORED + REAL
+        filtered = self.rules.apply(diff).text
+        self.assertEqual(changed_files(diff), changed_files(filtered))
+        self.assertEqual(lang_tags(parse_diff(diff.splitlines(True))), lang_tags(parse_diff(filtered.splitlines(True))))
+        assets = load_assets(ROOT)
+        tags = ["lang:go", "component:tidb/expression", "risk:perf"]
+        files = changed_files(filtered)
+        self.assertEqual(compile_review(assets, tags, files=changed_files(diff)),
+                         compile_review(assets, tags, files=files))
+
+    def test_reorders_and_literal_whitespace_are_kept(self):
+        reorder = section("pkg/store/txn.go", hunk(10, "-\tt.mu.Lock()", " \tt.data[k] = v", "+\tt.mu.Lock()"))
+        literal = section("pkg/ddl/sql.go", hunk(3, '-\tq := "SELECT a  FROM t"', '+\tq := "SELECT a FROM t"'))
+        joined = section("pkg/ddl/ddl.go", hunk(3, "-\treturn a b", "+\treturn ab"))
+        mentioned = section("pkg/util/doc.go", hunk(1, "+// Files under gen/ say DO NOT EDIT; this one is hand-written."))
+        self.assertEqual([], self.rules.apply(reorder + literal + joined + mentioned).filtered)
+        self.assertEqual(["whitespace"], [item.reason for item in self.rules.apply(
+            section("pkg/ddl/sql.go", hunk(3, '-\tq :=  "a  b"', '+\tq := "a  b"'))).filtered])
+
+    def test_indentation_changes_are_kept_where_whitespace_matters(self):
+        yaml = section("deploy/config.yaml", hunk(1, " a:", "   b: 1", "-c: 2", "+  c: 2"))
+        python = section("scripts/run.py", hunk(1, " if ready:", "     a()", "-b()", "+    b()"))
+        self.assertEqual([], self.rules.apply(yaml + python).filtered)
+        go = section("pkg/ddl/ddl.go", hunk(1, " if ready {", "-a()", "+\ta()", " }"))
+        self.assertEqual(["whitespace"], [item.reason for item in self.rules.apply(go).filtered])
+
+    def test_markers_below_the_hunks_come_from_the_checkout(self):
+        diff = section("pkg/mocks.go", hunk(50, " x", "+y"))
+        self.assertEqual([], self.rules.apply(diff).filtered)
+        with tempfile.TemporaryDirectory() as tmp:
+            (Path(tmp) / "pkg").mkdir()
+            (Path(tmp) / "pkg" / "mocks.go").write_text("// Code generated by MockGen. DO NOT EDIT.\n",
+                                                        encoding="utf-8")
+            read_head = working_tree_reader(tmp, self.rules.marker_lines)
+            self.assertEqual(["generated"], [item.reason for item in self.rules.apply(diff, read_head).filtered])
+
+    def test_cli_writes_diff_and_summary(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            source, out, summary = (Path(tmp) / name for name in ("in.diff", "out.diff", "filtered.json"))
+            source.write_text(VENDORED + REAL, encoding="utf-8")
+            self.assertEqual(0, main([str(source), "-o", str(out), "--summary", str(summary)]))
+            self.assertIn(REAL, out.read_text(encoding="utf-8"))
+            data = json.loads(summary.read_text(encoding="utf-8"))
+            self.assertEqual(["go.sum"], [item["path"] for item in data["filtered"]])
@@ -0,0 +1,102 @@
+import json
+import os
+from pathlib import Path
+import tempfile
+import unittest
+
+from second_opinion.assets import load_assets
+from second_opinion.compiler import compile_review
+from second_opinion.docs_index import DocsIndex, attach_docs, main, query_terms, split_passages, tokenize
+from second_opinion.taxonomy import load_taxonomy
+from second_opinion.validate import Validator
+
+ROOT = Path(__file__).resolve().parents[1]
+TAGS = ["lang:go", "component:tidb/expression", "risk:perf"]
+
+PLANNER = """# Planner
+
+Overview of the planner.
+
+## Join reorder
+
+The greedy joinReorder solver runs after predicate push down.
+
+## Statistics
+
+Row count estimation uses histograms.
+"""
+
+DDL = """# DDL
+
+## Schema version
+
+Every DDL job bumps schemaVersion before the owner broadcasts it.
+"""
+
+DIFF = """diff --git a/pkg/planner/core/rule_join_reorder.go b/pkg/planner/core/rule_join_reorder.go
+--- a/pkg/planner/core/rule_join_reorder.go
++++ b/pkg/planner/core/rule_join_reorder.go
+@@ -1,1 +1,2 @@
+ package core
++func (s *joinReorderGreedySolver) solve() {}
+"""
+
+
+class DocsIndexTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.repo = Path(self.tmp.name) / "repo"
+        self.cache = Path(self.tmp.name) / "cache"
+        self.write("planner/guide.md", PLANNER)
+        self.write("ddl/guide.md", DDL)
+
+    def write(self, rel, text):
+        path = self.repo / "docs" / "agents" / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text, encoding="utf-8")
+        return path
+
+    def test_tokenize_and_split(self):
+        self.assertEqual(["joinreorder", "join", "reorder", "schema_version", "schema", "version"],
+                         tokenize("joinReorder for schema_version"))
+        passages = split_passages(PLANNER)
+        self.assertEqual(["Planner", "Join reorder", "Statistics"], [heading for heading, *_ in passages])
+        self.assertEqual((5, 8), passages[1][1:3])
+
+    def test_only_changed_docs_reparsed(self):
+        index = DocsIndex(self.repo, self.cache).load()
+        self.assertEqual(["docs/agents/ddl/guide.md", "docs/agents/planner/guide.md"], index.reparsed)
+        self.assertEqual([], DocsIndex(self.repo, self.cache).load().reparsed)
+        path = self.write("ddl/guide.md", DDL + "\nOwners retry.\n")
+        os.utime(path, ns=(path.stat().st_atime_ns, path.stat().st_mtime_ns + 1))
+        self.assertEqual(["docs/agents/ddl/guide.md"], DocsIndex(self.repo, self.cache).load().reparsed)
+
+    def test_search_ranks_and_caps(self):
+        index = DocsIndex(self.repo, self.cache).load()
+        passages = index.search(query_terms(DIFF, ["component:tidb/planner"]))
+        self.assertEqual("docs/agents/planner/guide.md#L5-L8", passages[0].ref)
+        self.assertNotIn("docs/agents/ddl/guide.md", [passage.path for passage in passages])
+        self.assertEqual(1, len(index.search(["planner", "join", "reorder"], k=1)))
+        self.assertEqual([], index.search(["join"], max_bytes=10))
+
+    def test_attach_records_provenance(self):
+        assets = load_assets(ROOT)
+        compiled = compile_review(assets, TAGS, files=["a.go"])
+        passages = DocsIndex(self.repo, self.cache).load().search(query_terms(DIFF))
+        data = attach_docs(compiled, passages)
+        self.assertTrue(data["compiled_prompt"].startswith(compiled["compiled_prompt"].rstrip("\n")))
+        self.assertIn("# Domain knowledge", data["compiled_prompt"])
+        self.assertEqual("docs", data["prompt_segments"][-1]["segment"])
+        self.assertIn({"doc": "docs/agents/planner/guide.md#L5-L8", "reason": f"retrieved: bm25 {passages[0].score}"},
+                      data["provenance"])
+        self.assertEqual([], Validator(assets, load_taxonomy()).validate("compile", data))
+        self.assertIs(compiled, attach_docs(compiled, []))
+
+    def test_cli_query(self):
+        diff = Path(self.tmp.name) / "change.diff"
+        diff.write_text(DIFF, encoding="utf-8")
+        out = Path(self.tmp.name) / "passages.json"
+        self.assertEqual(0, main(["query", "--repo", str(self.repo), "--diff", str(diff),
+                                  "--cache-dir", str(self.cache), "-o", str(out)]))
+        self.assertEqual("Join reorder", json.loads(out.read_text(encoding="utf-8"))[0]["heading"])
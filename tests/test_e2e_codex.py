@@ -10,8 +10,8 @@ from tests.e2e_helpers import codex_exec, prepare_workspace
     "Set CODEX_E2E=1 to enable Codex end-to-end tests.",
 )
 class CodexE2ETest(unittest.TestCase):
-    def _prepare_workspace(self):
-        return prepare_workspace(self.addCleanup)
+    def _prepare_workspace(self, install="bundle"):
+        return prepare_workspace(self.addCleanup, install)
 
     def test_codex_runs_second_opinion_skill(self):
         codex_cmd, codex_home, repo, _diff_path, auth_key = self._prepare_workspace()
@@ -51,7 +51,7 @@ class CodexE2ETest(unittest.TestCase):
         self.assertIsInstance(data["tags"], list, "tags must be a list")
 
     def test_codex_compiler_stage(self):
-        codex_cmd, codex_home, repo, diff_path, auth_key = self._prepare_workspace()
+        codex_cmd, codex_home, repo, diff_path, auth_key = self._prepare_workspace(install="tree")
 
         tagger_payload = {
             "signals": [{"evidence": "main.go", "reason": "sample change"}],
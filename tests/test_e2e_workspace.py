@@ -0,0 +1,46 @@
+import os
+from pathlib import Path
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from tests.e2e_helpers import prepare_workspace, workspace_template
+
+
+@unittest.skipIf(shutil.which("git") is None, "git is required")
+class WorkspaceTemplateTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        env = {"CODEX_E2E_TEMPLATE_DIR": tmp.name, "CODEX_E2E_CMD": "git", "OPENAI_API_KEY": "stub"}
+        patcher = mock.patch.dict(os.environ, env)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_template_built_once_and_cloned_per_test(self):
+        template = workspace_template()
+        self.assertEqual(template, workspace_template())
+
+        _, home_a, repo_a, diff_a, _ = prepare_workspace(self.addCleanup)
+        _, home_b, repo_b, _, _ = prepare_workspace(self.addCleanup)
+        skill = Path("skills") / "second-opinion" / "SKILL.md"
+        self.assertTrue((home_a / skill).samefile(template / "codex_home" / skill))
+        self.assertIn("+func sub(a, b int) int { return a - b }", diff_a.read_text(encoding="utf-8"))
+
+        (repo_a / "review.json").write_text("{}", encoding="utf-8")
+        self.assertFalse((repo_b / "review.json").exists())
+        self.assertFalse((template / "workspace" / "review.json").exists())
+
+    def test_new_template_prunes_stale_ones(self):
+        base = Path(os.environ["CODEX_E2E_TEMPLATE_DIR"])
+        stale = base / "second-opinion-e2e-bundle-0000000000000000"
+        staging = base / "second-opinion-e2e-bundle-1111111111111111.abc"
+        other = base / "second-opinion-e2e-tree-0000000000000000"
+        for path in (stale, staging, other):
+            (path / "workspace").mkdir(parents=True)
+        template = workspace_template()
+        self.assertTrue(template.is_dir())
+        self.assertFalse(stale.exists())
+        self.assertTrue(staging.exists())
+        self.assertTrue(other.exists())
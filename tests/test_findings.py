@@ -0,0 +1,75 @@
+import json
+from pathlib import Path
+import tempfile
+import unittest
+
+from second_opinion.findings import dedupe_findings, dedupe_review, line_range
+from second_opinion.shard import main
+
+
+def finding(file, lines, source_id, message, severity="low", tags=(), source_type="rule"):
+    return {"file": file, "lines": lines, "source": {"type": source_type, "id": source_id},
+            "tags": list(tags), "severity": severity, "message": message}
+
+
+LEAK = "Missing Close on resp.Body leaks the connection"
+
+
+class DedupeTests(unittest.TestCase):
+    def test_overlapping_similar_findings_merge(self):
+        findings = [
+            finding("a.go", "L10-L12", "R1", LEAK, tags=["risk:ops"]),
+            finding("a.go", "L11-L14", "baseline-high-severity", "resp.Body Close missing, leaks the connection",
+                    severity="high", tags=["risk:correctness"], source_type="policy"),
+        ]
+        [merged] = dedupe_findings(findings)
+        self.assertEqual("L10-L14", merged["lines"])
+        self.assertEqual("high", merged["severity"])
+        self.assertEqual({"type": "policy", "id": "baseline-high-severity"}, merged["source"])
+        self.assertEqual(["risk:correctness", "risk:ops"], merged["tags"])
+        self.assertEqual(
+            [{"type": "policy", "id": "baseline-high-severity"}, {"type": "rule", "id": "R1"}],
+            merged["sources"],
+        )
+
+    def test_distinct_findings_kept(self):
+        findings = [
+            finding("a.go", "L10", "R1", LEAK),
+            finding("a.go", "L10", "R2", "Rename the variable for clarity"),
+            finding("a.go", "L20", "R3", LEAK),
+            finding("b.go", "L10", "R1", LEAK),
+        ]
+        self.assertEqual(findings, dedupe_findings(findings))
+
+    def test_merge_is_transitive_along_a_chain_and_keeps_input_order(self):
+        findings = [finding("z.go", "L1", "R0", "unrelated")]
+        findings += [finding("a.go", f"L{n}-L{n + 2}", f"R{n}", LEAK) for n in range(1, 200, 2)]
+        merged = dedupe_findings(findings)
+        self.assertEqual(["z.go", "a.go"], [f["file"] for f in merged])
+        self.assertEqual("L1-L201", merged[1]["lines"])
+        self.assertEqual(100, len(merged[1]["sources"]))
+
+    def test_findings_without_lines_keep_their_lines_value(self):
+        file_level = dedupe_findings([finding("a.go", "", "R1", LEAK, severity="high"),
+                                      finding("a.go", "", "R2", LEAK)])
+        self.assertEqual([""], [f["lines"] for f in file_level])
+        no_lines = [finding("a.go", None, rule, LEAK) for rule in ("R1", "R2")]
+        [merged] = dedupe_findings([{k: v for k, v in f.items() if k != "lines"} for f in no_lines])
+        self.assertNotIn("lines", merged)
+        self.assertEqual(["R1", "R2"], [s["id"] for s in merged["sources"]])
+
+    def test_merged_sources_survive_a_second_pass(self):
+        first = dedupe_findings([finding("a.go", "L1", "R1", LEAK), finding("a.go", "L1", "R2", LEAK)])
+        again = dedupe_review({"findings": first + [finding("a.go", "L1-L2", "R3", LEAK, severity="medium")]})
+        [merged] = again["findings"]
+        self.assertEqual(["R3", "R1", "R2"], [s["id"] for s in merged["sources"]])
+        self.assertEqual((1, 2), line_range(merged["lines"]))
+
+    def test_shard_merge_cli_dedupe(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "review.json"
+            path.write_text(json.dumps({"findings": [finding("a.go", "L1", "R1", LEAK),
+                                                     finding("a.go", "L1", "R2", LEAK)]}), encoding="utf-8")
+            out = Path(tmp) / "merged.json"
+            self.assertEqual(0, main(["merge", "--dedupe", str(path), "-o", str(out)]))
+            self.assertEqual(1, len(json.loads(out.read_text(encoding="utf-8"))["findings"]))
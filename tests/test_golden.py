@@ -0,0 +1,74 @@
+import json
+from pathlib import Path
+import tempfile
+import unittest
+
+from second_opinion.golden import EXAMPLES_DIR, discover_cases, json_diff, main, run_corpus
+
+DIFF = (
+    "diff --git a/pkg/expression/builtin.go b/pkg/expression/builtin.go\n"
+    "--- a/pkg/expression/builtin.go\n+++ b/pkg/expression/builtin.go\n"
+    "@@ -1,1 +1,2 @@\n ctx\n+vecEvalInt()\n"
+)
+TAGS = ["lang:go", "component:tidb/expression", "risk:perf"]
+
+
+def write_case(examples, name, tags=TAGS, rule="RUOXI-EXPR-003"):
+    case = Path(examples) / name
+    case.mkdir(parents=True)
+    (case / "patch.diff").write_text(DIFF, encoding="utf-8")
+    (case / "tagger.json").write_text(
+        json.dumps({"signals": [], "tags": [{"tag": tag, "why": "x"} for tag in tags]}), encoding="utf-8")
+    (case / "compiler.json").write_text("{}", encoding="utf-8")
+    finding = {"file": "pkg/expression/builtin.go", "lines": "L2", "source": {"type": "rule", "id": rule},
+               "tags": ["risk:perf"], "severity": "medium", "message": "m"}
+    (case / "review.json").write_text(json.dumps({"findings": [finding]}), encoding="utf-8")
+    (case / "review.md").write_text("# Review\n", encoding="utf-8")
+    return case
+
+
+class GoldenTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.examples = Path(tmp.name)
+
+    def test_json_diff_is_structural(self):
+        self.assertEqual([], json_diff({"a": [1, {"b": "x"}]}, {"a": [1, {"b": "x"}]}))
+        self.assertEqual(
+            ["$.a: expected 2 items, got 3", '$.a[1].b: expected "x", got "y"', "$.c: missing"],
+            sorted(json_diff({"a": [1, {"b": "x"}], "c": 1}, {"a": [1, {"b": "y"}, 2]})),
+        )
+        self.assertEqual(["$.p: differs at line 2"], json_diff({"p": "a\nb\n"}, {"p": "a\nc\n"}))
+
+    def test_update_then_replay_across_processes(self):
+        for n in range(3):
+            write_case(self.examples, f"case-{n}")
+        (self.examples / "foo").mkdir()
+        cases = discover_cases(self.examples)
+        self.assertEqual(["case-0", "case-1", "case-2"], [case.name for case in cases])
+
+        run_corpus(cases, workers=1, update=True)
+        results = run_corpus(cases, workers=2)
+        self.assertEqual([{"case": f"case-{n}", "failures": {}} for n in range(3)], results)
+
+    def test_reports_failures_per_stage(self):
+        case = write_case(self.examples, "drift", tags=["component:tidb/expression", "risk:perf"],
+                          rule="XUHUAIYU-PR-001")
+        run_corpus([case], workers=1, update=True)
+        golden = json.loads((case / "compiler.json").read_text(encoding="utf-8"))
+        golden["selection_rationale"]["budget"] = "high"
+        (case / "compiler.json").write_text(json.dumps(golden), encoding="utf-8")
+
+        [result] = run_corpus([case], workers=1)
+        self.assertEqual(["$.tags: missing mechanical tag lang:go"], result["failures"]["tagger"])
+        self.assertEqual(['$.selection_rationale.budget: expected "high", got "medium"'],
+                         result["failures"]["compiler"])
+        self.assertEqual(["$.findings[0].source: rule XUHUAIYU-PR-001 was not selected"],
+                         result["failures"]["reviewer"])
+        self.assertEqual(1, main(["--examples", str(self.examples), "-o", str(self.examples / "out.json")]))
+
+    def test_repo_examples_pass(self):
+        cases = discover_cases(EXAMPLES_DIR)
+        self.assertTrue(cases)
+        self.assertEqual([{"case": case.name, "failures": {}} for case in cases], run_corpus(cases, workers=1))
@@ -0,0 +1,87 @@
+import json
+from pathlib import Path
+import sqlite3
+import tempfile
+import unittest
+
+from second_opinion.assets import load_assets
+from second_opinion.compiler import compile_review
+from second_opinion.history import History, main, rule_prompt_bytes
+
+ROOT = Path(__file__).resolve().parents[1]
+TAGS = ["lang:go", "component:tidb/expression", "risk:perf"]
+
+
+def finding(rule_id, severity="medium", **extra):
+    return {"file": "pkg/expression/a.go", "lines": "L1", "source": {"type": "rule", "id": rule_id},
+            "tags": ["risk:perf"], "severity": severity, "message": f"m {rule_id}", **extra}
+
+
+class HistoryTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.assets = load_assets(ROOT)
+        cls.compiled = compile_review(cls.assets, TAGS, files=["a.go"])
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = Path(tmp.name)
+        self.history = History(self.tmp / "history.sqlite3")
+        self.addCleanup(self.history.close)
+
+    def test_rule_prompt_bytes_cover_each_entry(self):
+        sizes = rule_prompt_bytes(self.compiled)
+        self.assertEqual(sorted(rule for rules in self.compiled["rules_used"].values() for rule in rules),
+                         sorted(sizes))
+        entry = self.compiled["compiled_prompt"].split("- rule_id: RUOXI-EXPR-002")[1].split("\n\n- rule_id:")[0]
+        self.assertEqual(len(("- rule_id: RUOXI-EXPR-002" + entry).encode("utf-8")), sizes["RUOXI-EXPR-002"])
+
+    def test_report_counts_selections_and_hits(self):
+        merged = finding("RUOXI-EXPR-001", sources=[{"type": "rule", "id": "RUOXI-EXPR-001"},
+                                                     {"type": "rule", "id": "RUOXI-EXPR-003"}])
+        self.assertIsNotNone(self.history.ingest(self.compiled, {"findings": [merged]}, TAGS, "pr-1"))
+        self.assertIsNone(self.history.ingest(self.compiled, {"findings": [merged]}, TAGS, "pr-1"))
+        self.history.ingest(self.compiled, {"findings": [finding("RUOXI-EXPR-001", "high")]}, ["lang:go"], "pr-2")
+        self.history.ingest(self.compiled, {"findings": []}, ["lang:go"], "pr-3")
+
+        report = {entry["rule_id"]: entry for entry in self.history.rule_report()}
+        sizes = rule_prompt_bytes(self.compiled)
+        self.assertEqual({"rule_id": "RUOXI-EXPR-001", "expert": "ruoxi", "selected": 3, "fired": 2, "findings": 2,
+                          "prompt_bytes": sizes["RUOXI-EXPR-001"], "idle_bytes": sizes["RUOXI-EXPR-001"],
+                          "hit_rate": 0.667}, report["RUOXI-EXPR-001"])
+        self.assertEqual((1, 0.333), (report["RUOXI-EXPR-003"]["fired"], report["RUOXI-EXPR-003"]["hit_rate"]))
+        self.assertEqual(3 * sizes["WINDTALKER-PERF-008"], report["WINDTALKER-PERF-008"]["idle_bytes"])
+        self.assertEqual(0, report["RUOXI-EXPR-002"]["fired"])
+
+        tagged = {entry["rule_id"]: entry for entry in self.history.rule_report(tag="risk:perf")}
+        self.assertEqual((1, 1), (tagged["RUOXI-EXPR-001"]["selected"], tagged["RUOXI-EXPR-001"]["fired"]))
+        severities = self.history.db.execute(
+            "SELECT severity, COUNT(*) FROM findings GROUP BY severity ORDER BY severity").fetchall()
+        self.assertEqual([("high", 1), ("medium", 1)], severities)
+
+    def test_suggestions_list_dead_rules_and_peak(self):
+        for index in range(3):
+            self.history.ingest(self.compiled, {"findings": [finding("RUOXI-EXPR-001")] if index else []}, TAGS,
+                                f"pr-{index}")
+        suggestions = {entry["expert"]: entry for entry in self.history.suggestions(self.assets, min_selected=3)}
+        self.assertEqual(1, suggestions["ruoxi"]["suggested_max_rules"])
+        self.assertEqual(["RUOXI-EXPR-002", "RUOXI-EXPR-003"], suggestions["ruoxi"]["dead_rules"])
+        self.assertEqual(len(self.compiled["rules_used"]["windtalker"]), len(suggestions["windtalker"]["dead_rules"]))
+
+    def test_cli_ingests_run_directories(self):
+        run = self.tmp / "batch" / "pr-1"
+        run.mkdir(parents=True)
+        (run / "compiler.json").write_text(json.dumps(self.compiled), encoding="utf-8")
+        (run / "review.json").write_text(json.dumps({"findings": [finding("RUOXI-EXPR-001")]}), encoding="utf-8")
+        (run / "tagger.json").write_text(json.dumps({"signals": [], "tags": [{"tag": "lang:go", "why": "x"}]}),
+                                         encoding="utf-8")
+        db = str(self.tmp / "cli.sqlite3")
+        self.assertEqual(0, main(["--db", db, "ingest", str(self.tmp / "batch")]))
+        out = self.tmp / "report.json"
+        self.assertEqual(0, main(["--db", db, "report", "--tag", "lang:go", "-o", str(out)]))
+        report = json.loads(out.read_text(encoding="utf-8"))
+        self.assertEqual(1, next(entry for entry in report if entry["rule_id"] == "RUOXI-EXPR-001")["fired"])
+        handle = sqlite3.connect(db)
+        self.addCleanup(handle.close)
+        self.assertEqual(["pr-1"], [Path(name).name for (name,) in handle.execute("SELECT name FROM runs")])
@@ -0,0 +1,111 @@
+import json
+from pathlib import Path
+import tempfile
+import unittest
+
+from second_opinion.incremental import STATE_VERSION, finalize, load_state, main, plan_review, save_state
+from tests.review_helpers import HEADER, finding, hunk
+
+ROUND_ONE = (
+    HEADER.format("a.go") + hunk(10, " ctx\n+lockA()\n+lockB()")
+    + HEADER.format("b.go") + hunk(5, " ctx\n+leak()")
+)
+# a.go gains a hunk above the old one (shifting it by 20 lines); b.go's hunk changes.
+ROUND_TWO = (
+    HEADER.format("a.go") + hunk(1, " ctx\n+newCode()") + hunk(30, " ctx\n+lockA()\n+lockB()")
+    + HEADER.format("b.go") + hunk(5, " ctx\n+defer close()")
+)
+
+
+class IncrementalReviewTests(unittest.TestCase):
+    def _first_round_state(self):
+        plan = plan_review(ROUND_ONE, None)
+        review = {"findings": [finding("a.go", "L11-L12", "LOCK-1"), finding("b.go", "L6", "LEAK-1")]}
+        merged, _ = finalize(plan, review)
+        return plan, {"version": STATE_VERSION, "commit": "c1", "hunks": plan.hunks, "findings": merged["findings"]}
+
+    def test_first_round_reviews_everything(self):
+        plan, _ = self._first_round_state()
+        self.assertEqual("first", plan.round)
+        self.assertEqual(ROUND_ONE, plan.delta_diff)
+        self.assertEqual(2, len(plan.new_hunks))
+
+    def test_unchanged_diff_needs_no_review(self):
+        _, state = self._first_round_state()
+        plan = plan_review(ROUND_ONE, state)
+        self.assertEqual("", plan.delta_diff)
+        self.assertEqual(2, plan.unchanged_hunks)
+        self.assertEqual(2, len(plan.carried))
+
+    def test_delta_contains_only_new_hunks(self):
+        _, state = self._first_round_state()
+        plan = plan_review(ROUND_TWO, state)
+        self.assertEqual("incremental", plan.round)
+        self.assertEqual(
+            HEADER.format("a.go") + hunk(1, " ctx\n+newCode()") + HEADER.format("b.go")
+            + hunk(5, " ctx\n+defer close()"),
+            plan.delta_diff,
+        )
+        self.assertEqual(1, plan.unchanged_hunks)
+        # The untouched a.go finding moved with its hunk from line 10 to line 30.
+        self.assertEqual([finding("a.go", "L31-L32", "LOCK-1")], plan.carried)
+        self.assertEqual([finding("b.go", "L6", "LEAK-1")], plan.recheck)
+
+    def test_finalize_marks_fixed_and_still_open(self):
+        _, state = self._first_round_state()
+        plan = plan_review(ROUND_TWO, state)
+        merged, statuses = finalize(plan, {"findings": [finding("a.go", "L2", "NEW-1")]})
+        self.assertEqual(
+            [("open", "LOCK-1"), ("fixed", "LEAK-1"), ("new", "NEW-1")],
+            [(s["status"], s["finding"]["source"]["id"]) for s in statuses],
+        )
+        self.assertEqual(["NEW-1", "LOCK-1"], [f["source"]["id"] for f in merged["findings"]])
+
+        _, statuses = finalize(plan, {"findings": [finding("b.go", "L6", "LEAK-1", "still leaks")]})
+        self.assertEqual("still-open", statuses[1]["status"])
+
+    def test_findings_between_hunks_follow_inserted_hunks(self):
+        _, state = self._first_round_state()
+        state["findings"].append(finding("a.go", "L40-L41", "CTX-1"))
+        # A hunk above both: one line added at the top, the old hunk moves down by one.
+        diff = (HEADER.format("a.go") + hunk(1, " ctx\n+newCode()")
+                + "@@ -10,1 +11,3 @@\n ctx\n+lockA()\n+lockB()\n" + HEADER.format("b.go") + hunk(5, " ctx\n+leak()"))
+        plan = plan_review(diff, state)
+        carried = {f["source"]["id"]: f["lines"] for f in plan.carried}
+        self.assertEqual({"LOCK-1": "L12-L13", "LEAK-1": "L6", "CTX-1": "L41-L42"}, carried)
+
+        touched = plan_review(HEADER.format("a.go") + hunk(38, " ctx\n+edit()"), state)
+        self.assertEqual(["LOCK-1", "LEAK-1", "CTX-1"], [f["source"]["id"] for f in touched.recheck])
+
+    def test_cli_round_trip(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp_path = Path(tmp)
+            state = tmp_path / "state.json"
+            diff = tmp_path / "pr.diff"
+            review = tmp_path / "delta-review.json"
+
+            diff.write_text(ROUND_ONE, encoding="utf-8")
+            main(["plan", "--diff", str(diff), "--state", str(state), "--out", str(tmp_path / "delta.diff"),
+                  "-o", str(tmp_path / "plan.json")])
+            self.assertEqual("first", json.loads((tmp_path / "plan.json").read_text())["round"])
+            review.write_text(json.dumps({"findings": [finding("a.go", "L11", "LOCK-1")]}), encoding="utf-8")
+            main(["finalize", "--diff", str(diff), "--state", str(state), "--review", str(review),
+                  "--commit", "c1", "-o", str(tmp_path / "review.json")])
+            self.assertEqual("c1", load_state(state)["commit"])
+
+            diff.write_text(ROUND_TWO, encoding="utf-8")
+            main(["plan", "--diff", str(diff), "--state", str(state), "--out", str(tmp_path / "delta.diff"),
+                  "-o", str(tmp_path / "plan.json")])
+            summary = json.loads((tmp_path / "plan.json").read_text())
+            self.assertEqual({"round": "incremental", "new_hunks": 2, "unchanged_hunks": 1,
+                              "carried_findings": 1, "recheck_findings": 0}, summary)
+
+    def test_save_state_round_trips(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "state.json"
+            plan = plan_review(ROUND_ONE, None)
+            save_state(path, plan, {"findings": []}, commit="abc")
+            self.assertEqual(plan.hunks, load_state(path)["hunks"])
+            # States from before per-hunk deltas start a fresh round.
+            path.write_text(json.dumps({"version": 1, "hunks": {}, "findings": []}), encoding="utf-8")
+            self.assertIsNone(load_state(path))
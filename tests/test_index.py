@@ -0,0 +1,80 @@
+import json
+import os
+from pathlib import Path
+import shutil
+import tempfile
+import unittest
+
+from second_opinion.assets import load_assets
+from second_opinion.index import AssetIndex
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+class AssetIndexTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = Path(tmp.name)
+        self.root = self.tmp / "assets"
+        for name in ["experts", "processes", "policies", "fragments"]:
+            shutil.copytree(ROOT / name, self.root / name)
+        self.cache = self.tmp / "cache"
+
+    def _index(self):
+        return AssetIndex(self.root, cache_dir=self.cache)
+
+    def test_cold_then_warm_load(self):
+        index = self._index()
+        assets = index.load()
+        self.assertIn("experts/ruoxi/criteria.md", index.reparsed)
+        self.assertTrue(index.path.is_file())
+
+        warm = self._index()
+        warm_assets = warm.load()
+        self.assertEqual([], warm.reparsed)
+        self.assertEqual(assets.experts, warm_assets.experts)
+        self.assertEqual(assets.rules_by_tag, warm_assets.rules_by_tag)
+        self.assertEqual(load_assets(self.root).processes, warm_assets.processes)
+
+    def test_persisted_lookups(self):
+        index = self._index()
+        index.load()
+        data = json.loads(index.path.read_text(encoding="utf-8"))
+        self.assertIn("RUOXI-EXPR-003", data["rules_by_tag"]["risk:perf"])
+        self.assertIn("pr-review", data["processes_by_tag"]["lang:go"])
+        record = data["files"]["experts/ruoxi/criteria.md"]["record"]
+        self.assertTrue(record[0]["text"].startswith("- rule_id: RUOXI-EXPR-001"))
+
+    def test_touch_without_change_is_not_reparsed(self):
+        self._index().load()
+        path = self.root / "policies" / "github-side-effects.yaml"
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        index = self._index()
+        index.load()
+        self.assertEqual([], index.reparsed)
+
+    def test_changed_and_new_files_are_reparsed(self):
+        self._index().load()
+        policy = self.root / "policies" / "github-side-effects.yaml"
+        policy.write_text(policy.read_text(encoding="utf-8").replace("priority: 20", "priority: 1"))
+        (self.root / "policies" / "extra.yaml").write_text(
+            "id: extra\npriority: 30\napplies: always\nrequirements:\n  - Extra.\n", encoding="utf-8"
+        )
+        index = self._index()
+        assets = index.load()
+        self.assertEqual(
+            ["policies/extra.yaml", "policies/github-side-effects.yaml"], sorted(index.reparsed)
+        )
+        self.assertEqual(
+            {"extra": 30, "baseline-high-severity": 10, "github-side-effects": 1},
+            {p.id: p.priority for p in assets.policies},
+        )
+
+    def test_removed_files_drop_out(self):
+        self._index().load()
+        shutil.rmtree(self.root / "experts" / "ruoxi")
+        assets = self._index().load()
+        self.assertNotIn("ruoxi", [e.id for e in assets.experts])
+        self.assertNotIn("RUOXI-EXPR-003", assets.rules_by_tag.get("risk:perf", []))
@@ -11,7 +11,7 @@ from tests.e2e_helpers import codex_exec, prepare_workspace
 )
 class CodexIntegrationAssetsTest(unittest.TestCase):
     def _prepare_workspace(self):
-        return prepare_workspace(self.addCleanup)
+        return prepare_workspace(self.addCleanup, install="tree")
 
     def test_real_assets_compiler_selection(self):
         codex_cmd, codex_home, repo, diff_path, auth_key = self._prepare_workspace()
@@ -4,6 +4,7 @@ from pathlib import Path
 import subprocess
 import unittest
 
+from second_opinion.context import extract_context
 from tests.e2e_helpers import codex_exec, prepare_workspace
 
 
@@ -24,7 +25,7 @@ def _run(cmd, cwd):
 )
 class CodexIntegrationExternalRepoTest(unittest.TestCase):
     def _prepare_workspace(self):
-        return prepare_workspace(self.addCleanup)
+        return prepare_workspace(self.addCleanup, install="tree")
 
     def test_external_repo_diff_compiler(self):
         repo_path = os.environ.get("SO_INTEGRATION_REPO")
@@ -45,6 +46,8 @@ class CodexIntegrationExternalRepoTest(unittest.TestCase):
         diff = _run(["git", "show", ref], cwd=repo_dir).stdout
         if not diff.strip():
             raise AssertionError("external repo diff is empty")
+        context = extract_context(diff, repo_dir)
+        self.assertTrue(context["scopes"] or context["omitted"], "no context extracted for the diff")
 
         codex_cmd, codex_home, workspace, _diff_path, auth_key = self._prepare_workspace()
         diff_path = workspace / "external.diff"
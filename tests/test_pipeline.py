@@ -0,0 +1,95 @@
+import asyncio
+import json
+from pathlib import Path
+import sys
+import tempfile
+import time
+import unittest
+
+from second_opinion.assets import load_assets
+from second_opinion.pipeline import StageTimeout, main, review_pipelined, run_pipeline
+from second_opinion.shard import review_sharded, split_diff
+from tests.test_shard import make_diff, path_tagger
+
+ROOT = Path(__file__).resolve().parents[1]
+DIFF = make_diff([f"pkg/expression/f{n}.go" for n in range(3)] + ["pkg/ddl/ddl.go"], lines=20)
+
+
+def file_reviewer(compiled_prompt, diff_text):
+    path = diff_text.split(" b/", 1)[1].split("\n", 1)[0]
+    return {"findings": [{"file": path, "lines": "L1", "source": {"type": "policy", "id": "baseline-high-severity"},
+                          "tags": [], "severity": "low", "message": path}]}
+
+
+class PipelineTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.assets = load_assets(ROOT)
+
+    def test_matches_sequential_sharded_review(self):
+        expected, sequential = review_sharded(DIFF, self.assets, path_tagger, file_reviewer, max_bytes=400)
+        merged, results = asyncio.run(
+            review_pipelined(DIFF, self.assets, path_tagger, file_reviewer, max_bytes=400)
+        )
+        self.assertEqual(expected, merged)
+        self.assertEqual([r.compiler for r in sequential], [r.compiler for r in results])
+
+    def test_tagging_overlaps_review_with_backpressure(self):
+        events = []
+
+        async def tagger(diff_text):
+            events.append(("tag", diff_text))
+            return path_tagger(diff_text)
+
+        async def reviewer(compiled_prompt, diff_text):
+            events.append(("review-start", diff_text))
+            await asyncio.sleep(0.01)
+            events.append(("review-end", diff_text))
+            return {"findings": []}
+
+        shards = split_diff(DIFF, max_bytes=400)
+        asyncio.run(run_pipeline(shards, self.assets, tagger, reviewer, tagger_workers=1,
+                                 reviewer_workers=1, queue_size=1))
+        first_review_end = events.index(("review-end", shards[0].text))
+        self.assertLess(events.index(("tag", shards[1].text)), first_review_end)
+        # With one-slot queues the tagger cannot run all the way ahead of the reviewer.
+        self.assertGreater(events.index(("tag", shards[-1].text)), events.index(("review-start", shards[0].text)))
+
+    def test_timeouts_are_retried_then_cancel_the_run(self):
+        calls = []
+
+        def flaky(compiled_prompt, diff_text):
+            calls.append(diff_text)
+            if len(calls) == 1:
+                time.sleep(0.2)
+            return {"findings": []}
+
+        shards = split_diff(DIFF, max_bytes=400)[:1]
+        results = asyncio.run(run_pipeline(shards, self.assets, path_tagger, flaky, timeout=0.05, retries=1))
+        self.assertEqual(2, len(calls))
+        self.assertEqual({"findings": []}, results[0].review)
+
+        async def stuck(compiled_prompt, diff_text):
+            await asyncio.sleep(10)
+
+        started = time.perf_counter()
+        with self.assertRaises(StageTimeout):
+            asyncio.run(run_pipeline(split_diff(DIFF, max_bytes=400), self.assets, path_tagger, stuck,
+                                     timeout=0.02, retries=1))
+        self.assertLess(time.perf_counter() - started, 2)
+
+    def test_cli_scopes_component_tags_to_the_repository(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp_path = Path(tmp)
+            (tmp_path / "change.diff").write_text(make_diff(["pkg/statistics/handle.go"]), encoding="utf-8")
+            reviewer = tmp_path / "reviewer.py"
+            reviewer.write_text("print('{\"findings\": []}')\n", encoding="utf-8")
+            tags = {}
+            for repo in ("tidb", "pd"):
+                out = tmp_path / repo
+                self.assertEqual(0, main(["--diff", str(tmp_path / "change.diff"), "--out", str(out),
+                                          "--reviewer-cmd", f"{sys.executable} {reviewer}", "--repo-name", repo,
+                                          "--cache-dir", str(tmp_path / "cache")]))
+                tagger = json.loads((out / "shard-000" / "tagger.json").read_text(encoding="utf-8"))
+                tags[repo] = [item["tag"] for item in tagger["tags"] if item["tag"].startswith("component:")]
+        self.assertEqual({"tidb": ["component:tidb/statistics"], "pd": []}, tags)
@@ -0,0 +1,112 @@
+import json
+from pathlib import Path
+import tempfile
+import unittest
+
+from second_opinion.review_cache import FindingsCache, main, plan_reuse, review_with_cache
+from tests.review_helpers import HEADER, finding, hunk
+
+COMPILER = {
+    "selected_processes": ["review-core"],
+    "selected_policies": ["baseline-high-severity"],
+    "rules_used": {"ruoxi": ["RUOXI-EXPR-001"]},
+    "compiled_prompt": "# Reviewer rules\n",
+}
+
+FIRST = HEADER.format("a.go") + hunk(10, " ctx\n+lockA()\n+lockB()") + HEADER.format("b.go") + hunk(5, " ctx\n+ok()")
+# The a.go hunk moved down by 20 lines after a rebase; b.go changed.
+SECOND = HEADER.format("a.go") + hunk(30, " ctx\n+lockA()\n+lockB()") + HEADER.format("b.go") + hunk(5, " ctx\n+leak()")
+
+
+class RecordingReviewer:
+    def __init__(self, findings):
+        self.findings = findings
+        self.diffs = []
+
+    def __call__(self, compiled_prompt, diff_text):
+        self.diffs.append(diff_text)
+        return {"findings": self.findings}
+
+
+class FindingsCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.cache = FindingsCache(self.tmp.name)
+
+    def test_unchanged_hunks_reuse_findings_with_remapped_lines(self):
+        first = RecordingReviewer([finding("a.go", "L11-L12", "LOCK-1")])
+        review, plan = review_with_cache(FIRST, COMPILER, first, self.cache, prompt_digest="p")
+        self.assertEqual({"hunks": 2, "hits": 0, "misses": 2}, plan.summary())
+        self.assertEqual([FIRST], first.diffs)
+        self.assertEqual(["LOCK-1"], [f["source"]["id"] for f in review["findings"]])
+
+        second = RecordingReviewer([finding("b.go", "L6", "LEAK-1")])
+        review, plan = review_with_cache(SECOND, COMPILER, second, self.cache, prompt_digest="p")
+        self.assertEqual({"hunks": 2, "hits": 1, "misses": 1}, plan.summary())
+        self.assertEqual([HEADER.format("b.go") + hunk(5, " ctx\n+leak()")], second.diffs)
+        self.assertEqual([finding("a.go", "L31-L32", "LOCK-1"), finding("b.go", "L6", "LEAK-1")],
+                         review["findings"])
+
+    def test_findings_outside_hunks_survive_the_second_run(self):
+        file_level = dict(finding("a.go", "", "DOC-1"), lines=None)
+        for _ in range(2):
+            reviewer = RecordingReviewer([file_level, finding("b.go", "L90", "LEAK-2")])
+            review, _ = review_with_cache(FIRST, COMPILER, reviewer, self.cache, prompt_digest="p")
+            self.assertEqual([FIRST], reviewer.diffs)
+            self.assertEqual(["DOC-1", "LEAK-2"], [f["source"]["id"] for f in review["findings"]])
+
+    def test_only_the_file_with_an_unattributed_finding_stays_uncached(self):
+        file_level = dict(finding("a.go", "", "DOC-1"), lines=None)
+        review_with_cache(FIRST, COMPILER, RecordingReviewer([file_level, finding("b.go", "L6", "LEAK-1")]),
+                          self.cache, prompt_digest="p")
+        reviewer = RecordingReviewer([file_level])
+        review, plan = review_with_cache(FIRST, COMPILER, reviewer, self.cache, prompt_digest="p")
+        self.assertEqual([HEADER.format("a.go") + hunk(10, " ctx\n+lockA()\n+lockB()")], reviewer.diffs)
+        self.assertEqual(["DOC-1", "LEAK-1"], [f["source"]["id"] for f in review["findings"]])
+        self.assertEqual({"hunks": 2, "hits": 1, "misses": 1}, plan.summary())
+
+    def test_fully_cached_diff_skips_the_reviewer(self):
+        review_with_cache(FIRST, COMPILER, RecordingReviewer([]), self.cache, prompt_digest="p")
+        reviewer = RecordingReviewer([])
+        review, plan = review_with_cache(FIRST, COMPILER, reviewer, self.cache, prompt_digest="p")
+        self.assertEqual([], reviewer.diffs)
+        self.assertEqual(2, plan.hits)
+        self.assertEqual({"findings": []}, review)
+
+    def test_rule_set_and_prompt_changes_miss(self):
+        review_with_cache(FIRST, COMPILER, RecordingReviewer([]), self.cache, prompt_digest="p")
+        other_rules = dict(COMPILER, rules_used={"ruoxi": ["RUOXI-EXPR-002"]})
+        self.assertEqual(0, plan_reuse(FIRST, other_rules, self.cache, prompt_digest="p").hits)
+        self.assertEqual(0, plan_reuse(FIRST, COMPILER, self.cache, prompt_digest="q").hits)
+        self.assertEqual(2, plan_reuse(FIRST, COMPILER, self.cache, prompt_digest="p").hits)
+
+    def test_expired_entries_miss(self):
+        review_with_cache(FIRST, COMPILER, RecordingReviewer([]), self.cache, prompt_digest="p")
+        expired = FindingsCache(self.tmp.name, max_age=-1)
+        self.assertEqual(0, plan_reuse(FIRST, COMPILER, expired, prompt_digest="p").hits)
+        self.assertEqual({"hits": 0, "misses": 2}, expired.stats())
+        self.assertEqual([], expired.entries())
+
+    def test_cli_prepare_and_complete(self):
+        tmp_path = Path(self.tmp.name)
+        (tmp_path / "change.diff").write_text(FIRST, encoding="utf-8")
+        (tmp_path / "compiler.json").write_text(json.dumps(COMPILER), encoding="utf-8")
+        (tmp_path / "miss-review.json").write_text(
+            json.dumps({"findings": [finding("a.go", "L11", "LOCK-1")]}), encoding="utf-8")
+        common = ["--diff", str(tmp_path / "change.diff"), "--compiler", str(tmp_path / "compiler.json")]
+        cache_dir = ["--cache-dir", str(tmp_path / "cache")]
+
+        main(cache_dir + ["prepare"] + common + ["--out", str(tmp_path / "miss.diff"),
+                                                 "-o", str(tmp_path / "summary.json")])
+        self.assertEqual(FIRST, (tmp_path / "miss.diff").read_text(encoding="utf-8"))
+        main(cache_dir + ["complete"] + common + ["--review", str(tmp_path / "miss-review.json"),
+                                                  "-o", str(tmp_path / "review.json")])
+        main(cache_dir + ["prepare"] + common + ["--out", str(tmp_path / "miss.diff"),
+                                                 "--cached", str(tmp_path / "cached.json"),
+                                                 "-o", str(tmp_path / "summary.json")])
+        self.assertEqual("", (tmp_path / "miss.diff").read_text(encoding="utf-8"))
+        self.assertEqual({"hunks": 2, "hits": 2, "misses": 0},
+                         json.loads((tmp_path / "summary.json").read_text(encoding="utf-8")))
+        self.assertEqual([finding("a.go", "L11", "LOCK-1")],
+                         json.loads((tmp_path / "cached.json").read_text(encoding="utf-8"))["findings"])
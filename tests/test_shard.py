@@ -0,0 +1,109 @@
+import json
+from pathlib import Path
+import tempfile
+import threading
+import unittest
+
+from second_opinion.assets import load_assets
+from second_opinion.diff import changed_files
+from second_opinion.findings import merge_reviews
+from second_opinion.shard import main, review_sharded, split_diff
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def make_diff(files, hunks=1, lines=5):
+    parts = []
+    for path in files:
+        parts.append(f"diff --git a/{path} b/{path}\nindex 1111111..2222222 100644\n--- a/{path}\n+++ b/{path}\n")
+        for hunk in range(hunks):
+            start = hunk * 100 + 1
+            parts.append(f"@@ -{start},1 +{start},{lines + 1} @@\n context\n")
+            parts.extend(f"+line {hunk}-{n}\n" for n in range(lines))
+    return "".join(parts)
+
+
+def path_tagger(diff_text):
+    tags = [{"tag": "lang:go", "why": "Go source"}]
+    for path in changed_files(diff_text):
+        if path.startswith("pkg/expression/"):
+            tags.append({"tag": "component:tidb/expression", "why": path})
+        if path.startswith("pkg/ddl/"):
+            tags.append({"tag": "component:tidb/ddl", "why": path})
+    return {"signals": [], "tags": tags}
+
+
+class ShardTests(unittest.TestCase):
+    def test_split_respects_budget_and_order(self):
+        diff = make_diff([f"pkg/a{n}.go" for n in range(10)])
+        shards = split_diff(diff, max_bytes=500)
+        self.assertGreater(len(shards), 1)
+        for shard in shards:
+            self.assertLessEqual(len(shard.text.encode("utf-8")), 500)
+        self.assertEqual(diff, "".join(shard.text for shard in shards))
+        self.assertEqual([f"pkg/a{n}.go" for n in range(10)], [f for s in shards for f in s.files])
+
+    def test_large_file_split_by_hunk(self):
+        diff = make_diff(["pkg/big.go"], hunks=6, lines=10)
+        shards = split_diff(diff, max_bytes=400)
+        self.assertGreater(len(shards), 1)
+        for shard in shards:
+            self.assertTrue(shard.text.startswith("diff --git a/pkg/big.go b/pkg/big.go\n"))
+            self.assertEqual(["pkg/big.go"], shard.files)
+
+    def test_merge_dedupes_and_is_deterministic(self):
+        a = {"file": "b.go", "lines": "L10", "source": {"type": "rule", "id": "R1"},
+             "tags": [], "severity": "low", "message": "first"}
+        b = {"file": "a.go", "lines": "L2-L3", "source": {"type": "policy", "id": "P"},
+             "tags": [], "severity": "high", "message": "other"}
+        dup = dict(a, message="duplicate")
+        merged = merge_reviews([{"findings": [a, b]}, {"findings": [dup]}])
+        self.assertEqual([b, a], merged["findings"])
+        self.assertEqual(merged, merge_reviews([{"findings": [b]}, {"findings": [a, dup]}]))
+
+    def test_review_sharded_compiles_per_shard(self):
+        diff = make_diff(["pkg/expression/builtin.go", "pkg/ddl/ddl.go"], lines=20)
+        prompts = {}
+        active = []
+        peak = []
+        lock = threading.Lock()
+
+        def reviewer(compiled_prompt, shard_text):
+            with lock:
+                active.append(1)
+                peak.append(len(active))
+            path = changed_files(shard_text)[0]
+            prompts[path] = compiled_prompt
+            with lock:
+                active.pop()
+            finding = {"file": path, "lines": "L1", "source": {"type": "policy", "id": "baseline-high-severity"},
+                       "tags": [], "severity": "low", "message": path}
+            return {"findings": [finding, finding]}
+
+        merged, results = review_sharded(
+            diff, load_assets(ROOT), path_tagger, reviewer, max_bytes=400, workers=2
+        )
+        self.assertEqual(2, len(results))
+        self.assertLessEqual(max(peak), 2)
+        self.assertEqual(["ruoxi", "windtalker"], results[0].compiler["selected_experts"])
+        self.assertEqual([], results[1].compiler["selected_experts"])
+        self.assertIn("RUOXI-EXPR-001", prompts["pkg/expression/builtin.go"])
+        self.assertNotIn("RUOXI-EXPR-001", prompts["pkg/ddl/ddl.go"])
+        self.assertEqual(["pkg/ddl/ddl.go", "pkg/expression/builtin.go"],
+                         [f["file"] for f in merged["findings"]])
+
+    def test_cli_split_and_merge(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp_path = Path(tmp)
+            diff_path = tmp_path / "change.diff"
+            diff_path.write_text(make_diff(["a.go", "b.go"], lines=20), encoding="utf-8")
+            self.assertEqual(0, main(["split", "--diff", str(diff_path), "--out", str(tmp_path / "shards"),
+                                      "--max-bytes", "300"]))
+            manifest = json.loads((tmp_path / "shards" / "shards.json").read_text(encoding="utf-8"))
+            self.assertEqual([["a.go"], ["b.go"]], [entry["files"] for entry in manifest])
+
+            review = tmp_path / "review.json"
+            review.write_text(json.dumps({"findings": []}), encoding="utf-8")
+            output = tmp_path / "merged.json"
+            self.assertEqual(0, main(["merge", str(review), str(review), "-o", str(output)]))
+            self.assertEqual({"findings": []}, json.loads(output.read_text(encoding="utf-8")))
@@ -0,0 +1,74 @@
+import contextlib
+import io
+import json
+from pathlib import Path
+import tempfile
+import unittest
+import urllib.error
+import urllib.request
+
+from second_opinion.stub_server import Recordings, StubServer, request_key
+from tests.run_e2e import e2e_test_ids, main as run_e2e
+
+
+def post(url, payload):
+    request = urllib.request.Request(url, data=json.dumps(payload).encode("utf-8"), method="POST",
+                                     headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return response.status, response.read().decode("utf-8")
+    except urllib.error.HTTPError as exc:
+        return exc.code, exc.read().decode("utf-8")
+
+
+class StubServerTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = Path(tmp.name)
+
+    def _server(self, directory, **options):
+        server = StubServer(directory, **options).start()
+        self.addCleanup(server.stop)
+        return server
+
+    def test_key_ignores_volatile_fields_and_temp_paths(self):
+        base = {"model": "m", "input": f"cwd: {tempfile.gettempdir()}/tmpabc123/workspace"}
+        other = dict(base, input=f"cwd: {tempfile.gettempdir()}/tmpzzz999/workspace", prompt_cache_key="x")
+        key = request_key("/v1/responses", json.dumps(base).encode("utf-8"))
+        self.assertEqual(key, request_key("/v1/responses", json.dumps(other).encode("utf-8")))
+        self.assertNotEqual(key, request_key("/v1/chat/completions", json.dumps(base).encode("utf-8")))
+
+    def test_replay_serves_recording_and_reports_misses(self):
+        payload = {"model": "m", "messages": [{"role": "user", "content": "hi"}]}
+        key = request_key("/v1/chat/completions", json.dumps(payload).encode("utf-8"))
+        Recordings(self.tmp).put(key, {"status": 200, "content_type": "text/event-stream", "body": "data: x\n\n"})
+        server = self._server(self.tmp)
+
+        self.assertEqual((200, "data: x\n\n"), post(server.base_url + "/chat/completions", payload))
+        status, body = post(server.base_url + "/chat/completions", dict(payload, model="other"))
+        self.assertEqual(404, status)
+        self.assertEqual("stub_miss", json.loads(body)["error"]["type"])
+        self.assertEqual((1, 1), (server.recordings.hits, server.recordings.misses))
+
+    def test_record_mode_saves_upstream_responses(self):
+        payload = {"model": "m", "input": "review this"}
+        key = request_key("/v1/responses", json.dumps(payload).encode("utf-8"))
+        Recordings(self.tmp / "upstream").put(key, {"status": 200, "content_type": "application/json",
+                                                    "body": '{"ok": true}'})
+        upstream = self._server(self.tmp / "upstream")
+        recorder = self._server(self.tmp / "recorded", upstream=upstream.base_url[: -len("/v1")])
+
+        self.assertEqual((200, '{"ok": true}'), post(recorder.base_url + "/responses", payload))
+        self.assertEqual('{"ok": true}', Recordings(self.tmp / "recorded").get(key)["body"])
+
+    def test_runner_discovers_e2e_tests(self):
+        ids = e2e_test_ids()
+        self.assertIn("tests.test_e2e_codex.CodexE2ETest.test_codex_tagger_stage", ids)
+        self.assertTrue(all("fixture" in i for i in e2e_test_ids(keyword="fixture")))
+
+    def test_runner_stops_without_recordings(self):
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            self.assertEqual(2, run_e2e(["--recordings", str(self.tmp / "missing")]))
+        self.assertIn("--record", stderr.getvalue())
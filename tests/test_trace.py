@@ -0,0 +1,86 @@
+import json
+from pathlib import Path
+import tempfile
+import unittest
+
+from second_opinion import trace
+from second_opinion.assets import load_assets
+from second_opinion.cache import CompileCache
+from second_opinion.compiler import compile_review
+from second_opinion.index import load_index
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+class TraceTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = Path(tmp.name)
+        self.path = self.tmp / "trace.jsonl"
+        self.tracer = trace.configure(self.path)
+        self.addCleanup(trace.configure, None)
+
+    def records(self):
+        self.tracer.flush()
+        return trace.read_trace(self.path)
+
+    def test_spans_and_events_are_written(self):
+        with trace.span("outer", cat="test", size=3) as attrs:
+            attrs["extra"] = True
+            trace.event("mark", cat="test")
+        with self.assertRaises(ValueError):
+            with trace.span("failing"):
+                raise ValueError("boom")
+
+        records = {record["name"]: record for record in self.records()}
+        self.assertEqual(records["outer"]["args"], {"size": 3, "extra": True})
+        self.assertGreaterEqual(records["outer"]["dur"], 0)
+        self.assertNotIn("dur", records["mark"])
+        self.assertEqual(records["failing"]["args"], {"error": "ValueError"})
+
+    def test_chrome_export_and_summary(self):
+        with trace.span("compile"):
+            pass
+        with trace.span("compile"):
+            pass
+        trace.event("mark")
+        records = self.records()
+
+        chrome = trace.to_chrome(records)
+        phases = sorted(event["ph"] for event in chrome["traceEvents"])
+        self.assertEqual(phases, ["X", "X", "i"])
+        summary = trace.summarize(records)
+        self.assertEqual(list(summary), ["compile"])
+        self.assertEqual(summary["compile"]["count"], 2)
+
+        output = self.tmp / "chrome.json"
+        self.assertEqual(trace.main(["chrome", str(self.path), "-o", str(output)]), 0)
+        self.assertEqual(len(json.loads(output.read_text(encoding="utf-8"))["traceEvents"]), 3)
+
+    def test_compile_and_index_spans(self):
+        assets = load_index(ROOT, cache_dir=self.tmp / "index")
+        cache = CompileCache(self.tmp / "cache")
+        tags = ["lang:go", "component:tidb/expression", "risk:correctness"]
+        compile_review(assets, tags, files=["a.go"], cache=cache)
+        compile_review(assets, tags, files=["a.go"], cache=cache)
+
+        records = self.records()
+        loads = [record for record in records if record["name"] == "assets.load"]
+        self.assertEqual(len(loads), 1)
+        self.assertGreater(loads[0]["args"]["reparsed"], 0)
+        self.assertTrue(any(record["name"] == "assets.parse" for record in records))
+
+        compiles = [record["args"] for record in records if record["name"] == "compile"]
+        self.assertEqual([args["cache"] for args in compiles], ["miss", "hit"])
+        self.assertGreater(compiles[0]["rules"], 0)
+        self.assertGreater(compiles[0]["prompt_bytes"], compiles[0]["prompt_tokens"])
+
+    def test_disabled_tracing_writes_nothing(self):
+        trace.configure(None)
+        self.assertFalse(trace.enabled())
+        with trace.span("compile") as attrs:
+            attrs["ignored"] = 1
+        compile_review(load_assets(ROOT), ["lang:go"], files=["a.go"])
+        trace.get_tracer().flush()
+        self.assertFalse(self.path.exists())
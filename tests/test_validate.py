@@ -0,0 +1,100 @@
+import copy
+import json
+from pathlib import Path
+import tempfile
+import unittest
+
+from second_opinion.assets import load_assets
+from second_opinion.compiler import compile_review
+from second_opinion.taxonomy import load_taxonomy
+from second_opinion.validate import Validator, compile_schema, main, validate_paths
+
+ROOT = Path(__file__).resolve().parents[1]
+TAGS = ["lang:go", "component:tidb/expression", "risk:perf", "risk:correctness"]
+
+
+def finding(source_type, source_id, tags=()):
+    return {"file": "a.go", "lines": "L1", "source": {"type": source_type, "id": source_id},
+            "tags": list(tags), "severity": "low", "message": "m"}
+
+
+class ValidatorTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.assets = load_assets(ROOT)
+        cls.validator = Validator(cls.assets, load_taxonomy())
+        cls.compiled = compile_review(cls.assets, TAGS, files=["a.go"])
+
+    def test_compiled_schema_subset(self):
+        check = compile_schema({"type": "object", "required": ["a"], "additionalProperties": False,
+                                "properties": {"a": {"anyOf": [{"type": "null"}, {"enum": ["x"]}]}}})
+        errors = []
+        check({"a": "y", "b": 1}, "$", errors)
+        self.assertEqual(["$.a: matches no allowed shape", "$: unexpected b"], errors)
+        errors = []
+        check([], "$", errors)
+        self.assertEqual(["$: expected object"], errors)
+
+    def test_compiler_output_is_valid(self):
+        self.assertEqual([], self.validator.validate("compile", self.compiled))
+
+    def test_compile_semantic_errors(self):
+        data = copy.deepcopy(self.compiled)
+        data["rules_used"]["ruoxi"].append("NOPE-001")
+        data["selected_policies"].append("missing-policy")
+        data["provenance"] = [p for p in data["provenance"] if p.get("process") != "pr-review"]
+        errors = self.validator.validate("compile", data)
+        self.assertIn("$.rules_used.ruoxi: unknown rule NOPE-001", errors)
+        self.assertIn("$.selected_policies: unknown policy missing-policy", errors)
+        self.assertIn("$.provenance: no entry for process pr-review", errors)
+
+    def test_prompt_segment_hashes_checked(self):
+        data = copy.deepcopy(self.compiled)
+        data["compiled_prompt"] = data["compiled_prompt"].replace("# Reviewer rules", "# Rules")
+        self.assertEqual(
+            [f"$.prompt_segments[{len(data['prompt_segments']) - 1}]: hash does not match compiled_prompt"],
+            self.validator.validate("compile", data),
+        )
+        data = copy.deepcopy(self.compiled)
+        data["compiled_prompt"] += "extra\n"
+        self.assertEqual(["$.prompt_segments: do not cover compiled_prompt"], self.validator.validate("compile", data))
+        del data["prompt_segments"]
+        self.assertEqual([], self.validator.validate("compile", data))
+
+    def test_compile_outputs_without_pruned_rules_validate(self):
+        data = copy.deepcopy(self.compiled)
+        del data["selection_rationale"]["pruned_rules"]
+        self.assertEqual([], self.validator.validate("compile", data))
+
+    def test_review_sources_and_tags(self):
+        review = {"findings": [finding("rule", "RUOXI-EXPR-001", ["risk:perf"]),
+                               finding("policy", "nope"), finding("rule", "XUHUAIYU-PR-004", ["risk:bogus"])]}
+        self.assertEqual(
+            ["$.findings[1].source: unknown policy nope", "$.findings[2].tags[0]: tag not in taxonomy: risk:bogus"],
+            self.validator.validate("review", review),
+        )
+        self.assertIn(
+            "$.findings[2].source: rule XUHUAIYU-PR-004 was not selected",
+            self.validator.validate("review", review, compiler=self.compiled),
+        )
+
+    def test_merged_finding_sources_checked(self):
+        merged = finding("rule", "RUOXI-EXPR-001")
+        merged["sources"] = [{"type": "rule", "id": "RUOXI-EXPR-001"}, {"type": "policy", "id": "nope"}]
+        self.assertEqual(["$.findings[0].sources[1]: unknown policy nope"],
+                         self.validator.validate("review", {"findings": [merged]}))
+
+    def test_sweep_and_cli(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            case = Path(tmp) / "pr-1"
+            case.mkdir()
+            (case / "compiler.json").write_text(json.dumps(self.compiled), encoding="utf-8")
+            (case / "review.json").write_text(
+                json.dumps({"findings": [finding("rule", "RUOXI-EXPR-001")]}), encoding="utf-8")
+            (case / "tagger.json").write_text(
+                json.dumps({"signals": [], "tags": [{"tag": "lang:cobol", "why": "x"}]}), encoding="utf-8")
+            count, failures = validate_paths(self.validator, [tmp], cross_check=True)
+            self.assertEqual(3, count)
+            self.assertEqual([str(case / "tagger.json")], list(failures))
+            self.assertEqual(1, main([tmp]))
+            self.assertEqual(0, main([str(ROOT / "examples"), "--include-samples"]))